@@ -109,7 +109,7 @@ Abbreviations
             assert 0, _("Out of range figure number")
         self._figures[num - 1] = None
 
-    def read(self, fn):
+    def read(self, fn, lazy=False, sigs=None, preview=None):
         """ Read signals from file
         Overwrite signals in case of Signal name conflict.
         On success, Reader and Signals are added in the lists.
@@ -119,6 +119,18 @@ Abbreviations
         fn: string
         The file name
 
+        lazy: bool
+        When True, Signal data is read from the file on first access
+
+        sigs: string, compiled regex or list of them
+        Names or glob patterns of the Signals to read, e.g. ['vout', 'i*'],
+        or compiled regular expressions. None to read all the Signals
+
+        preview: int
+        When set, Signals are decimated to about this number of points, the
+        full resolution data being read when a Graph is zoomed beyond the
+        preview resolution
+
         Returns
         -------
         sigs: Dict of Signals
@@ -139,7 +151,7 @@ Abbreviations
         r = DetectReader(fn)
         if r is None:
             raise NotImplementedError()
-        sigs = r.read(fn)
+        sigs = r.read(fn, lazy, sigs, preview)
         self.connect('begin-transaction', r.on_begin_transaction)
         self.connect('end-transaction', r.on_end_transaction)
 
@@ -199,7 +211,8 @@ Abbreviations
     def update(self, r=None, upn=-1):
         """ Reread signal from files.
         For each file, reread it, and for updated, new and deleted signal,
-        update the Signal dict accordingly.
+        update the Signal dict accordingly. Files not changed since last
+        read are skipped and only Figures showing changed Signals are redrawn.
         Act recursively.
 
         Note: recursion is now deprecated by using GObject event system by
@@ -219,6 +232,14 @@ Abbreviations
         """        ## SUPPORT FOR UPDATE SINGLE READER
         n = {}    # New signals
         if upn == -1:
+            # Signals shown in Figures, whose 'changed' events are recorded
+            # during the update, either read or computed from other Signals
+            shown = dict((id(s), s) for f in self._figures
+                         for g in f.graphs for s in g.signals.values())
+            changed = set()
+            handlers = [(s, s.connect('changed',
+                                      lambda s: changed.add(id(s))))
+                        for s in shown.values()]
             self.emit('begin-transaction')
             # Normal call create the new list etc etc
             self._update_num += 1
@@ -229,6 +250,8 @@ Abbreviations
             else:
                 n.update(self.update(r, self._update_num))
             self.emit('end-transaction')
+            for (s, handler) in handlers:
+                s.disconnect(handler)
         else:
             # First look at its dependencies
             if hasattr(r, "get_depends") and isinstance(r.get_depends, collections.Callable):
@@ -241,16 +264,21 @@ Abbreviations
             n.update(r.update(self._update_num, keep=False))
             return n
 
-        # Find deleted signals
+        # Find deleted signals, their data being set to None by the Reader.
+        # Data not loaded yet is not read, so that lazy Signals stay lazy.
         d = []
         for sn, s in self._signals.items():
             #n.update(s.update(self._update_num, False))
-            if s.data is None:
+            if s.loaded and s.data is None:
                 d.append(sn)
         # Insert new signals
         self._signals.update(n)
-        # Delete signals from all graphs of all figures
+        # Delete signals from all graphs of all figures, redraw only figures
+        # with Signals changed
         for f in self._figures:
+            if not d and not any(id(s) in changed for g in f.graphs
+                                 for s in g.signals.values()):
+                continue
             for g in f.graphs:
                 g.remove(self.names_to_signals(d))
                 g.update_signals()
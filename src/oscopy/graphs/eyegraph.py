@@ -112,7 +112,7 @@ class EyeGraph(Graph):
                                       ClockRecovery=self.ClockRecovery,
                                       DRsel=self.DRsel,
                                       BWsel=self.BWsel)
-                self._signals2lines[sn] = line
+                self._signals2lines[sn] = [line]
                 self._draw_cursors()
                 self._print_cursors()
                 self.legend()
@@ -1,3 +1,4 @@
+import numpy
 from matplotlib.axes import Axes as mplAxes
 from matplotlib.widgets import SpanSelector, RectangleSelector
 from matplotlib import rc
@@ -21,6 +22,25 @@ names_to_factors = {'exa':18, 'peta':15, 'tera':12, 'giga':9, 'mega':6,
                     '(auto)':-31416}
 
 
+def _sweeps(x, y):
+    """ Return the data of the lines drawn for a Signal: one line, or one
+    line per sweep for families, i.e. Signals with (sweeps x points) data
+
+    Parameters
+    ----------
+    x, y: numpy.ndarray
+    The data of the reference and of the Signal, the reference being
+    one-dimensional when shared by all the sweeps
+
+    Returns
+    -------
+    list of tuples (x, y)
+    The data of each line
+    """
+    if numpy.ndim(y) < 2:
+        return [(x, y)]
+    return [(x[i] if numpy.ndim(x) > 1 else x, y[i]) for i in range(len(y))]
+
 class Graph(mplAxes):
     """Class Graph -- Handle the representation of a list of signals
 
@@ -32,6 +52,10 @@ Signals are managed as a dict, where the key is the signal name.
 In a graph, signals with a different sampling, but with the same abscisse
 can be plotted toget_her.
 
+Signals read in preview mode are replaced by their full resolution data when
+the graph is zoomed so that there are less preview points in the view than
+pixels.
+
 Handle a cursor dict, for convenience limited to two horizontal
 and two vertical, limit can be removed.
 
@@ -73,6 +97,7 @@ Abbreviations
         """
         mplAxes.__init__(self, fig, rect, **kwargs)
         self._sigs = {}
+        self.callbacks.connect('xlim_changed', self._on_xlim_changed)
 
         if isinstance(sigs, Graph):
             mysigs = {}
@@ -145,8 +170,7 @@ Abbreviations
                 fy, l = self._find_scale_factor("Y")
                 x = s.ref.data.real * pow(10, fx)
                 y = s.data.real * pow(10, fy)
-                line, = self.plot(x, y, label=sn)
-                self._signals2lines[sn] = line
+                self._signals2lines[sn] = self._plot_signal(sn, x, y)
                 self._draw_cursors()
                 self._print_cursors()
                 self.legend()
@@ -159,8 +183,7 @@ Abbreviations
                     fy, l = self._find_scale_factor("Y")
                     x = s.ref.data.real * pow(10, fx)
                     y = s.data.real * pow(10, fy)
-                    line, = self.plot(x, y, label=sn)
-                    self._signals2lines[sn] = line
+                    self._signals2lines[sn] = self._plot_signal(sn, x, y)
                     self.legend()
                 else:
                     # Ignore signal
@@ -183,7 +206,8 @@ Abbreviations
         for sn in sigs.keys():
             if sn in list(self._sigs.keys()):
                 del self._sigs[sn]
-                self._signals2lines[sn].remove()
+                for line in self._signals2lines[sn]:
+                    line.remove()
                 self.plot()
                 self.legend()
                 del self._signals2lines[sn]
@@ -206,9 +230,73 @@ Abbreviations
             fy, l = self._find_scale_factor("Y")
             x = s.ref.data.real * pow(10, fx)
             y = s.data.real * pow(10, fy)
-            self._signals2lines[sn].set_xdata(x)
-            self._signals2lines[sn].set_ydata(y)            
-    
+            lines = self._signals2lines[sn]
+            data = _sweeps(x, y)
+            if len(data) != len(lines):
+                # Number of sweeps changed, draw the Signal again
+                for line in lines:
+                    line.remove()
+                self._signals2lines[sn] = self._plot_signal(sn, x, y)
+                continue
+            for (line, (xs, ys)) in zip(lines, data):
+                line.set_xdata(xs)
+                line.set_ydata(ys)
+
+    def _plot_signal(self, sn, x, y):
+        """ Draw the data of a Signal, one line per sweep for families
+        i.e. Signals with (sweeps x points) data, all with the same color
+
+        Parameters
+        ----------
+        sn: string
+        Name of the Signal, used as label
+
+        x, y: numpy.ndarray
+        The scaled data of the reference and of the Signal
+
+        Returns
+        -------
+        list of Line2D
+        The lines drawn
+        """
+        lines = []
+        for (xs, ys) in _sweeps(x, y):
+            if not lines:
+                lines.extend(self.plot(xs, ys, label=sn))
+            else:
+                lines.extend(self.plot(xs, ys, label='_nolegend_',
+                                       color=lines[0].get_color()))
+        return lines
+
+    def _on_xlim_changed(self, ax):
+        """ Load the full resolution data of the preview Signals when the
+        view contains only a part of the preview points and less of them than
+        pixels
+
+        Parameter
+        ---------
+        ax: Graph
+        The Graph whose X axis limits changed
+
+        Returns
+        -------
+        Nothing
+        """
+        (xmin, xmax) = self.get_xbound()
+        loaded = False
+        for sn, s in self._sigs.items():
+            lines = self._signals2lines.get(sn)
+            if not lines or not s.preview:
+                continue
+            x = numpy.asarray(lines[0].get_xdata())
+            n = numpy.count_nonzero((x >= xmin) & (x <= xmax))
+            if n < len(x) and n < self.bbox.width:
+                s.load_full()
+                loaded = True
+        if loaded:
+            self.update_signals()
+            self.figure.canvas.draw_idle()
+
     def _find_scale_factor(self, a):
         """ Choose the right scale for data on axis a
         Return the scale factor (f) and a string with the label. (l)
@@ -241,11 +329,12 @@ Abbreviations
 
         for s in self._sigs.values():
             if a == "X":
-                mxs.append(max(s.ref.data.real))
-                mns.append(min(s.ref.data.real))
+                mxs.append(numpy.nanmax(s.ref.data.real))
+                mns.append(numpy.nanmin(s.ref.data.real))
             else:
-                mxs.append(max(s.data.real))
-                mns.append(min(s.data.real))
+                # Families are padded with NaN
+                mxs.append(numpy.nanmax(s.data.real))
+                mns.append(numpy.nanmin(s.data.real))
         mx = abs(max(mxs))
         mn = abs(min(mns))
         mx = max(mx, mn)
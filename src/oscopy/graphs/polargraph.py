@@ -100,8 +100,7 @@ class PolarGraph(Graph, PolarAxes):
                 fy, l = self._find_scale_factor("Y")
                 x = s.ref.data.real * pow(10, fx)
                 y = s.data.real * pow(10, fy)
-                line, = self.plot(x, y, label=sn)
-                self._signals2lines[sn] = line
+                self._signals2lines[sn] = self._plot_signal(sn, x, y)
                 self._draw_cursors()
                 self._print_cursors()
                 self.legend()
@@ -114,8 +113,7 @@ class PolarGraph(Graph, PolarAxes):
                     fy, l = self._find_scale_factor("Y")
                     x = s.ref.data.real * pow(10, fx)
                     y = s.data.real * pow(10, fy)
-                    line, = self.plot(x, y, label=sn)
-                    self._signals2lines[sn] = line
+                    self._signals2lines[sn] = self._plot_signal(sn, x, y)
                     self.legend()
                 else:
                     # Ignore signal
@@ -106,8 +106,7 @@ class SmithChart(Graph, SmithAxes):
                 fy, l = self._find_scale_factor("Y")
                 x = s.data.real
                 y = s.data.imag
-                line, = self.plot(x, y, label=sn)
-                self._signals2lines[sn] = line
+                self._signals2lines[sn] = self._plot_signal(sn, x, y)
                 self._draw_cursors()
                 self._print_cursors()
                 self.legend()
@@ -120,8 +119,7 @@ class SmithChart(Graph, SmithAxes):
 #                    fy, l = self._find_scale_factor("Y")
                     x = s.data.real
                     y = s.data.imag
-                    line, = self.plot(x, y, label=sn)
-                    self._signals2lines[sn] = line
+                    self._signals2lines[sn] = self._plot_signal(sn, x, y)
                     self.legend()
                 else:
                     # Ignore signal
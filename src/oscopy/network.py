@@ -0,0 +1,797 @@
+""" Network parameters operations on Signals
+
+A network is described by the n x n Signals Xij, where X is the parameter
+(S, Y, Z or ABCD) and i, j the port indices, as returned by TouchstoneReader.
+All the Signals of a network share the same Reference Signal, the frequency.
+
+Operations are done as batched matrix algebra on a (frequencies x ports x
+ports) complex array, for all frequencies at once. The resulting Signals
+track the changes of the Signals of the network, as for arithmetic
+operations: the network is recomputed once by an intermediate Signal
+holding the whole array, each resulting Signal being an element of it.
+
+2-port networks can be cascaded and de-embedded, after linear interpolation
+on a common frequencies grid, as products of scattering transfer (T)
+matrices. The resulting S-parameters Signals can be inserted in a SmithChart
+or a LinGraph as any other Signal.
+
+Impulse and step responses of a parameter, e.g. S21, are computed by inverse
+FFT and memoized per Signal, window, length and frequency step.
+
+Reference impedances z0 are real, either one value for all ports or one value
+per port, e.g. TouchstoneReader info['reference'].
+"""
+
+import re
+import weakref
+import functools
+import numpy
+from .signal import Signal
+
+PARAMS = ['S', 'Y', 'Z', 'ABCD']
+UNITS = {'S': 'a.u.', 'Y': 'S', 'Z': 'Ohm'}
+ABCD_UNITS = [['a.u.', 'Ohm'], ['S', 'a.u.']]
+NAME_RE = re.compile('^(%s)(?:(\\d)(\\d)|(\\d+)_(\\d+))$' % '|'.join(PARAMS))
+
+def param_name(param, i, j, nports):
+    """ Return the name of parameter at row i and column j
+
+    Parameters
+    ----------
+    param: string
+    The parameter, e.g. 'S'
+
+    i, j: int
+    The indices, starting from 1
+
+    nports: int
+    The number of ports, beyond 9 indices are separated by '_'
+
+    Returns
+    -------
+    string
+    The name of the parameter, e.g. S21
+    """
+    return ('%s%d%d' if nports < 10 else '%s%d_%d') % (param, i, j)
+
+def get_network(sigs, param=None):
+    """ Gather the Signals of a network into a matrix
+
+    Parameters
+    ----------
+    sigs: dict or list of Signals
+    The Signals of the network, other Signals are ignored
+
+    param: string
+    The parameter to look for, e.g. 'S'. If None, the first parameter
+    found is used
+
+    Returns
+    -------
+    tuple:
+       param: string, the parameter found
+       matrix: list of lists of Signals, matrix[i][j] is Signal Xi+1j+1
+
+    Raises
+    ------
+    ValueError
+    No network or incomplete network found
+    """
+    if isinstance(sigs, dict):
+        sigs = list(sigs.values())
+    found = {}
+    for s in sigs:
+        m = NAME_RE.match(s.name)
+        if m is None or (param is not None and m.group(1) != param):
+            continue
+        param = m.group(1)
+        (i, j) = (m.group(2), m.group(3)) if m.group(2) else\
+            (m.group(4), m.group(5))
+        found[(int(i) - 1, int(j) - 1)] = s
+    if not found:
+        raise ValueError(_('network: no network parameter found'))
+    nports = int(round(numpy.sqrt(len(found))))
+    try:
+        return (param, [[found[(i, j)] for j in range(nports)]
+                        for i in range(nports)])
+    except KeyError:
+        raise ValueError(_('network: incomplete %s matrix') % param)
+
+def to_array(matrix):
+    """ Stack the data of a matrix of Signals into a (frequencies x ports x
+    ports) array
+
+    Parameter
+    ---------
+    matrix: list of lists of Signals
+    The Signals of the network, as returned by get_network()
+
+    Returns
+    -------
+    numpy.ndarray
+    The network data
+    """
+    n = len(matrix)
+    return numpy.stack([s.data for row in matrix for s in row],
+                       axis=-1).reshape(-1, n, n)
+
+def _z0(z0, nports):
+    """ Return z0 as a one value per port array
+    """
+    return numpy.broadcast_to(numpy.asarray(z0, dtype=float), (nports,))
+
+def _solve_right(a, b):
+    """ Return b . a^-1 for stacked matrices
+    """
+    return numpy.linalg.solve(a.swapaxes(-1, -2),
+                              b.swapaxes(-1, -2)).swapaxes(-1, -2)
+
+def s_to_z(s, z0=50):
+    """ Convert S-parameters into Z-parameters, Z = G (I - S)^-1 (I + S) G
+    with G = diag(sqrt(z0))
+    """
+    i = numpy.eye(s.shape[-1])
+    g = numpy.sqrt(_z0(z0, s.shape[-1]))
+    return g[:, None] * numpy.linalg.solve(i - s, i + s) * g
+
+def z_to_s(z, z0=50):
+    """ Convert Z-parameters into S-parameters,
+    S = (G^-1 Z G^-1 + I)^-1 (G^-1 Z G^-1 - I)
+    """
+    i = numpy.eye(z.shape[-1])
+    g = numpy.sqrt(_z0(z0, z.shape[-1]))
+    zn = z / g[:, None] / g
+    return numpy.linalg.solve(zn + i, zn - i)
+
+def s_to_y(s, z0=50):
+    """ Convert S-parameters into Y-parameters,
+    Y = G^-1 (I + S)^-1 (I - S) G^-1
+    """
+    i = numpy.eye(s.shape[-1])
+    g = numpy.sqrt(_z0(z0, s.shape[-1]))
+    return numpy.linalg.solve(i + s, i - s) / g[:, None] / g
+
+def y_to_s(y, z0=50):
+    """ Convert Y-parameters into S-parameters, S = (I + G Y G)^-1 (I - G Y G)
+    """
+    i = numpy.eye(y.shape[-1])
+    g = numpy.sqrt(_z0(z0, y.shape[-1]))
+    yn = y * g[:, None] * g
+    return numpy.linalg.solve(i + yn, i - yn)
+
+def s_to_abcd(s, z0=50):
+    """ Convert 2-port S-parameters into ABCD-parameters
+    """
+    (s11, s12, s21, s22) = (s[:, 0, 0], s[:, 0, 1], s[:, 1, 0], s[:, 1, 1])
+    (z1, z2) = _z0(z0, 2)
+    abcd = numpy.empty(s.shape, dtype=complex)
+    abcd[:, 0, 0] = ((1 + s11) * (1 - s22) + s12 * s21) * numpy.sqrt(z1 / z2)
+    abcd[:, 0, 1] = ((1 + s11) * (1 + s22) - s12 * s21) * numpy.sqrt(z1 * z2)
+    abcd[:, 1, 0] = ((1 - s11) * (1 - s22) - s12 * s21) / numpy.sqrt(z1 * z2)
+    abcd[:, 1, 1] = ((1 - s11) * (1 + s22) + s12 * s21) * numpy.sqrt(z2 / z1)
+    return abcd / (2 * s21[:, None, None])
+
+def abcd_to_s(abcd, z0=50):
+    """ Convert 2-port ABCD-parameters into S-parameters
+    """
+    (z1, z2) = _z0(z0, 2)
+    a = abcd[:, 0, 0] * numpy.sqrt(z2 / z1)
+    b = abcd[:, 0, 1] / numpy.sqrt(z1 * z2)
+    c = abcd[:, 1, 0] * numpy.sqrt(z1 * z2)
+    d = abcd[:, 1, 1] * numpy.sqrt(z1 / z2)
+    s = numpy.empty(abcd.shape, dtype=complex)
+    s[:, 0, 0] = a + b - c - d
+    s[:, 0, 1] = 2 * (a * d - b * c)
+    s[:, 1, 0] = 2
+    s[:, 1, 1] = -a + b - c + d
+    return s / (a + b + c + d)[:, None, None]
+
+TO_S = {'S': lambda x, z0: x, 'Z': z_to_s, 'Y': y_to_s, 'ABCD': abcd_to_s}
+FROM_S = {'S': lambda x, z0: x, 'Z': s_to_z, 'Y': s_to_y, 'ABCD': s_to_abcd}
+
+def _convert(x, param, to, z0):
+    """ Convert a network array from param to parameter to
+    """
+    return FROM_S[to](TO_S[param](x, z0), z0)
+
+def _renormalize(s, z0, z0_new):
+    """ Change the reference impedances of S-parameters,
+    S' = K (S - R) (I - R S)^-1 K^-1 with R the reflection coefficients of
+    z0_new relative to z0 and K = diag((z0 + z0_new) / (2 sqrt(z0 z0_new)))
+    """
+    n = s.shape[-1]
+    (z0, z0_new) = (_z0(z0, n), _z0(z0_new, n))
+    r = numpy.diag((z0_new - z0) / (z0_new + z0))
+    k = (z0 + z0_new) / (2 * numpy.sqrt(z0 * z0_new))
+    return k[:, None] * _solve_right(numpy.eye(n) - r @ s, s - r) / k
+
+# Scale of the differential and common mode rows of the mixed-mode
+# transformation matrix: orthogonal for waves, Vd = Vp - Vn and
+# Vc = (Vp + Vn) / 2 for voltages, Id = (Ip - In) / 2 and Ic = Ip + In for
+# currents
+MIXED_MODE_SCALES = {'S': (numpy.sqrt(0.5), numpy.sqrt(0.5)),
+                     'Z': (1.0, 0.5), 'Y': (0.5, 1.0)}
+
+def _mixed_mode_matrix(nports, pairs, scales):
+    """ Return the matrix transforming single-ended waves, voltages or
+    currents into differential then common mode ones, the rows being scaled
+    by the differential and common mode scales
+    """
+    (d, c) = scales
+    m = numpy.zeros((nports, nports))
+    for k, (p, n) in enumerate(pairs):
+        (m[k, p - 1], m[k, n - 1]) = (d, -d)
+        m[len(pairs) + k, p - 1] = m[len(pairs) + k, n - 1] = c
+    return m
+
+def _mixed_mode(x, m):
+    """ Convert a single-ended network array to mixed-mode, M X M^T
+    M being the transformation matrix of waves for S, of voltages for Z and
+    of currents for Y
+    """
+    return m @ x @ m.T
+
+def _element(data, ij):
+    """ Return the element ij of a network array, for all frequencies
+    """
+    return data[:, ij[0], ij[1]]
+
+def _compute(matrices, func):
+    """ Stack the data of the matrices of Signals of the networks and apply
+    func
+    """
+    return func(*[to_array(m) for m in matrices])
+
+def _connect(source, dest):
+    """ Make dest a Listener of source, as done for arithmetic operations
+    """
+    source.connect('changed', dest.on_changed, source)
+    source.connect('begin-transaction', dest.on_begin_transaction)
+    source.connect('end-transaction', dest.on_end_transaction)
+
+def network_signals(matrices, func, name, names, units, ref=None):
+    """ Apply func to networks and return the result as a matrix of Signals
+    tracking the changes of the networks Signals
+
+    An intermediate Signal named name holds the resulting (frequencies x
+    ports x ports) array and is recomputed once when Signals of the networks
+    change. Each resulting Signal is then recomputed as an element of it.
+
+    Parameters
+    ----------
+    matrices: list of lists of lists of Signals
+    The Signals of each network, as returned by get_network()
+
+    func: function
+    Function taking one array per network and returning the resulting array
+
+    name: string
+    Name of the intermediate Signal
+
+    names: list of lists of strings
+    Names of the resulting Signals
+
+    units: list of lists of strings
+    Units of the resulting Signals
+
+    ref: Signal
+    The Reference Signal of the result, if None the one of the first network
+
+    Returns
+    -------
+    dict of Signals
+    The resulting Signals, by name
+    """
+    first = matrices[0][0][0]
+    if ref is None:
+        ref = first.ref if first.ref is not None else first
+    net = Signal(name, None)
+    net.data = _compute(matrices, func)
+    net.ref = ref
+    net.freeze = first.freeze
+    for m in matrices:
+        for row in m:
+            for s in row:
+                _connect(s, net)
+    net.connect('recompute', net.on_recompute, (_compute, matrices, func))
+
+    ret = {}
+    for i, row in enumerate(names):
+        for j, n in enumerate(row):
+            s = Signal(n, units[i][j])
+            s.data = net.data[:, i, j]
+            s.ref = ref
+            s.freeze = first.freeze
+            _connect(net, s)
+            s.connect('recompute', s.on_recompute, (_element, net, (i, j)))
+            ret[n] = s
+    return ret
+
+def convert(sigs, to, z0=50, param=None):
+    """ Convert network parameters from one kind to another, e.g. S to Z
+
+    Parameters
+    ----------
+    sigs: dict or list of Signals
+    The Signals of the network
+
+    to: string
+    The parameter to convert to, one of 'S', 'Y', 'Z', 'ABCD'
+
+    z0: float or list of floats
+    The reference impedance, one for all ports or one per port
+
+    param: string
+    The parameter of the network, if None use the first one found
+
+    Returns
+    -------
+    dict of Signals
+    The Signals of the converted network, e.g. Z11, Z12...
+
+    Raises
+    ------
+    ValueError
+    Unsupported parameter, ABCD with more than 2 ports, or no network found
+    """
+    (param, matrix) = get_network(sigs, param)
+    nports = len(matrix)
+    if to not in PARAMS:
+        raise ValueError(_('network: unsupported parameter \'%s\'') % to)
+    if 'ABCD' in (param, to) and nports != 2:
+        raise ValueError(_('network: ABCD parameters are for 2-port only'))
+    names = [[param_name(to, i + 1, j + 1, nports) for j in range(nports)]
+             for i in range(nports)]
+    units = ABCD_UNITS if to == 'ABCD' else [[UNITS[to]] * nports] * nports
+    func = functools.partial(_convert, param=param, to=to, z0=z0)
+    return network_signals([matrix], func, '%s(%s)' % (to, param), names,
+                           units)
+
+def renormalize(sigs, z0_new, z0=50):
+    """ Change the reference impedances of S-parameters
+
+    Parameters
+    ----------
+    sigs: dict or list of Signals
+    The Signals of the network, S-parameters
+
+    z0_new: float or list of floats
+    The new reference impedance, one for all ports or one per port
+
+    z0: float or list of floats
+    The reference impedance of the network
+
+    Returns
+    -------
+    dict of Signals
+    The Signals of the renormalized network, Sij
+    """
+    (param, matrix) = get_network(sigs, 'S')
+    nports = len(matrix)
+    names = [[param_name('S', i + 1, j + 1, nports) for j in range(nports)]
+             for i in range(nports)]
+    units = [[UNITS['S']] * nports] * nports
+    func = functools.partial(_renormalize, z0=z0, z0_new=z0_new)
+    return network_signals([matrix], func, 'S(%s)' % z0_new, names,
+                           units)
+
+def mixed_mode(sigs, pairs=None, param='S'):
+    """ Convert a single-ended network into mixed-mode parameters
+
+    Ports p and n of each pair form a differential port. The resulting
+    network is ordered with differential ports first then common mode ports,
+    giving the XDDij, XDCij, XCDij and XCCij Signals where i, j are the
+    indices of the pairs. Reference impedance of both ports of a pair is
+    assumed equal, mixed-mode reference impedances being then 2 z0 for
+    differential mode and z0 / 2 for common mode.
+
+    Differential and common mode voltages and currents are
+    Vd = Vp - Vn, Vc = (Vp + Vn) / 2, Id = (Ip - In) / 2 and Ic = Ip + In,
+    so that two uncoupled lines of impedance z0 have ZDD = 2 z0 and
+    ZCC = z0 / 2, consistently with the reference impedances of S.
+
+    Parameters
+    ----------
+    sigs: dict or list of Signals
+    The Signals of the network
+
+    pairs: list of tuples of int
+    The (p, n) port pairs, starting from 1. Default is consecutive ports,
+    i.e. [(1, 2), (3, 4), ...]
+
+    param: string
+    The parameter of the network, 'S', 'Z' or 'Y'
+
+    Returns
+    -------
+    dict of Signals
+    The Signals of the mixed-mode network
+
+    Raises
+    ------
+    ValueError
+    Ports not all paired, no network found or parameter not supported
+    """
+    (param, matrix) = get_network(sigs, param)
+    if param not in MIXED_MODE_SCALES:
+        raise ValueError(_('network: no mixed-mode %s parameters') % param)
+    nports = len(matrix)
+    if pairs is None:
+        pairs = [(p, p + 1) for p in range(1, nports, 2)]
+    ports = sorted(p for pair in pairs for p in pair)
+    if ports != list(range(1, nports + 1)):
+        raise ValueError(_('network: all ports shall be paired once'))
+    npairs = len(pairs)
+    modes = ['D'] * npairs + ['C'] * npairs
+    names = [[param_name(param + modes[i] + modes[j], i % npairs + 1,
+                         j % npairs + 1, npairs) for j in range(nports)]
+             for i in range(nports)]
+    units = [[UNITS.get(param, 'a.u.')] * nports] * nports
+    func = functools.partial(_mixed_mode,
+                             m=_mixed_mode_matrix(nports, pairs,
+                                                  MIXED_MODE_SCALES[param]))
+    return network_signals([matrix], func, '%smm' % param, names, units)
+
+def s_to_t(s):
+    """ Convert 2-port S-parameters into scattering transfer parameters,
+    [b1, a1] = T [a2, b2]
+    """
+    (s11, s12, s21, s22) = (s[:, 0, 0], s[:, 0, 1], s[:, 1, 0], s[:, 1, 1])
+    t = numpy.empty(s.shape, dtype=complex)
+    t[:, 0, 0] = s12 * s21 - s11 * s22
+    t[:, 0, 1] = s11
+    t[:, 1, 0] = -s22
+    t[:, 1, 1] = 1
+    return t / s21[:, None, None]
+
+def t_to_s(t):
+    """ Convert 2-port scattering transfer parameters into S-parameters
+    """
+    (t11, t12, t21, t22) = (t[:, 0, 0], t[:, 0, 1], t[:, 1, 0], t[:, 1, 1])
+    s = numpy.empty(t.shape, dtype=complex)
+    s[:, 0, 0] = t12
+    s[:, 0, 1] = t11 * t22 - t12 * t21
+    s[:, 1, 0] = 1
+    s[:, 1, 1] = -t21
+    return s / t22[:, None, None]
+
+def _interpolate(x, freq, grid):
+    """ Linear interpolation of a network array on frequencies grid
+    """
+    idx = numpy.clip(numpy.searchsorted(freq, grid), 1, len(freq) - 1)
+    w = ((grid - freq[idx - 1]) / (freq[idx] - freq[idx - 1]))[:, None, None]
+    return x[idx - 1] * (1 - w) + x[idx] * w
+
+def _grid(refs):
+    """ Return the frequencies of the first network within the range common
+    to all networks
+    """
+    (fmin, fmax) = (max(r.data[0] for r in refs), min(r.data[-1] for r in refs))
+    freq = refs[0].data
+    return freq[(freq >= fmin) & (freq <= fmax)]
+
+def _chain(*nets, params, refs, grid, z0, sides):
+    """ Convert the networks to T-parameters on the frequencies grid and
+    multiply them, inverting the ones on sides -1 (left) and 1 (right)
+    """
+    (left, t, right) = (None, None, None)
+    for (x, param, ref, side) in zip(nets, params, refs, sides):
+        x = _interpolate(TO_S[param](x, z0), ref.data, grid)
+        x = s_to_t(x)
+        if side < 0:
+            left = x if left is None else left @ x
+        elif side > 0:
+            right = x if right is None else right @ x
+        else:
+            t = x if t is None else t @ x
+    if left is not None:
+        t = numpy.linalg.solve(left, t)
+    if right is not None:
+        t = _solve_right(right, t)
+    return t_to_s(t)
+
+def _chain_signals(networks, sides, z0, freq, name):
+    """ Gather the 2-port networks, build the frequencies grid and return the
+    Signals of the chained network
+    """
+    (params, matrices) = ([], [])
+    for sigs in networks:
+        (param, matrix) = get_network(sigs)
+        if len(matrix) != 2:
+            raise ValueError(_('network: only 2-port networks can be chained'))
+        params.append(param)
+        matrices.append(matrix)
+    refs = [m[0][0].ref for m in matrices]
+    ref = Signal('Frequency', 'Hz')
+    ref.data = numpy.asarray(freq, dtype=float) if freq is not None\
+        else _grid(refs)
+    if not len(ref.data):
+        raise ValueError(_('network: no common frequency range'))
+    names = [[param_name('S', i + 1, j + 1, 2) for j in range(2)]
+             for i in range(2)]
+    units = [[UNITS['S']] * 2] * 2
+    func = functools.partial(_chain, params=params, refs=refs, grid=ref.data,
+                             z0=z0, sides=sides)
+    return network_signals(matrices, func, name, names, units, ref)
+
+def interpolate(sigs, freq, param=None):
+    """ Interpolate linearly a network on new frequencies
+
+    Parameters
+    ----------
+    sigs: dict or list of Signals
+    The Signals of the network
+
+    freq: list or numpy.ndarray
+    The new frequencies, within the range of the network
+
+    param: string
+    The parameter of the network, if None use the first one found
+
+    Returns
+    -------
+    dict of Signals
+    The Signals of the interpolated network
+    """
+    (param, matrix) = get_network(sigs, param)
+    nports = len(matrix)
+    names = [[param_name(param, i + 1, j + 1, nports) for j in range(nports)]
+             for i in range(nports)]
+    units = [[s.unit for s in row] for row in matrix]
+    ref = Signal('Frequency', 'Hz')
+    ref.data = numpy.asarray(freq, dtype=float)
+    func = functools.partial(_interpolate, freq=matrix[0][0].ref.data,
+                             grid=ref.data)
+    return network_signals([matrix], func, '%s(%s)' % (param, ref.name),
+                           names, units, ref)
+
+def cascade(*networks, z0=50, freq=None):
+    """ Cascade 2-port networks, port 2 of each network being connected to
+    port 1 of the next one
+
+    Networks are interpolated on a common frequencies grid and converted to
+    scattering transfer parameters, the cascade being their product.
+
+    Parameters
+    ----------
+    networks: dicts or lists of Signals
+    The Signals of each network, S, Y, Z or ABCD parameters
+
+    z0: float or list of floats
+    The reference impedance of all networks, one for all ports or one per
+    port. Use renormalize() beforehand for networks with other references
+
+    freq: list or numpy.ndarray
+    The frequencies of the result. If None, the frequencies of the first
+    network within the range common to all networks
+
+    Returns
+    -------
+    dict of Signals
+    The S-parameters Signals of the cascaded network
+
+    Raises
+    ------
+    ValueError
+    Not a 2-port network, or no common frequency range
+
+    Examples
+    --------
+    >>> fixture = TouchstoneReader().read('fixture.s2p')
+    >>> package = TouchstoneReader().read('package.s2p')
+    >>> channel = network.cascade(fixture, package)
+    >>> channel['S21']
+    """
+    return _chain_signals(networks, [0] * len(networks), z0, freq, 'cascade')
+
+def deembed(sigs, left=None, right=None, z0=50, freq=None):
+    """ De-embed fixtures from a 2-port network, i.e. return the network
+    that cascaded between left and right would give the measured network
+
+    Parameters
+    ----------
+    sigs: dict or list of Signals
+    The Signals of the measured network
+
+    left: dict or list of Signals
+    The Signals of the fixture connected to port 1, or None
+
+    right: dict or list of Signals
+    The Signals of the fixture connected to port 2, or None
+
+    z0: float or list of floats
+    The reference impedance of all networks
+
+    freq: list or numpy.ndarray
+    The frequencies of the result. If None, the frequencies of the measured
+    network within the range common to all networks
+
+    Returns
+    -------
+    dict of Signals
+    The S-parameters Signals of the de-embedded network
+    """
+    (networks, sides) = ([sigs], [0])
+    if left is not None:
+        (networks, sides) = (networks + [left], sides + [-1])
+    if right is not None:
+        (networks, sides) = (networks + [right], sides + [1])
+    return _chain_signals(networks, sides, z0, freq, 'deembed')
+
+# Time domain responses already computed, by source Signal then by
+# (window, length, df)
+_responses = weakref.WeakKeyDictionary()
+
+# Maximum number of points of the uniform frequency grid and of the
+# responses
+IMPULSE_MAX_POINTS = 1 << 22
+
+def _frequency_step(freq, df=None):
+    """ Return the step of the uniform frequency grid, df if set or the mean
+    step of freq, i.e. the step of a linear sweep
+    """
+    if df is None:
+        df = (freq[-1] - freq[0]) / (len(freq) - 1)
+    return float(df)
+
+def _spectrum(data, freq, df):
+    """ Return the spectrum resampled on a uniform grid of step df starting
+    from DC
+
+    If freq does not start at DC, the DC value is extrapolated linearly from
+    the real part of the two first points, its imaginary part being null.
+    """
+    freq = numpy.asarray(freq, dtype=float)
+    data = numpy.asarray(data, dtype=complex)
+    if freq[0] > 0:
+        slope = (data[1].real - data[0].real) / (freq[1] - freq[0])
+        freq = numpy.concatenate(([0], freq))
+        data = numpy.concatenate(([data[0].real - slope * freq[1]], data))
+    grid = numpy.arange(int(freq[-1] / df + 1e-6) + 1) * df
+    return _interpolate(data[:, None, None], freq, grid)[:, 0, 0]
+
+def _check_grid(freq, df, length):
+    """ Raise ValueError if the frequency step is not positive or if the
+    grid or the responses would have more than IMPULSE_MAX_POINTS points
+    """
+    if not df > 0:
+        raise ValueError(_('network: frequency step shall be positive'))
+    points = int(freq[-1] / df + 1e-6) + 1
+    if max(points, length or 0) > IMPULSE_MAX_POINTS:
+        raise ValueError(_('network: %d points needed, more than %d, increase'
+                           ' the frequency step') %
+                         (max(points, length or 0), IMPULSE_MAX_POINTS))
+
+def _window(name, n):
+    """ Return the decreasing half of a numpy window of 2n - 1 points, e.g.
+    'hamming', or ones if name is None
+    """
+    if name is None:
+        return numpy.ones(n)
+    return getattr(numpy, name)(2 * n - 1)[n - 1:]
+
+def _impulse(data, freq, window, length, df):
+    """ Return the impulse response of a spectrum, by band-limited inverse
+    FFT of the windowed spectrum on length points
+    """
+    df = _frequency_step(freq, df)
+    _check_grid(freq, df, length)
+    h = _spectrum(data, freq, df)
+    h = h * _window(window, len(h))
+    return numpy.fft.irfft(h, length if length else 2 * (len(h) - 1))
+
+def _time(n, df):
+    """ Return the time of the n points of the impulse response of the
+    spectrum of frequency step df
+    """
+    return numpy.arange(n) / (n * df)
+
+def _recompute_impulse(impulse, args):
+    """ Recompute the impulse response and its Time reference when the
+    source parameter changed
+
+    The source is held through a weak reference so that entries of the
+    memo of impulse_response() expire with it.
+    """
+    (source, func, df) = args
+    sig = source()
+    if sig is None or not impulse.to_recompute or impulse.in_transaction > 0\
+            or impulse.freeze:
+        return
+    data = func(sig.data, sig.ref.data)
+    impulse.ref.data = _time(len(data), _frequency_step(sig.ref.data, df))
+    impulse.data = data
+    impulse.to_recompute = False
+
+def _step(data, other=None):
+    """ Return the step response from the impulse response
+    """
+    return numpy.cumsum(data)
+
+def impulse_response(sig, window='hamming', length=None, df=None):
+    """ Compute the impulse and step responses of a parameter, e.g. S21
+
+    The spectrum is resampled by linear interpolation on a uniform frequency
+    grid of step df from DC, with DC value extrapolated from the lowest
+    frequencies when missing, multiplied by the decreasing half of the window
+    then transformed by inverse real FFT. Spectrum is band-limited to the
+    highest frequency, i.e. the time step is 1 / (length * df), a length
+    longer than twice the number of frequencies interpolating the responses.
+    The responses span 1 / df.
+    The impulse response is the one of the sampled system, so the step
+    response is its cumulative sum and tends to the DC value.
+
+    By default df is the step of a linear sweep with the same range and
+    number of points, so that logarithmic sweeps are resampled on about as
+    many frequencies. The grid and the responses are limited to
+    IMPULSE_MAX_POINTS points.
+
+    Results are memoized on (sig, window, length, df): the same Signals are
+    returned on subsequent calls and are recomputed only when sig changes.
+
+    Parameters
+    ----------
+    sig: Signal
+    The parameter, with the frequencies as Reference Signal
+
+    window: string
+    Name of the numpy window function, e.g. 'hamming', 'hanning',
+    'blackman', or None for no window
+
+    length: int
+    Number of points of the responses, if None twice the number of
+    frequencies of the uniform grid
+
+    df: float
+    Frequency step of the uniform grid, if None (fmax - fmin) / (N - 1)
+    for N frequencies
+
+    Returns
+    -------
+    tuple of Signals:
+       impulse: the impulse response
+       step: the step response
+
+    Raises
+    ------
+    ValueError
+    Unknown window, less than two frequencies, frequency step not positive
+    or more than IMPULSE_MAX_POINTS points needed
+
+    Examples
+    --------
+    >>> sigs = TouchstoneReader().read('channel.s2p')
+    >>> (impulse, step) = network.impulse_response(sigs['S21'])
+    >>> step.ref.unit
+    's'
+    """
+    key = (window, length, df)
+    cache = _responses.setdefault(sig, {})
+    if key in cache:
+        return cache[key]
+    if window is not None and not callable(getattr(numpy, str(window), None)):
+        raise ValueError(_('network: unknown window \'%s\'') % window)
+    if len(sig.data) < 2:
+        raise ValueError(_('network: at least two frequencies needed'))
+
+    freq = sig.ref.data
+    func = functools.partial(_impulse, window=window, length=length, df=df)
+    impulse = Signal('impulse(%s)' % sig.name, 'a.u.')
+    impulse.data = func(sig.data, freq)
+    time = Signal('Time', 's')
+    time.data = _time(len(impulse.data), _frequency_step(freq, df))
+    impulse.ref = time
+    impulse.freeze = sig.freeze
+    _connect(sig, impulse)
+    impulse.connect('recompute', _recompute_impulse,
+                    (weakref.ref(sig), func, df))
+
+    step = Signal('step(%s)' % sig.name, 'a.u.')
+    step.data = _step(impulse.data)
+    step.ref = time
+    step.freeze = sig.freeze
+    _connect(impulse, step)
+    step.connect('recompute', step.on_recompute, (_step, impulse, None))
+
+    cache[key] = (impulse, step)
+    return cache[key]
@@ -0,0 +1,248 @@
+""" Binary cache of the Signals read from text files
+
+Parsing text files is slow, so Readers with use_cache set store the Signals
+read in a binary sidecar, one directory per file read, in CACHE_DIR. The
+entry is keyed by the Reader class, the file path, size and modification
+time, so a modified file is parsed again. Next reads map the data from the
+cache instead of parsing the file.
+
+Each entry contains one .npy file per array, mapped copy-on-write when
+loaded, and an index.json describing the Signals, their references, the
+Reader info and the Reader attributes listed in _cache_attrs. The least
+recently used entries are removed when the total size goes beyond
+cache.max_size.
+
+The cache is disabled by default. It is enabled by setting the directory of
+the cache:
+
+>>> from oscopy.readers.cache import cache, CACHE_DIR
+>>> cache.path = CACHE_DIR
+"""
+
+import os
+import io
+import json
+import shutil
+import hashlib
+import tempfile
+import numpy
+from oscopy import Signal
+
+CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME',
+                                        os.path.expanduser('~/.cache')),
+                         'oscopy')
+CACHE_SIZE = 1 << 30
+CACHE_VERSION = 1
+
+# Info set by Reader.read(), not cached
+_NOT_CACHED = ['file', 'last_update', 'state', 'changes']
+
+class Cache(object):
+    """ Cache -- LRU cache of Signals read from files
+
+Properties
+    path        Directory of the cache, None to disable the cache
+    max_size    Maximum size of the cache in bytes
+    """
+    def __init__(self, path=CACHE_DIR, max_size=CACHE_SIZE):
+        """ Instanciate the cache
+
+        Parameters
+        ----------
+        path: string
+        Directory of the cache, created when needed. None disables the cache
+
+        max_size: int
+        Maximum size of the cache in bytes
+
+        Returns
+        -------
+        Cache
+        The object instanciated
+        """
+        self.path = path
+        self.max_size = max_size
+
+    def _entry(self, reader):
+        """ Return the directory of the entry for the file of the reader
+        """
+        st = os.stat(reader.info['file'])
+        key = '\0'.join((type(reader).__name__,
+                         os.path.abspath(reader.info['file']),
+                         str(st.st_size), str(st.st_mtime_ns),
+                         str(CACHE_VERSION)))
+        return os.path.join(self.path,
+                            hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def load(self, reader):
+        """ Fill in the reader Signals, info and attributes from the cache
+
+        Parameter
+        ---------
+        reader: Reader
+        The Reader, with info['file'] set
+
+        Returns
+        -------
+        bool
+        True if found in cache
+        """
+        if self.path is None:
+            return False
+        entry = self._entry(reader)
+        try:
+            with io.open(os.path.join(entry, 'index.json'), 'r') as f:
+                index = json.load(f)
+            sigs = []
+            for desc in index['signals']:
+                s = Signal(desc['name'], desc['unit'])
+                s.data = numpy.load(os.path.join(entry, desc['data']),
+                                    mmap_mode='c')
+                sigs.append(s)
+        except (IOError, OSError, ValueError, KeyError):
+            return False
+        for (s, desc) in zip(sigs, index['signals']):
+            if desc['ref'] is not None:
+                s.ref = sigs[desc['ref']]
+
+        def value(v):
+            if v['type'] == 'signals':
+                return dict((n, sigs[i]) for (n, i) in v['value'])
+            elif v['type'] == 'signal':
+                return sigs[v['value']]
+            elif v['type'] == 'array':
+                return numpy.load(os.path.join(entry, v['value']),
+                                  mmap_mode='c')
+            return v['value']
+        reader._signals = value(index['Signals'])
+        reader._info.update((k, value(v)) for (k, v) in index['info'].items())
+        for (k, v) in index['attrs'].items():
+            setattr(reader, k, value(v))
+        # Most recently used
+        os.utime(entry)
+        return True
+
+    def store(self, reader):
+        """ Store the reader Signals, info and attributes in the cache and
+        remove the least recently used entries if needed
+
+        Values other than Signals, dict of Signals, numpy.ndarray or JSON
+        serializable values are not stored.
+
+        Parameter
+        ---------
+        reader: Reader
+        The Reader, once the Signals read
+
+        Returns
+        -------
+        Nothing
+        """
+        if self.path is None:
+            return
+        entry = self._entry(reader)
+        if os.path.isdir(entry):
+            return
+        os.makedirs(self.path, exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=self.path, prefix='.tmp')
+        sigs = []
+        ids = {}
+        arrays = [0]
+
+        def save(data):
+            fn = '%d.npy' % arrays[0]
+            arrays[0] = arrays[0] + 1
+            numpy.save(os.path.join(tmp, fn), numpy.asarray(data),
+                       allow_pickle=False)
+            return fn
+
+        def add(s):
+            if id(s) not in ids:
+                ref = add(s.ref) if s.ref is not None else None
+                ids[id(s)] = len(sigs)
+                sigs.append({'name': s.name, 'unit': s.unit, 'ref': ref,
+                             'data': save(s.data)})
+            return ids[id(s)]
+
+        def describe(v):
+            if isinstance(v, Signal):
+                return {'type': 'signal', 'value': add(v)}
+            elif isinstance(v, dict) and v and\
+                    all(isinstance(s, Signal) for s in v.values()):
+                return {'type': 'signals',
+                        'value': [(n, add(s)) for (n, s) in v.items()]}
+            elif isinstance(v, numpy.ndarray):
+                return {'type': 'array', 'value': save(v)}
+            try:
+                json.dumps(v)
+            except (TypeError, ValueError):
+                return None
+            return {'type': 'value', 'value': v}
+
+        try:
+            index = {'Signals': describe(reader._signals) or
+                     {'type': 'value', 'value': {}}}
+            index['info'] = dict((k, describe(v))
+                                 for (k, v) in reader.info.items()
+                                 if k not in _NOT_CACHED)
+            index['attrs'] = dict((k, describe(getattr(reader, k, None)))
+                                  for k in reader._cache_attrs)
+            for d in (index['info'], index['attrs']):
+                for k in [k for (k, v) in d.items() if v is None]:
+                    del d[k]
+            index['signals'] = sigs
+            with io.open(os.path.join(tmp, 'index.json'), 'w') as f:
+                json.dump(index, f)
+            os.rename(tmp, entry)
+        except (IOError, OSError, ValueError):
+            # Cache not writable or entry created meanwhile
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        self.evict()
+
+    def evict(self):
+        """ Remove the least recently used entries until the size of the
+        cache is below max_size
+
+        Parameter
+        ---------
+        None
+
+        Returns
+        -------
+        Nothing
+        """
+        if self.path is None or not os.path.isdir(self.path):
+            return
+        entries = []
+        total = 0
+        for name in os.listdir(self.path):
+            entry = os.path.join(self.path, name)
+            if name.startswith('.') or not os.path.isdir(entry):
+                continue
+            size = sum(os.path.getsize(os.path.join(entry, fn))
+                       for fn in os.listdir(entry))
+            entries.append((os.path.getmtime(entry), size, entry))
+            total = total + size
+        for (mtime, size, entry) in sorted(entries):
+            if total <= self.max_size:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total = total - size
+
+    def clear(self):
+        """ Remove all the entries of the cache
+
+        Parameter
+        ---------
+        None
+
+        Returns
+        -------
+        Nothing
+        """
+        if self.path is not None:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+# The cache used by Readers, disabled until its path is set
+cache = Cache(None)
@@ -1,11 +1,10 @@
 
 
 import re
-import io
-from oscopy import Signal
-from .reader import Reader, ReadError
+from .reader import ReadError
+from .column_reader import ColumnReader
 
-class CazmReader(Reader):
+class CazmReader(ColumnReader):
     """ Read CaZM output files
 
 The header contains a signature, a blank line and then the analysis type (TRANSIENT, AC, TRANSFER), and finally the space separated variable names.
@@ -14,12 +13,15 @@ Afterwards follow the data in text format ordered by columns.
     _CAZM_ID_STRING = '* CAZM-format output'
     _names_to_units = {'Time': 's', 'time': 's'}
     
-    def detect(self, fn):
+    def sniff(self, head, fn):
         """ Look at the header, if it contains the signature in
         self._CAZM_ID_STRING
 
-        Parameter
-        ---------
+        Parameters
+        ----------
+        head: bytes
+        The head of the file
+
         fn: string
         Path to the file to test
 
@@ -28,76 +30,39 @@ Afterwards follow the data in text format ordered by columns.
         bool
         True if the file can be handled by this reader
         """
-        self._check(fn)
-        try:
-            f = io.open(fn, 'r')
-        except IOError as e:
-            return False
-        s = f.readline()
-        f.close()
-        return s.startswith(self._CAZM_ID_STRING)
+        return head.startswith(self._CAZM_ID_STRING.encode())
 
-    def _read_signals(self):
-        """ Read the signals from the file
-        First pass the file format signature
-        Then get the signal names from the first line, the abscisse
-        is the first column.
-        Finally read the data values, and finally, assign the abscisse and
-        data to each signal.
+    def _read_header(self, f):
+        """ Pass the file format signature, then get the signal names from
+        the first line, the abscisse is the first column.
 
         Parameter
         ---------
-        fn: string
-        The filename
+        f: file object
+        The file to read from, opened in binary mode
 
         Returns
         -------
-        Dict of Signals
-        The list of Signals read from the file
+        tuple:
+           names: list of strings, names of the Signals
+           units: list of strings, units of the Signals
 
         Raises
         ------
-        ReaderError
-        In case of invalid path or unsupported file format
+        ReadError
+        The file is not in CAZM format
         """
         units = []
         names = []
-        signals = []
-
-        with io.open(self._fn, 'r') as f:
-            lines = iter(f)
-
-            # read signal names
-            if not lines.next().startswith(self._CAZM_ID_STRING):
-                raise ReadError('File is not CAZM format')
-            next(lines) # Blank line
-            self._info['Analysis type'] = next(lines)
-            
-            first_line = next(lines)
-            for x in first_line.split():
-                name = x
-                names.append(name)
-                # Absolute Unit (a.u.) if no unit found
-                # this avoid confusion when calling Graph.set_unit()
-                unit = self._names_to_units.get(name, 'a.u.')
-                units.append(unit)
-                signals.append(Signal(name, unit))
-
-            # read values
-            data = [[] for x in range(len(names))]
-            # optimization: cache the append methods,
-            # avoiding one dictionary lookup per line
-            append = [x.append for x in data]
-            for values in lines:
-                for i, val in enumerate(values.split()):
-                    append[i](float(val))
-
-        ref = signals[0]
-        ref.data = data[0]
-        for i, s in enumerate(signals[1:]):
-            s.ref = ref
-            s.data = data[i + 1]
+        if not f.readline().decode('latin-1').startswith(self._CAZM_ID_STRING):
+            raise ReadError('File is not CAZM format')
+        f.readline() # Blank line
+        self._info['Analysis type'] = f.readline().decode('latin-1')
 
-        self._signals = dict(list(zip(names[1:], signals[1:])))
-        return self._signals
-        
+        first_line = f.readline().decode('latin-1')
+        for x in first_line.split():
+            names.append(x)
+            # Absolute Unit (a.u.) if no unit found
+            # this avoid confusion when calling Graph.set_unit()
+            units.append(self._names_to_units.get(x, 'a.u.'))
+        return (names, units)
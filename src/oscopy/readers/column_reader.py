@@ -0,0 +1,447 @@
+""" Common functions for text files ordered by columns
+"""
+
+import io
+import os
+import functools
+import warnings
+import concurrent.futures
+import numpy
+from oscopy import Signal
+from .reader import Reader, ReadError, grow_rows, compression
+
+def parse_columns(buf, ncols, cols=None, line=1):
+    """ Convert a buffer of text lines into a (rows x columns) array
+
+    The buffer is converted by numpy in C, in one call. The last line, if
+    not terminated by a newline, is ignored when incomplete, e.g. from a file
+    being written. If the number of values does not match the number of
+    lines, e.g. with blank lines, conversion is done line by line.
+    When cols is given, only the values of these columns are kept.
+
+    Parameters
+    ----------
+    buf: bytes
+    The lines to convert
+
+    ncols: int
+    The number of columns
+
+    cols: list of int
+    The columns to convert, None for all
+
+    line: int
+    Number of the first line in the file, for error messages
+
+    Returns
+    -------
+    numpy.ndarray
+    The values read, as a (rows x columns) float64 array
+
+    Raises
+    ------
+    ReadError
+    If a line other than the last one is not made of ncols numbers
+    """
+    cut = buf.rfind(b'\n') + 1
+    last = buf[cut:].split()
+    try:
+        if len(last) == ncols:
+            list(map(float, last))
+            cut = len(buf)
+    except ValueError:
+        pass
+    buf = buf[:cut]
+    nlines = buf.count(b'\n') + (1 if cut and not buf.endswith(b'\n') else 0)
+    try:
+        with warnings.catch_warnings():
+            # Conversion stops at the first invalid value with a warning
+            warnings.simplefilter('ignore', DeprecationWarning)
+            values = numpy.fromstring(buf, sep=' ')
+    except ValueError:
+        values = None
+    if values is not None and len(values) == nlines * ncols:
+        rows = values.reshape(nlines, ncols)
+        return rows if cols is None else rows[:, cols]
+
+    # Slow path, blank lines are ignored
+    rows = []
+    for (i, l) in enumerate(buf.splitlines()):
+        values = l.split()
+        if not values:
+            continue
+        try:
+            if len(values) != ncols:
+                raise ValueError
+            rows.append([float(x) for x in values])
+        except ValueError:
+            raise ReadError(_('column_reader: invalid data at line %d: %s')
+                            % (line + i, l.decode('latin-1').strip()))
+    rows = numpy.array(rows, dtype=float).reshape(-1, ncols)
+    return rows if cols is None else rows[:, cols]
+
+def parse_range(args):
+    """ Read a range of lines from a file and convert it into a (rows x
+    columns) array
+    Used to parse ranges of the data section in parallel.
+
+    Parameter
+    ---------
+    args: tuple
+       fn: string, path to the file
+       start: int, offset of the first line of the range
+       end: int, offset after the last line of the range
+       ncols: int, the number of columns
+       cols: list of int, the columns to convert, None for all
+
+    Returns
+    -------
+    tuple:
+       rows: numpy.ndarray, the values read, as a (rows x columns) float64
+          array
+       lines: int, the number of newlines in the range
+
+    Raises
+    ------
+    ReadError
+    If a line is invalid, with its number counted from the range start
+    """
+    (fn, start, end, ncols, cols) = args
+    with io.open(fn, 'rb') as f:
+        f.seek(start)
+        buf = f.read(end - start)
+        return (parse_columns(buf, ncols, cols), buf.count(b'\n'))
+
+class ColumnReader(Reader):
+    """ ColumnReader -- Provide common function for text files ordered by
+columns
+Derives from Reader
+Text files contain a header with the Signal names followed by the data, one
+Signal by column, the first one being the abscisse.
+
+The data section is read by chunks, each chunk being split on line boundaries
+and converted in bulk by numpy, straight into a preallocated float64 array.
+An incomplete last line, e.g. when the simulator is still writing the file,
+is ignored. Other invalid lines raise ReadError with their line number.
+
+Large files are split into byte ranges on line boundaries, parsed by a pool
+of processes, one per CPU unless _processes is set, and the results are
+concatenated.
+
+On update, only the complete lines appended since the last read are parsed
+and added to the rows already read, see _update_tail().
+
+When a selection of Signals is given to read(), only the columns of the
+Signals selected and of the abscisse are converted and stored.
+
+Compressed files are parsed by chunks as they are decompressed, serially,
+and read entirely on update.
+
+iter_chunks() parses the data section by chunks and yields the rows as they
+are converted, in memory bounded by the chunk sizes.
+
+The derived class must redefine _read_header() and sniff().
+    """
+    _chunk_size = 1 << 24
+    _parallel_size = 1 << 26     # Minimum data size for parallel parsing
+    _processes = None            # Number of processes, None for CPU count
+    _use_cache = True
+
+    def _read_signals(self):
+        """ Read the signals from the file
+
+        First read the header to get the names and units of the Signals,
+        then read the data values, and finally, assign the abscisse and
+        data to each signal.
+
+        Parameter
+        ---------
+        None
+
+        Returns
+        -------
+        Dict of Signals
+        The list of Signals read from the file
+
+        Raises
+        ------
+        ReaderError
+        In case of invalid path or unsupported file format
+        """
+        with self._open() as f:
+            (names, units) = self._read_header(f)
+            pos = f.tell()
+
+        cols = [0] + [i + 1 for i in self._selected(names[1:])]
+        signals = [Signal(names[i], units[i]) for i in cols]
+        self._names = names
+        self._cols = cols if len(cols) < len(names) else None
+        self._tail = None
+        self._assign_data(signals, functools.partial(self._read_columns, pos,
+                                                     len(names)))
+        ref = signals[0]
+        for s in signals[1:]:
+            s.ref = ref
+
+        self._signals = dict((names[i], s) for (i, s) in zip(cols[1:],
+                                                             signals[1:]))
+        return self._signals
+
+    def _read_header(self, f):
+        """ Read the header, this function shall be redefined in derived
+        class
+        On return the file position shall be the start of the data.
+
+        Parameter
+        ---------
+        f: file object
+        The file to read from, opened in binary mode
+
+        Returns
+        -------
+        tuple:
+           names: list of strings, names of the Signals
+           units: list of strings, units of the Signals
+        """
+        return ([], [])
+
+    def _read_columns(self, pos, ncols):
+        """ Read the data section by chunks and return the columns
+
+        Parameters
+        ----------
+        pos: int
+        Offset of the data section
+
+        ncols: int
+        The number of columns
+
+        Returns
+        -------
+        list of numpy.ndarray
+        One array per column selected
+        """
+        processes = self._processes or os.cpu_count() or 1
+        if processes > 1 and self._compression is None and\
+                os.path.getsize(self._fn) - pos >= self._parallel_size:
+            try:
+                return self._read_columns_parallel(pos, ncols, processes)
+            except (OSError, concurrent.futures.process.BrokenProcessPool):
+                # Cannot use processes, read serially
+                pass
+            except ReadError:
+                # Read serially to report the number of the invalid line
+                pass
+
+        cols = self._cols
+        width = ncols if cols is None else len(cols)
+        data = None
+        n = 0
+        with self._open() as f:
+            # Number of the current line, for error messages
+            line = f.read(pos).count(b'\n') + 1
+            # Size of the data, unknown for compressed files
+            size = os.path.getsize(self._fn) - pos\
+                if self._compression is None else None
+            rest = b''
+            done = 0
+            while True:
+                chunk = f.read(self._chunk_size)
+                if chunk:
+                    buf = rest + chunk
+                    cut = buf.rfind(b'\n') + 1
+                    (buf, rest) = (buf[:cut], buf[cut:])
+                else:
+                    # Last line, if not terminated by a newline
+                    (buf, rest) = (rest, b'')
+                    (end, nrows, last) = (pos + done, n, line)
+                done = done + len(buf)
+                rows = parse_columns(buf, ncols, cols, line)
+                line = line + buf.count(b'\n')
+                if data is None:
+                    # Estimate the number of rows from the first chunk,
+                    # compressed files growing from the first chunk rows
+                    rate = float(len(rows)) / max(len(buf), 1)
+                    data = numpy.empty((int((size or 0) * rate * 1.05)
+                                        + len(rows) + 1, width))
+                if n + len(rows) > len(data):
+                    need = n + len(rows)
+                    if size is not None:
+                        # Estimation was too low, grow using the remaining size
+                        rate = float(need) / max(done, 1)
+                        need = max(int((size - done) * rate * 1.05), 0) + need
+                    data = grow_rows(data, need)
+                data[n:n + len(rows)] = rows
+                n = n + len(rows)
+                if not chunk:
+                    break
+        if data is None:
+            data = numpy.empty((0, width))
+        if self._compression is None:
+            self._tail = {'start': pos, 'end': end, 'rows': nrows, 'n': n,
+                          'data': data, 'line': last}
+            self._tail['check'] = self._tail_check(end)
+        return [data[:n, i] for i in range(width)]
+
+    def _read_columns_parallel(self, pos, ncols, processes):
+        """ Split the data section in byte ranges on line boundaries, parse
+        them in parallel and return the columns
+
+        Parameters
+        ----------
+        pos: int
+        Offset of the data section
+
+        ncols: int
+        The number of columns
+
+        processes: int
+        The number of processes to use
+
+        Returns
+        -------
+        list of numpy.ndarray
+        One array per column selected
+        """
+        cols = self._cols
+        width = ncols if cols is None else len(cols)
+        size = os.path.getsize(self._fn)
+        nranges = max(processes, -(-(size - pos) // self._chunk_size))
+        bounds = [pos]
+        with io.open(self._fn, 'rb') as f:
+            for i in range(1, nranges):
+                f.seek(max(pos + (size - pos) * i // nranges, bounds[-1]))
+                f.readline()
+                bounds.append(min(f.tell(), size))
+        bounds.append(size)
+        ranges = [(self._fn, start, end, ncols, cols)\
+                      for (start, end) in zip(bounds[:-1], bounds[1:])\
+                      if end > start]
+
+        with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+            (rows, lines) = zip(*executor.map(parse_range, ranges))\
+                if ranges else ((), ())
+        data = numpy.concatenate(rows) if rows else numpy.empty((0, width))
+        # Last line is read again on update if not terminated by a newline
+        with io.open(self._fn, 'rb') as f:
+            f.seek(max(size - self._chunk_size, pos))
+            buf = f.read()
+        end = size - len(buf) + buf.rfind(b'\n') + 1 if b'\n' in buf\
+            else pos
+        nrows = len(data) - len(parse_columns(buf[end - size:], ncols, cols))\
+            if end < size else len(data)
+        with io.open(self._fn, 'rb') as f:
+            line = f.read(pos).count(b'\n') + 1
+        # All the lines up to end are terminated by a newline
+        self._tail = {'start': pos, 'end': end, 'rows': nrows, 'n': len(data),
+                      'data': data, 'line': line + sum(lines)}
+        self._tail['check'] = self._tail_check(end)
+        return [data[:, i] for i in range(width)]
+
+    def _iter_chunks(self, fn, points, sigs):
+        """ Parse the data section by chunks of _chunk_size bytes and yield
+        the rows by chunks of points, see Reader.iter_chunks()
+        """
+        self._fn = fn
+        self._compression = compression(fn)
+        self._select = sigs
+        with self._open() as f:
+            (names, units) = self._read_header(f)
+            cols = [0] + [i + 1 for i in self._selected(names[1:])]
+            ncols = len(names)
+            with self._open() as h:
+                line = h.read(f.tell()).count(b'\n') + 1
+            rest = b''
+            pending = numpy.empty((0, len(cols)))
+            while True:
+                chunk = f.read(self._chunk_size)
+                buf = rest + chunk
+                if chunk:
+                    cut = buf.rfind(b'\n') + 1
+                    (buf, rest) = (buf[:cut], buf[cut:])
+                rows = parse_columns(buf, ncols, cols if len(cols) < ncols
+                                     else None, line)
+                line = line + buf.count(b'\n')
+                if len(pending):
+                    rows = numpy.concatenate((pending, rows))
+                # Keep the last incomplete chunk for next rows
+                n = len(rows) if not chunk else len(rows) // points * points
+                for start in range(0, n, points):
+                    block = rows[start:start + points]
+                    yield (block[:, 0],
+                           dict((names[c], block[:, i + 1])
+                                for (i, c) in enumerate(cols[1:])))
+                pending = rows[n:]
+                if not chunk:
+                    break
+
+    def _tail_check(self, end):
+        """ Return the bytes used to check the file was not rewritten: the
+        header and the last bytes read
+
+        Parameter
+        ---------
+        end: int
+        Offset after the last line read
+
+        Returns
+        -------
+        bytes
+        The bytes to compare
+        """
+        with io.open(self._fn, 'rb') as f:
+            head = f.read(self._tail['start'])
+            f.seek(max(end - 256, self._tail['start']))
+            return head + f.read(end - f.tell())
+
+    def _update_tail(self):
+        """ Parse the lines appended since the last read and extend the
+        Signals data
+
+        Lines are parsed from the end of the last complete line read, and
+        stored after the rows already read, with amortized growth of the
+        array. The last line, if not terminated by a newline, is parsed again
+        on next update.
+
+        Parameter
+        ---------
+        None
+
+        Returns
+        -------
+        bool
+        True if the Signals are up to date, False if the file shall be
+        read again
+        """
+        # Not set when the Signals come from the cache
+        tail = getattr(self, '_tail', None)
+        if tail is None or os.path.getsize(self._fn) < tail['end'] or\
+                self._tail_check(tail['end']) != tail['check']:
+            return False
+        with io.open(self._fn, 'rb') as f:
+            f.seek(tail['end'])
+            buf = f.read()
+        if not buf:
+            return True
+        (ncols, cols) = (len(self._names), self._cols)
+        cut = buf.rfind(b'\n') + 1
+        rows = parse_columns(buf, ncols, cols, tail['line'])
+        nrest = len(parse_columns(buf[cut:], ncols, cols))
+        n = tail['rows'] + len(rows)
+        data = tail['data'] = grow_rows(tail['data'], n)
+        data[tail['rows']:n] = rows
+        tail['end'] = tail['end'] + cut
+        tail['line'] = tail['line'] + buf.count(b'\n')
+        tail['rows'] = n - nrest
+        tail['n'] = n
+        tail['check'] = self._tail_check(tail['end'])
+
+        signals = self._tail_signals([self._names[i] for i in
+                                      (cols or range(ncols))[1:]])
+        ref = next((s.ref for s in signals if s is not None), None)
+        if ref is not None:
+            ref.data = data[:n, 0]
+        for (i, s) in enumerate(signals):
+            if s is not None and not s.freeze:
+                s.data = data[:n, i + 1]
+        return True
@@ -1,24 +1,48 @@
 """ Automagical detection of file type
+
+Readers are declared in the registry READERS and imported only when tried.
+Third-party Readers can be added with the 'oscopy.readers' entry points, see
+oscopy.registry.
 """
-import os.path
-from .reader import ReadError
-from .gnucap_reader import GnucapReader
-from .signal_reader import SignalReader
-from .cazm_reader import CazmReader
-from .nsout_reader import NsoutReader
-from .spice2raw_reader import Spice2rawReader
-from .spice3raw_reader import Spice3rawReader
-from .hspice_reader import HspiceReader
-from .touchstone_reader import TouchstoneReader
+import os
+import collections
+from .reader import Reader, ReadError, strip_compression
+from ..registry import Registry
+
+READERS = Registry('oscopy.readers')
+READERS.register('signal', 'oscopy.readers.signal_reader', 'SignalReader')
+READERS.register('gnucap', 'oscopy.readers.gnucap_reader', 'GnucapReader')
+READERS.register('cazm', 'oscopy.readers.cazm_reader', 'CazmReader',
+                 magic=(b'* CAZM-format output',))
+READERS.register('nsout', 'oscopy.readers.nsout_reader', 'NsoutReader',
+                 extensions='\\.out$')
+READERS.register('spice2raw', 'oscopy.readers.spice2raw_reader',
+                 'Spice2rawReader', magic=(b'rawfile1',),
+                 extensions='\\.raw$')
+READERS.register('spice3raw', 'oscopy.readers.spice3raw_reader',
+                 'Spice3rawReader', magic=(b'Title',), extensions='\\.raw$')
+READERS.register('hspice', 'oscopy.readers.hspice_reader', 'HspiceReader',
+                 extensions='\\.(tr|ac|sw)[0-9a-z]$')
+READERS.register('touchstone', 'oscopy.readers.touchstone_reader',
+                 'TouchstoneReader', extensions='\\.(s\\d+p|ts)$')
+READERS.register('hdf5', 'oscopy.readers.hdf5_reader', 'Hdf5Reader',
+                 magic=(b'\x89HDF\r\n\x1a\n',), extensions='\\.(h5|hdf5)$')
 
-READERS = [SignalReader, GnucapReader, CazmReader, NsoutReader,
-           Spice2rawReader, Spice3rawReader, HspiceReader,
-           TouchstoneReader]
+# Formats found, by (path, modification time, size)
+_detected = collections.OrderedDict()
+DETECTED_MAX = 256
 
 def DetectReader(filename):
     """ Find which Reader can handle the filename
-    Parse the list READERS from first element to last one.
-    Use the function Reader.detect().
+    Read the head of the file once and pass it to Reader.sniff() of each
+    Reader of the registry READERS, Readers whose magic bytes or extensions
+    match the file being tried first, then the others in registry order.
+    When sniff() cannot decide, Reader.detect() is used. Reader modules are
+    imported only when tried. Compressed files are detected from their
+    decompressed head and the extension of the file without the compression
+    extension.
+    The format found is remembered for the file path, modification time and
+    size.
     On sucess, returns a Reader otherwise None
 
     Parameter
@@ -33,9 +57,33 @@ def DetectReader(filename):
     or
     None
     """
-    for reader in READERS:
-        r = reader()
-        if r.detect(filename):
+    if not isinstance(filename, str) or not os.path.isfile(filename):
+        for fmt in READERS:
+            r = fmt.load()()
+            if r.detect(filename):
+                return r
+        return None
+
+    st = os.stat(filename)
+    key = (os.path.abspath(filename), st.st_mtime, st.st_size)
+    if key in _detected:
+        _detected.move_to_end(key)
+        return _detected[key].load()()
+    try:
+        head = Reader.read_head(filename)
+    except IOError as e:
+        return None
+    formats = list(READERS)
+    hints = [fmt.hint(head, strip_compression(filename)) for fmt in formats]
+    # Stable sort, registry order is kept for same hint
+    for (hint, fmt) in sorted(zip(hints, formats), key=lambda x: -x[0]):
+        r = fmt.load()()
+        found = r.sniff(head, filename)
+        if found is None:
+            found = r.detect(filename)
+        if found:
+            _detected[key] = fmt
+            if len(_detected) > DETECTED_MAX:
+                _detected.popitem(last=False)
             return r
     return None
-
@@ -1,11 +1,9 @@
 
 
 import re
-import io
-from oscopy import Signal
-from .reader import Reader
+from .column_reader import ColumnReader
 
-class GnucapReader(Reader):
+class GnucapReader(ColumnReader):
     """ Read gnucap output files
 
 Gnucap files are ordered by columns, one signal by column.
@@ -24,62 +22,28 @@ parenthesis stripped, e.g. v(gs) -> vgs or i(Rd) -> iRd.
                    "nv":"", "ev":"", "r":"Ohms", "y":"S",
                    "Time":"s", "Freq":"Hz"}
 
-    def _read_signals(self):
-        """ Read the signals from the file
-
-        First get the signal names from the first line, the abscisse
+    def _read_header(self, f):
+        """ Get the signal names from the first line, the abscisse
         is the first column.
-        Then read the data values, and finally, assign the abscisse and
-        data to each signal.
 
         Parameter
         ---------
-        fn: string
-        The filename
+        f: file object
+        The file to read from, opened in binary mode
 
         Returns
         -------
-        Dict of Signals
-        The list of Signals read from the file
-
-        Raises
-        ------
-        ReaderError
-        In case of invalid path or unsupported file format
+        tuple:
+           names: list of strings, names of the Signals
+           units: list of strings, units of the Signals
         """
         units = []
         names = []
-        signals = []
-
-        with io.open(self._fn, 'r') as f:
-            lines = iter(f)
-
-            # read signal names
-            first_line = next(lines)
-            for x in first_line.lstrip('#').split():
-                unit = self._unit_from_probe(x.split('(', 1)[0])
-                units.append(unit)
-                name = x.replace('(', '').replace(')', '')
-                names.append(name)
-                signals.append(Signal(name, unit))
-
-            # read values
-            data = [[] for x in range(len(names))]
-            # optimization: cache the append methods,
-            # avoiding one dictionary lookup per line
-            append = [x.append for x in data]
-            for values in lines:
-                for i, val in enumerate(values.split()):
-                    append[i](float(val))
-
-        ref = signals[0]
-        ref.data = data[0]
-        for i, s in enumerate(signals[1:]):
-            s.ref = ref
-            s.data = data[i + 1]
-
-        self._signals = dict(list(zip(names[1:], signals[1:])))
-        return self._signals
+        first_line = f.readline().decode('latin-1')
+        for x in first_line.lstrip('#').split():
+            units.append(self._unit_from_probe(x.split('(', 1)[0]))
+            names.append(x.replace('(', '').replace(')', ''))
+        return (names, units)
 
     def _unit_from_probe(self, probe_name):
         """ Return the unit name from the probe name
@@ -101,12 +65,15 @@ parenthesis stripped, e.g. v(gs) -> vgs or i(Rd) -> iRd.
         """
         return GnucapReader.PROBE_UNITS.get(probe_name, '')
 
-    def detect(self, fn):
+    def sniff(self, head, fn):
         """ Look at the header, if it if something like
         #Name probe(name)
 
-        Parameter
-        ---------
+        Parameters
+        ----------
+        head: bytes
+        The head of the file
+
         fn: string
         Path to the file to test
 
@@ -115,12 +82,6 @@ parenthesis stripped, e.g. v(gs) -> vgs or i(Rd) -> iRd.
         bool
         True if the file can be handled by this reader
         """
-        self._check(fn)
-        try:
-            f = io.open(fn, 'r')
-        except IOError as e:
-            return False
-        s = f.readline()
-        f.close()
+        s = head.split(b'\n', 1)[0].decode('latin-1')
         # A regex which looks at all probes should be better !
         return len(re.findall('^#\w+\s+[\w\(\)]+', s)) > 0
@@ -0,0 +1,283 @@
+
+
+import functools
+import collections
+import numpy
+from oscopy import Signal
+from .reader import Reader, ReadError
+
+HDF5_MAGIC = b'\x89HDF\r\n\x1a\n'
+
+# Info set by Reader.read(), not read from the attributes of the file
+_READ_INFO = ['file', 'last_update', 'state', 'changes']
+
+def h5py_module():
+    """ Return the h5py module, needed to read HDF5 files
+
+    Parameter
+    ---------
+    None
+
+    Returns
+    -------
+    module
+    The h5py module
+
+    Raises
+    ------
+    ReadError
+    If the h5py module is not installed
+    """
+    try:
+        import h5py
+    except ImportError:
+        raise ReadError(_('h5py module needed to read HDF5 files'))
+    return h5py
+
+def attr_value(v):
+    """ Convert a HDF5 attribute to a Python value
+
+    Parameter
+    ---------
+    v: attribute read by h5py
+    The attribute
+
+    Returns
+    -------
+    str, int, float, bool or numpy.ndarray
+    The value of the attribute
+    """
+    if isinstance(v, bytes):
+        return v.decode('utf-8', 'replace')
+    elif isinstance(v, numpy.generic):
+        return v.item()
+    return v
+
+class Hdf5Reader(Reader):
+    """ Read HDF5 files written by Hdf5Writer
+
+Each Signal is stored in the group /signals/NAME, where NAME is the name of
+the Signal with '/' replaced by '%2F':
+  data    the dataset of the Signal, chunked and compressed
+  ref     hard link to the dataset of its Reference Signal in /refs
+The Signals sharing a Reference Signal link to the same dataset, which is
+stored once, and share the same Reference Signal once read. Names and units
+are stored in the 'name' and 'unit' attributes of the group of each Signal
+and of the dataset of each Reference Signal. The attributes of the file are
+stored in info.
+
+Data is always read on first access, one Signal at a time. read_range()
+reads only the points within a range of the Reference Signal, and
+iter_chunks() reads the datasets by slices. Both slice the last axis of the
+data of families.
+
+The h5py module is needed to read the files.
+    """
+    def sniff(self, head, fn):
+        """ Look at the HDF5 signature at the beginning of the file
+
+        Parameters
+        ----------
+        head: bytes
+        The head of the file
+
+        fn: string
+        Path to the file to test
+
+        Returns
+        -------
+        bool
+        True if the file can be handled by this reader
+        """
+        return head.startswith(HDF5_MAGIC)
+
+    def detect(self, fn):
+        """ Look at the HDF5 signature at the beginning of the file
+
+        Parameter
+        ---------
+        fn: string
+        Path to the file to test
+
+        Returns
+        -------
+        bool
+        True if the file can be handled by this reader
+        """
+        self._check(fn)
+        try:
+            with open(fn, 'rb') as f:
+                return self.sniff(f.read(len(HDF5_MAGIC)), fn)
+        except IOError as e:
+            return False
+
+    def _read_signals(self):
+        """ Read the names, units and references of the Signals from the file,
+        the data being read on first access
+
+        Parameter
+        ---------
+        None
+
+        Returns
+        -------
+        Dict of Signals
+        The list of Signals read from the file
+        """
+        h5py = h5py_module()
+        self._lazy = True
+        # Path of the dataset of each Signal and its reference, by name
+        self._paths = collections.OrderedDict()
+        refs = []
+        signals = {}
+        try:
+            f = h5py.File(self._fn, 'r')
+        except OSError as e:
+            raise ReadError(_('hdf5_reader: cannot read %s: %s')
+                            % (self._fn, e))
+        with f:
+            if 'signals' not in f:
+                raise ReadError(_('hdf5_reader: no signals found in %s')
+                                % self._fn)
+            self._info.update((k, attr_value(v)) for (k, v) in f.attrs.items()
+                              if k not in _READ_INFO)
+            groups = list(f['signals'].values())
+            names = [attr_value(g.attrs.get('name', g.name.split('/')[-1]))
+                     for g in groups]
+            for i in self._selected(names):
+                g = groups[i]
+                ds = g['ref']
+                # Hard links to the same dataset compare equal
+                found = [(r, p) for (d, r, p) in refs if d == ds]
+                if found:
+                    (ref, path) = found[0]
+                else:
+                    path = ds.name
+                    ref = Signal(attr_value(ds.attrs.get('name', 'ref')),
+                                 attr_value(ds.attrs.get('unit', '')))
+                    self._assign_data([ref], functools.partial(
+                            self._read_datasets, [path]))
+                    refs.append((ds, ref, path))
+                s = Signal(names[i], attr_value(g.attrs.get('unit', '')))
+                s.ref = ref
+                self._assign_data([s], functools.partial(
+                        self._read_datasets, [g['data'].name]))
+                self._paths[names[i]] = (g['data'].name, path)
+                signals[names[i]] = s
+        self._signals = signals
+        return self._signals
+
+    def _read_datasets(self, paths):
+        """ Read datasets
+
+        Parameter
+        ---------
+        paths: list of strings
+        Paths of the datasets in the file
+
+        Returns
+        -------
+        list of numpy.ndarray
+        The data read
+        """
+        with h5py_module().File(self._fn, 'r') as f:
+            return [f[p][()] for p in paths]
+
+    def _search(self, ds, x):
+        """ Return the index of the first value of an increasing
+        one-dimensional dataset not lower than x, by bisection so that only
+        the chunks containing the values compared are read
+
+        Parameters
+        ----------
+        ds: h5py.Dataset
+        The dataset
+
+        x: float
+        The value searched
+
+        Returns
+        -------
+        int
+        The index found
+        """
+        (lo, hi) = (0, len(ds))
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if ds[mid] < x:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def read_range(self, xmin=None, xmax=None):
+        """ Return the Signals read restricted to the points whose
+        Reference Signal value is within [xmin, xmax], reading only these
+        points from the file. Reference Signals are assumed increasing.
+
+        Parameters
+        ----------
+        xmin, xmax: float
+        The range of the Reference Signal, None for no limit
+
+        Returns
+        -------
+        Dict of Signals
+        New Signals, with the names of the Signals read, not updated by
+        update()
+
+        Raises
+        ------
+        ReadError
+        If a Reference Signal is not one-dimensional, e.g. for families
+        with a different abscisse for each sweep
+
+        Example
+        -------
+        >>> r = Hdf5Reader()
+        >>> sigs = r.read('tran.h5')
+        >>> zoom = r.read_range(1e-3, 2e-3)
+        """
+        h5py = h5py_module()
+        signals = {}
+        refs = {}
+        bounds = {}
+        with h5py.File(self._fn, 'r') as f:
+            for (sn, (data, ref)) in self._paths.items():
+                s = self._signals.get(self._renamed.get(sn, sn))
+                if s is None:
+                    continue
+                if ref not in refs:
+                    ds = f[ref]
+                    if ds.ndim != 1:
+                        raise ReadError(_('hdf5_reader: reference of %s is not'
+                                          ' one-dimensional') % s.name)
+                    start = self._search(ds, xmin) if xmin is not None else 0
+                    stop = self._search(ds, numpy.nextafter(xmax, numpy.inf))\
+                        if xmax is not None else len(ds)
+                    bounds[ref] = (start, stop)
+                    refs[ref] = Signal(s.ref.name, s.ref.unit)
+                    refs[ref].data = ds[start:stop]
+                (start, stop) = bounds[ref]
+                signals[s.name] = Signal(s.name, s.unit)
+                signals[s.name].ref = refs[ref]
+                signals[s.name].data = f[data][..., start:stop]
+        return signals
+
+    def _iter_chunks(self, fn, points, sigs):
+        """ Iterate over the data by chunks, see iter_chunks()
+        Read slices of the datasets, Signals sharing a Reference Signal
+        together. Reference Signals of families may be two-dimensional, they
+        are sliced along the points like the data.
+        """
+        h5py = h5py_module()
+        self.read(fn, True, sigs)
+        groups = collections.OrderedDict()
+        for (sn, (data, ref)) in self._paths.items():
+            groups.setdefault(ref, []).append((sn, data))
+        with h5py.File(fn, 'r') as f:
+            for (ref, group) in groups.items():
+                for start in range(0, f[ref].shape[-1], points):
+                    yield (f[ref][..., start:start + points],
+                           dict((sn, f[data][..., start:start + points])
+                                for (sn, data) in group))
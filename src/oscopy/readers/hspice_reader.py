@@ -1,6 +1,8 @@
 
 
 import re
+import functools
+import numpy
 from oscopy import Signal
 from .reader import Reader, ReadError
 import struct, os
@@ -14,19 +16,50 @@ class HspiceReader(Reader):
 Hspice can be either binary or ascii. Both types have a plain text header
 containing various informations.
 
-Note 1: Support only one sweep
-Note 2: Auto signals are note returned, only probe signals are
-Note 3: Endianness is not managed in binary mode
+Note: Auto signals are note returned, only probe signals are
+
+In binary mode, endianness is detected from the block headers, and data is
+read in bulk into a (points x signals) array, each Signal being a view on
+one of its columns. In ascii mode, fixed-width fields are sliced and
+converted in bulk.
+
+Several sweeps (e.g. Monte Carlo or .alter runs) can be stored in one file.
+In that case data of all sweeps is read into a shared (sweeps x points x
+signals) array and each Signal is a family, i.e. its data is a (sweeps x
+points) view on this array. Sweeps shorter than the longest one are padded
+with NaN. The reference is one-dimensional when all sweeps share the same
+abscisse values. The sweep parameter names and values (one row per sweep)
+are stored in self.info['sweep_names'] and self.info['sweep_values'], and
+Signals for one single sweep can be retrieved with sweep().
 
 For more details see http://www.rvq.fr/linux/gawfmt.php    
     """
     _IVTYPE_UNIT = {'1': 's', '2': 'Hz', '3': 'V'}
     _DVTYPE_UNIT = {'1': 'V', '2': 'V', '8': 'A', '15': 'A', '22': 'A'}
-    def detect(self, fn):
-        """ Look at the header if it contains the five digits identificators
+    _use_cache = True
+    def __init__(self):
+        """ Instanciate the Reader
 
         Parameter
         ---------
+        None
+
+        Returns
+        -------
+        HspiceReader
+        The object instanciated
+        """
+        super(HspiceReader, self).__init__()
+        self._sweeps = {}      # Signals returned by sweep(), by index
+
+    def sniff(self, head, fn):
+        """ Look at the header if it contains the five digits identificators
+
+        Parameters
+        ----------
+        head: bytes
+        The head of the file
+
         fn: string
         Path to the file to test
 
@@ -35,23 +68,15 @@ For more details see http://www.rvq.fr/linux/gawfmt.php
         bool
         True if the file can be handled by this reader
         """
-        self._check(fn)
-        with open(fn, 'rb') as f:
-            nauto = f.read(4)
-            if not nauto.isdigit():
-                # Maybe a binary hpsice file ?
-                f.seek(0, os.SEEK_SET)
-                x = f.read(16)
-                (h1, h2, h3, nbs) = struct.unpack('>4i', x) if len(x) == 16 else (0, 0, 0, 0)
-                nauto = f.read(4)
-            nprobe = f.read(4)
-            nsweepparam = f.read(4)
-            useless = f.read(4)
-            version = f.read(4)
+        if not head[:4].isdigit():
+            # Maybe a binary hpsice file ?
+            head = head[16:]
+        (nauto, nprobe, nsweepparam, useless, version) =\
+            [head[i:i + 4] for i in range(0, 20, 4)]
         return nauto.isdigit() and nprobe.isdigit()\
                and nsweepparam.isdigit()\
-           and useless.isdigit() and useless == '0000'\
-           and version.isdigit() and (version == '9007' or version == '9601')
+           and useless.isdigit() and useless == b'0000'\
+           and version.isdigit() and (version == b'9007' or version == b'9601')
 
     def _read_signals(self):
         """ Read the signals from the file
@@ -69,21 +94,28 @@ For more details see http://www.rvq.fr/linux/gawfmt.php
         Dict of Signals
         The list of Signals read from the file
         """
-        is_binary = False
-        with open(self._fn, 'rb') as f:
+        with self._open() as f:
             c = f.read(1)
             f.seek(0)
-            if c < ' ':
+            if c < b' ':
                 return self._read_binary(f)
             else:
                 return self._read_ascii(f)
 
+    def _cacheable(self):
+        """ Store only ascii files in the cache, binary files being mapped
+        directly
+        """
+        with self._open() as f:
+            return f.read(1) >= b' '
+
     def _read_binary(self, f):
         """ Read hspice file in binary format
 
-        Note 1: Support only one sweep
-        Note 2: Auto signals are note returned, only probe signals are
-        Note 3: Endianness is not managed
+        Parse the header block, data blocks are read afterwards by
+        _read_binary_data().
+
+        Note: Auto signals are note returned, only probe signals are
 
         Parameter
         ---------
@@ -95,42 +127,289 @@ For more details see http://www.rvq.fr/linux/gawfmt.php
         self._signals: dict of Signals
         The Signals read from the file
         """
-        (h, values) = self._read_block(f)
-        (names, signals) = self._process_header(values)
-        (h, values) = self._read_block(f)
-
-        data = [[] for x in range(len(signals))]
-        numsigs = self._nauto + self._nprobe
-        datasize = h[3]
-        nvals = datasize / 4 # sizeof(float)
-        vals = struct.unpack('>%df' % nvals, values)
-
-        for i in range(numsigs):
-            start = i
-            stop = nvals - numsigs + i
-            step = numsigs
-            data[i] = list(vals[start:stop:step])
+        endian = self._endianness(f.read(4))
+        f.seek(0)
+        (h, values) = self._read_block(f, endian)
+        header = values.decode('latin-1')
+        (names, signals) = self._process_header(header)
+        # Post 2001 format stores values as double
+        itemsize = 8 if header[20:24] == '2001' else 4
+
+        self._assign_data(signals, functools.partial(
+                self._read_binary_data, f.tell(), endian, itemsize,
+                len(signals)))
 
         ref = signals[0]
-        ref.data = data[0]
-        for i, s in enumerate(signals[1:]):
+        for s in signals[1:]:
             s.ref = ref
-            s.data = data[i + 1]
 
-        self._signals = dict(list(zip(names[self._nauto - 1:],\
-                                 signals[self._nauto - 1:])))
+        self._signals = dict(list(zip(names[self._nauto:],\
+                                 signals[self._nauto:])))
         return self._signals
 
+    def _read_binary_data(self, pos, endian, itemsize, numsigs):
+        """ Read the data blocks of hspice binary file
+
+        The data section is mapped in memory (decompressed in one buffer for
+        compressed files), the block headers are stripped by
+        _block_values() and the values are interpreted as a (points x
+        signals) array. Data ends with the terminator value (1e30) instead
+        of a independent variable value.
+
+        Parameters
+        ----------
+        pos: int
+        Offset of the first data block
+
+        endian: string
+        '>' for big-endian, '<' for little-endian
+
+        itemsize: int
+        Size of one value, 4 (float) or 8 (double)
+
+        numsigs: int
+        Number of values per point, i.e. number of auto and probe signals
+
+        Returns
+        -------
+        list of numpy.ndarray
+        One column view per signal, see _to_columns()
+        """
+        with self._open() as f:
+            if self._compression is None:
+                size = os.fstat(f.fileno()).st_size
+                buf = numpy.memmap(self._fn, dtype=numpy.uint8, mode='c',
+                                   offset=pos, shape=(size - pos,))\
+                                   if size > pos else numpy.zeros(0, numpy.uint8)
+            else:
+                f.seek(pos)
+                buf = numpy.frombuffer(bytearray(f.read()), dtype=numpy.uint8)
+        return self._to_columns(self._block_values(buf, endian, itemsize),
+                                numsigs)
+
+    def _block_values(self, buf, endian, itemsize):
+        """ Return the values of the data blocks, without the block headers
+
+        Each block is made of a 16 bytes header, whose last integer is the
+        size of the values, the values and a 4 bytes trailer. All the blocks
+        but the last one have the same size, so their values are one strided
+        view on buf, returned as is when there is only one block. Otherwise
+        values are copied once in a single array. Blocks of other sizes,
+        e.g. the last one, are located one by one.
+
+        Parameters
+        ----------
+        buf: numpy.ndarray
+        The data blocks, as bytes (uint8)
+
+        endian: string
+        '>' for big-endian, '<' for little-endian
+
+        itemsize: int
+        Size of one value, 4 (float) or 8 (double)
+
+        Returns
+        -------
+        numpy.ndarray
+        The values of all the blocks
+        """
+        dtype = numpy.dtype(endian + ('f8' if itemsize == 8 else 'f4'))
+        itype = numpy.dtype(endian + 'i4')
+        full = numpy.zeros((0, 0), dtype=dtype)
+        offset = 0
+        if len(buf) >= 16:
+            nbs = int(buf[12:16].view(itype)[0])
+            reclen = 16 + nbs + 4
+            nrec = len(buf) // reclen if nbs > 0 else 0
+            sizes = numpy.ndarray((nrec,), dtype=itype, buffer=buf, offset=12,
+                                  strides=(reclen,))
+            if nrec and (sizes == nbs).all():
+                full = numpy.ndarray((nrec, nbs // itemsize), dtype=dtype,
+                                     buffer=buf, offset=16,
+                                     strides=(reclen, itemsize))
+                offset = nrec * reclen
+
+        # Blocks of other sizes, truncated if the file is being written
+        rest = []
+        while offset + 16 <= len(buf):
+            nbs = int(buf[offset + 12:offset + 16].view(itype)[0])
+            nbs = max(min(nbs, len(buf) - offset - 16), 0)
+            rest.append(numpy.ndarray((nbs // itemsize,), dtype=dtype,
+                                      buffer=buf, offset=offset + 16))
+            offset = offset + 16 + nbs + 4
+
+        if not rest and len(full) == 1:
+            return full[0]
+        if not len(full) and len(rest) == 1:
+            return rest[0]
+        vals = numpy.empty(full.size + sum(len(x) for x in rest), dtype=dtype)
+        vals[:full.size].reshape(full.shape)[...] = full
+        i = full.size
+        for x in rest:
+            vals[i:i + len(x)] = x
+            i = i + len(x)
+        return vals
+
+    def _to_columns(self, vals, numsigs):
+        """ Split the values read from the file into one column per signal
+
+        Each sweep starts with the values of the sweep parameters, followed
+        by the values of each point, and ends with the terminator (1e30)
+        found in place of the independent variable value.
+        With one sweep, columns are views on a (points x signals) array.
+        With more sweeps, columns are (sweeps x points) views on a shared
+        (sweeps x points x signals) array, padded with NaN.
+
+        Parameters
+        ----------
+        vals: numpy.ndarray
+        The values read from the file
+
+        numsigs: int
+        Number of values per point, i.e. number of auto and probe signals
+
+        Returns
+        -------
+        list of numpy.ndarray
+        One column per signal
+        """
+        nsweepparam = self._nsweepparam
+        if not nsweepparam:
+            # Independent variable is the first value of each point, the
+            # terminator is found in its place after the last point
+            end = numpy.flatnonzero(vals[::numsigs] >= 1e30)
+            npoints = end[0] if len(end) else len(vals) // numsigs
+            data = vals[:npoints * numsigs].reshape(npoints, numsigs)
+            return [data[:, i] for i in range(numsigs)]
+
+        # Split the values at each terminator, looked for only in place of
+        # the independent variable as other values may reach 1e30
+        found = numpy.flatnonzero(vals >= 1e30)
+        params = []
+        sweeps = []
+        start = 0
+        while start + nsweepparam < len(vals):
+            first = start + nsweepparam
+            ends = found[numpy.searchsorted(found, first):]
+            ends = ends[(ends - first) % numsigs == 0]
+            end = ends[0] if len(ends) else len(vals)
+            if end > first:
+                params.append(vals[start:first])
+                npoints = (end - first) // numsigs
+                sweeps.append(vals[first:first + npoints * numsigs]\
+                                  .reshape(npoints, numsigs))
+            start = end + 1
+        self._info['sweep_values'] = numpy.array(params)
+        self._info['sweep_points'] = [len(x) for x in sweeps]
+        if len(sweeps) < 2:
+            data = sweeps[0] if sweeps else vals[:0].reshape(0, numsigs)
+            return [data[:, i] for i in range(numsigs)]
+
+        npoints = max(self._info['sweep_points'])
+        family = numpy.full((len(sweeps), npoints, numsigs), numpy.nan,
+                            dtype=vals.dtype)
+        for i, sweep in enumerate(sweeps):
+            family[i, :len(sweep)] = sweep
+        data = [family[:, :, i] for i in range(numsigs)]
+        if all(numpy.array_equal(family[0, :, 0], x) for x in family[1:, :, 0]):
+            # Same abscisse for all sweeps
+            data[0] = family[0, :, 0]
+        return data
+
+    def sweep(self, i):
+        """ Return the Signals of one sweep
+        The Signals are updated by update() like the Signals read.
+
+        Parameter
+        ---------
+        i: int
+        Index of the sweep
+
+        Returns
+        -------
+        dict of Signals
+        Signals with one-dimensional data, views on the family data
+        """
+        if i not in self._sweeps:
+            self._sweeps[i] = self._sweep_signals(i)
+            for s in self._sweeps[i].values():
+                if s not in self._signals.values():
+                    self.connect('begin-transaction', s.on_begin_transaction)
+                    self.connect('end-transaction', s.on_end_transaction)
+        return self._sweeps[i]
+
+    def _sweep_signals(self, i):
+        """ Return new Signals for one sweep, see sweep()
+        """
+        sweep = {}
+        ref = None
+        for sn, s in self._signals.items():
+            if s.data.ndim < 2:
+                sweep[sn] = s
+                continue
+            npoints = self._info['sweep_points'][i]
+            if ref is None:
+                ref = Signal(s.ref.name, s.ref.unit)
+                ref.data = s.ref.data[i, :npoints] if s.ref.data.ndim > 1\
+                    else s.ref.data[:npoints]
+            sweep[sn] = Signal(sn, s.unit)
+            sweep[sn].ref = ref
+            sweep[sn].data = s.data[i, :npoints]
+        return sweep
+
+    def update(self, upn, keep=True):
+        """ Update the Signals read, see Reader.update(), and then the
+        Signals returned by sweep()
+
+        Parameters
+        ----------
+        upn: integer
+        Update request identifier
+
+        keep: bool
+        When True Signals marked as being deleted are removed from the interal
+        Signal list
+
+        Returns
+        -------
+        n: dict of Signals
+        The list of new Signals
+        """
+        changes = self._info['changes']
+        n = super(HspiceReader, self).update(upn, keep)
+        if self._info['changes'] == changes:
+            return n
+        changed = False
+        nsweeps = len(self._info.get('sweep_points', []))
+        for (i, sweep) in self._sweeps.items():
+            new = self._sweep_signals(i) if i < nsweeps else {}
+            refs = []
+            for (sn, s) in sweep.items():
+                if s.freeze or (sn in self._signals and
+                                self._signals[sn] is s):
+                    continue
+                ns = new.get(sn)
+                if ns is None:
+                    if not keep:
+                        s.data = None
+                    continue
+                if s.ref not in refs:
+                    refs.append(s.ref)
+                    changed = self._set_data(s.ref, ns.ref) | changed
+                changed = self._set_data(s, ns) | changed
+        if changed:
+            self._info['changes'] += 1
+        return n
+
     def _read_ascii(self, f):
         """ Read hspice file in ascii format
 
-        Note 1: Support only one sweep
-        Note 2: Auto signals are note returned, only probe signals are
+        Note: Auto signals are note returned, only probe signals are
 
         Parameter
         ---------
         f: file object
-        The file to read from
+        The file to read from, opened in binary mode
 
         Returns
         -------
@@ -138,44 +417,76 @@ For more details see http://www.rvq.fr/linux/gawfmt.php
         The Signals read from the file
         """
         header = ''
-        lines = iter(f)
         while header.find('$&%#') < 0:
-            header = header + next(lines)
+            line = f.readline()
+            if not line:
+                raise ReadError(_('hspice_reader: end of header not found'))
+            header = header + line.decode('latin-1')
         (names, signals) = self._process_header(header)
 
-        data = [[] for x in range(len(names))]
-        # optimization: cache the append methods,
-        # avoiding one dictionary lookup per line
-        append = [x.append for x in data]
-        count = 0
-        n = self._nauto + self._nprobe
-        for values in lines:
-            for i, val in enumerate(values.split()):
-                if val == '.10000E+31': break
-                append[count % n](float(val))
-                count = count + 1
-            if val == '.10000E+31': break
+        self._assign_data(signals, functools.partial(
+                self._read_ascii_data, f.tell(), len(signals)))
 
         ref = signals[0]
-        ref.data = data[0]
-        for i, s in enumerate(signals[1:]):
+        for s in signals[1:]:
             s.ref = ref
-            s.data = data[i + 1]
 
         self._signals = dict(list(zip(names[self._nauto:],\
                                  signals[self._nauto:])))
         return self._signals
 
-    def _read_block(self, f):
-        """ Read one block of hspice binary file
+    def _read_ascii_data(self, pos, numsigs):
+        """ Read the data section of hspice ascii file
+
+        Values are written in fixed-width fields, possibly without space
+        between them. The field width is found on the first line, using the
+        exponent position, then the newlines are removed and the whole
+        section is sliced and converted in bulk by numpy.
+        If fields are not of fixed width, values are split on whitespaces.
+
+        Parameters
+        ----------
+        pos: int
+        Offset of the data section
 
-        Note: endianness is not managed
+        numsigs: int
+        Number of values per point, i.e. number of auto and probe signals
+
+        Returns
+        -------
+        list of numpy.ndarray
+        One column per signal, see _to_columns()
+        """
+        with self._open() as f:
+            f.seek(pos)
+            buf = f.read()
+        first = buf.lstrip(b'\r\n').split(b'\n', 1)[0].rstrip()
+        ends = [m.end() for m in re.finditer(b'[eE][+-]\\d+', first)]
+        width = ends[0] if ends else 0
+        if width and ends == list(range(width, len(first) + 1, width)):
+            buf = buf.replace(b'\r', b'').replace(b'\n', b'')
+            buf = buf[:len(buf) // width * width]
+            vals = numpy.frombuffer(buf, dtype='S%d' % width)
+            # Trailing blank fields, e.g. padding after the terminator
+            blank = numpy.flatnonzero(numpy.char.strip(vals[-numsigs:]) == b'')
+            if len(blank):
+                vals = vals[:len(vals) - numsigs + blank[0]]
+            vals = vals.astype(float)
+        else:
+            vals = numpy.array(buf.split(), dtype=float)
+        return self._to_columns(vals, numsigs)
+
+    def _read_block(self, f, endian='>'):
+        """ Read one block of hspice binary file
 
         Parameter
         ---------
         f: file object
         The file to read from
 
+        endian: string
+        '>' for big-endian, '<' for little-endian
+
         Returns
         -------
         tuple:
@@ -187,12 +498,36 @@ For more details see http://www.rvq.fr/linux/gawfmt.php
            values: string
               block data as returned by file.read()
         """
-        h = struct.unpack('>4i', f.read(16))
+        h = struct.unpack(endian + '4i', f.read(16))
         (h1, h2, h3, nbs) = h
         values = f.read(nbs)
-        pbs = struct.unpack('>i', f.read(4))
+        pbs = struct.unpack(endian + 'i', f.read(4))
         return (h, values)
 
+    def _endianness(self, h1):
+        """ Return the endianness of hspice binary file, from the endian
+        indicator found at the start of each block, whose value is 4
+
+        Parameter
+        ---------
+        h1: bytes
+        The first four bytes of a block
+
+        Returns
+        -------
+        string
+        '>' for big-endian, '<' for little-endian
+
+        Raises
+        ------
+        ReadError
+        The endian indicator is not recognized
+        """
+        for endian in '><':
+            if len(h1) == 4 and struct.unpack(endian + 'i', h1)[0] == 4:
+                return endian
+        raise ReadError(_('hspice_reader: unrecognized endian indicator'))
+
     def _process_header(self, header):
         """ Extract informations: signal names, number of variables...
 
@@ -210,6 +545,7 @@ For more details see http://www.rvq.fr/linux/gawfmt.php
            self._nauto: int, number of autovariables
            self._nprobe: int, number of user probes
            self._nsweepparam: int, number of sweep parameters
+           self._info['sweep_names']: list of sweep parameter names
         """
         nauto = header[0:4]
         nprobe = header[4:8]
@@ -239,6 +575,11 @@ For more details see http://www.rvq.fr/linux/gawfmt.php
         for i in range(int(nauto) + int(nprobe) - 1):
             dvnames.append(self._sanitize_name(tmp[i + offset + 1]))
 
+        # Sweep parameter names follow the signal names
+        self._info['sweep_names'] = tmp[offset + int(nauto) + int(nprobe):\
+                                            offset + int(nauto) + int(nprobe)\
+                                            + int(nsweepparam)]
+
         # Create Signals
         signals = []
         for i in range(len(dvunits)):
@@ -1,9 +1,10 @@
 
 
 import re
-import io
+import functools
+import numpy
 from oscopy import Signal
-from .reader import Reader, ReadError
+from .reader import Reader, ReadError, open_file
 
 class NsoutReader(Reader):
     """ Read NanoSim output files
@@ -17,17 +18,54 @@ and then each dependent variable with its idx value.
 
 Assume the independent variable is 'Time'
 
+NanoSim output is event-driven: a signal value is written only when it
+changes. Therefore each Signal has its own reference, containing only the
+time of its events, and memory is proportional to the activity. hold()
+expands a Signal to the time of all the events of the file (sample and hold),
+when a common reference is needed.
+
 For more details see http://www.rvq.fr/linux/gawfmt.php
     """
     _type_to_unit = {'U': 'V', 'I':'A'}
+    _use_cache = True
+    _cache_attrs = ('_time',)
     _instructions = ['voltage_resolution', 'current_resolution',
                      'time_resolution', 'high_threshold',
                      'high_threshold']
     
-    def detect(self, fn):
+    def sniff(self, head, fn):
         """ Look at the header if it contains the keyword 'NanoSim'
         or 'output_format'
 
+        Parameters
+        ----------
+        head: bytes
+        The head of the file
+
+        fn: string
+        Path to the file to test
+
+        Returns
+        -------
+        bool or None
+        True if the file can be handled by this reader, None if the comments
+        go beyond the head
+        """
+        lines = head.split(b'\n')
+        if len(head) >= self.SNIFF_SIZE:
+            # Last line is not complete
+            lines.pop()
+        for s in lines:
+            if not s.startswith(b';'):
+                return False
+            if s.find(b'NanoSim') > 0 or s.find(b'output_format') > 0:
+                return True
+        return None if len(head) >= self.SNIFF_SIZE else False
+
+    def detect(self, fn):
+        """ Look at the header if it contains the keyword 'NanoSim'
+        or 'output_format', reading all the comments if needed
+
         Parameter
         ---------
         fn: string
@@ -40,16 +78,18 @@ For more details see http://www.rvq.fr/linux/gawfmt.php
         """
         self._check(fn)
         try:
-            f = io.open(fn, 'r')
+            f = open_file(fn)
         except IOError as e:
             return False
-        s = f.readline()
-        found = False
-        while s.startswith(';') and not found:
-            found = (s.find('NanoSim') > 0) or (s.find('output_format') > 0)
+        found = self.sniff(f.read(self.SNIFF_SIZE), fn)
+        if found is None:
+            f.seek(0)
             s = f.readline()
+            while s.startswith(b';') and not found:
+                found = (s.find(b'NanoSim') > 0) or (s.find(b'output_format') > 0)
+                s = f.readline()
         f.close()
-        return found
+        return bool(found)
 
     def _read_signals(self):
         """ Read the signals from the file
@@ -78,12 +118,13 @@ For more details see http://www.rvq.fr/linux/gawfmt.php
         Dict of Signals
         The list of Signals read from the file
         """
-        with io.open(self._fn, 'r') as f:
-            lines = iter(f)
-            signals = {}
+        with self._open() as f:
+            indexes = []
+            signals = []
 
             # Header
-            h = next(lines)
+            pos = f.tell()
+            h = f.readline().decode('latin-1')
             while h.startswith(';') or h.startswith('.'):
                 x = h.strip('.').split()
                 if x[0] in self._instructions:
@@ -91,27 +132,96 @@ For more details see http://www.rvq.fr/linux/gawfmt.php
                 elif x[0] == 'index':
                     # Use the .index value to identify the signals
                     s = Signal(x[1], self._type_to_unit[x[3]])
-                    signals[x[2]] = s
-                h = next(lines)
-
-            # Data, cache the append methods
-            data = dict(list(zip(list(signals.keys()), [[] for x in range(len(signals))])))
-            append = dict(list(zip(list(data.keys()), [x.append for x in list(data.values())])))
-            refdata = []
-            if len(h.split()) == 1: refdata.append(float(h))
-            for values in lines:
-                x = values.split()
-                if len(x) == 1:
-                    refdata.append(float(x[0]))
-                else:
-                    append[x[0]](float(x[1]))
+                    s.ref = Signal('Time', 's')
+                    indexes.append(x[2])
+                    signals.append(s)
+                pos = f.tell()
+                h = f.readline().decode('latin-1')
+
+        # Only the events of the Signals selected are converted
+        sel = self._selected([s.name for s in signals])
+        (signals, indexes) = ([signals[i] for i in sel],
+                              [indexes[i] for i in sel])
+
+        # Each Signal has its own reference
+        self._time = Signal('Time', 's')
+        self._assign_data([self._time] + [x for s in signals\
+                                              for x in (s.ref, s)],
+                          functools.partial(self._read_data, pos, indexes))
 
         # Putting it altogether, make a dict of signals with names as keys
-        ref = Signal('Time', 's')
-        ref.data = refdata
-        for k, v in data.items():
-            signals[k].data = v
-            signals[k].ref = ref
-        self._signals = dict(list(zip([x.name for x in signals.values()],
-                                 list(signals.values()))))
+        self._signals = dict([(s.name, s) for s in signals])
         return self._signals
+
+    def _read_data(self, pos, indexes):
+        """ Read the data section in bulk
+
+        Lines are classified using numpy: lines with one value are the
+        independent variable values, lines with two values are events. Events
+        are then grouped by signal index, each one with the time of the
+        latest independent variable value.
+
+        Parameters
+        ----------
+        pos: int
+        Offset of the data section
+
+        indexes: list of strings
+        The .index value of the Signals
+
+        Returns
+        -------
+        list of numpy.ndarray
+        The time of all the events, then for each signal in indexes, the
+        time and the value of its events
+        """
+        with self._open() as f:
+            f.seek(pos)
+            buf = f.read()
+        lines = numpy.char.strip(numpy.array(
+                buf.replace(b'\t', b' ').splitlines()))
+        lines = lines[lines != b'']
+        parts = numpy.char.partition(lines, b' ')
+        is_time = (parts[:, 1] == b'')
+        times = parts[is_time, 0].astype(float)
+        # Index in times of each event, events before first time are ignored
+        event_time = (numpy.cumsum(is_time) - 1)[~is_time]
+        keys = parts[~is_time, 0][event_time >= 0]
+        values = numpy.char.strip(parts[~is_time, 2])[event_time >= 0]
+        event_time = event_time[event_time >= 0]
+
+        # Group events by signal index, keeping time order
+        order = numpy.argsort(keys, kind='stable')
+        (found, first) = numpy.unique(keys[order], return_index=True)
+        bounds = dict(zip(found, zip(first, list(first[1:]) + [len(order)])))
+        data = [times]
+        for index in indexes:
+            (start, stop) = bounds.get(index.encode('latin-1'), (0, 0))
+            events = order[start:stop]
+            data.append(times[event_time[events]])
+            data.append(values[events].astype(float))
+        return data
+
+    def hold(self, sig):
+        """ Expand a Signal to the time of all the events of the file
+        The value of the Signal is held between its events, and is NaN
+        before its first event.
+
+        Parameter
+        ---------
+        sig: Signal
+        A Signal read by this Reader
+
+        Returns
+        -------
+        Signal
+        A new Signal sharing the same reference as all expanded Signals
+        """
+        s = Signal(sig.name, sig.unit)
+        idx = numpy.searchsorted(sig.ref.data, self._time.data,
+                                 side='right') - 1
+        data = numpy.asarray(sig.data, dtype=float)[idx.clip(0)]
+        data[idx < 0] = numpy.nan
+        s.ref = self._time
+        s.data = data
+        return s
@@ -1,10 +1,22 @@
 """ Common file read functions
 """
 
+import io
 import os.path
+import gzip
+import lzma
+import bz2
+import hashlib
+import re
 import time
+import fnmatch
+import functools
+import collections
+import numpy
 from gi.repository import GObject
 from oscopy import Signal
+from .cache import cache
+from oscopy.stream import Decimate
 
 class ReadError(Exception):
     """
@@ -46,13 +58,184 @@ methods:
         """
         return self._value
 
+def grow_rows(data, n):
+    """ Return data with room for at least n rows
+    Capacity is at least doubled when data is reallocated, so appending rows
+    one chunk at a time costs an amortized O(1) per row.
+
+    Parameters
+    ----------
+    data: numpy.ndarray
+    The rows, first dimension being the capacity
+
+    n: int
+    The number of rows needed
+
+    Returns
+    -------
+    numpy.ndarray
+    data itself if large enough, otherwise a copy with a larger capacity
+    """
+    if n <= len(data):
+        return data
+    grown = numpy.empty((max(n, 2 * len(data)),) + data.shape[1:],
+                        dtype=data.dtype)
+    grown[:len(data)] = data
+    return grown
+
+# Leading bytes of compressed files and their compression
+COMPRESSIONS = ((b'\x1f\x8b', 'gzip'), (b'\xfd7zXZ\x00', 'xz'),
+                (b'BZh', 'bz2'), (b'\x28\xb5\x2f\xfd', 'zstd'))
+# Extensions of compressed files
+COMPRESSED_EXT = re.compile('\\.(gz|xz|bz2|zst)$', re.IGNORECASE)
+
+def compression(fn):
+    """ Return the compression of the file, from its leading bytes
+
+    Parameter
+    ---------
+    fn: string
+    Path to the file
+
+    Returns
+    -------
+    string or None
+    'gzip', 'xz', 'bz2' or 'zstd', None if the file is not compressed
+    """
+    with io.open(fn, 'rb') as f:
+        magic = f.read(6)
+    for (m, c) in COMPRESSIONS:
+        if magic.startswith(m):
+            return c
+    return None
+
+def strip_compression(fn):
+    """ Return the path to the file without the compression extension, e.g.
+    to find the format from the extension of the uncompressed file
+    """
+    return COMPRESSED_EXT.sub('', fn)
+
+def open_file(fn):
+    """ Open the file for reading in binary mode, compressed files being
+    decompressed on the fly while read
+    Seeking forward in compressed files is done by decompressing, seeking
+    backward decompresses again from the start of the file.
+
+    Parameter
+    ---------
+    fn: string
+    Path to the file
+
+    Returns
+    -------
+    file object
+    The file opened
+
+    Raises
+    ------
+    ReadError
+    The module needed to decompress the file is not available
+    """
+    c = compression(fn)
+    if c == 'gzip':
+        return gzip.open(fn, 'rb')
+    elif c == 'xz':
+        return lzma.open(fn, 'rb')
+    elif c == 'bz2':
+        return bz2.open(fn, 'rb')
+    elif c == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ReadError(_('zstandard module needed to read %s') % fn)
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(
+                io.open(fn, 'rb'), closefd=True), 1 << 20)
+    return io.open(fn, 'rb')
+
+def select_names(names, patterns):
+    """ Return the indexes of the names matching any of the patterns
+
+    Parameters
+    ----------
+    names: list of strings
+    The names to select from
+
+    patterns: string, compiled regex or list of them
+    Names or glob patterns, e.g. 'v*', or compiled regular expressions
+    matching the whole name. None selects all the names
+
+    Returns
+    -------
+    list of int
+    The indexes of the names selected, in ascending order
+    """
+    if patterns is None:
+        return list(range(len(names)))
+    if isinstance(patterns, (str, re.Pattern)):
+        patterns = [patterns]
+    matches = [p.fullmatch if isinstance(p, re.Pattern) else
+               re.compile(fnmatch.translate(p)).match for p in patterns]
+    return [i for (i, name) in enumerate(names)
+            if any(match(name) for match in matches)]
+
 class Reader(GObject.GObject):
     """ Reader -- Provide common function for Signal files reading
 Derives from GObject.GObject
 The purpose of this class is to provide some basic functions to read the Signals
 from files (file validation, update process) thus simplifying the definition of
 Readers for many different file formats.
-The derived class must redefine _read_signals() and detect().
+The derived class must redefine _read_signals() and sniff() or detect().
+
+Format detection works on the first bytes of the file, the head, read once
+and passed to sniff(). Readers are declared in the registry of
+detect_reader with the hints used by DetectReader to try the most likely
+Readers first: magic (leading bytes) and extensions (regex on the file
+name). Readers from plugins give them with the class attributes _magic and
+_extensions.
+
+In lazy mode, Readers supporting it through _assign_data() only parse the
+file header in _read_signals(), the data of each Signal being read from the
+file the first time it is accessed.
+
+A selection of Signal names or patterns can be given to read(), only the
+Signals selected are then returned. Readers supporting it use _selected()
+in _read_signals() to extract only the columns of the Signals selected, for
+the other ones the Signals not selected are dropped once read.
+
+Compressed files (gzip, xz, bz2 and zstd if the zstandard module is
+available) are decompressed on the fly while parsed, without temporary file.
+Derived classes shall open the file with _open(), and read the data instead
+of mapping it when _compression is set. Compressed files are not mapped
+and always read entirely on update.
+
+On update, files whose size and modification time, or content hash when
+_hash_content is True, have not changed are not read again, and Signals
+whose data is identical keep it without emitting 'changed'.
+info['changes'] counts the updates that actually changed the Signals.
+
+Readers of files written row by row can redefine _update_tail() to read only
+the rows appended since the last read on update(), extending the Signals
+data instead of rereading the whole file.
+
+iter_chunks() iterates over the data of a file by chunks of points instead
+of returning whole Signals, for processing files larger than memory, e.g.
+with the reductions of oscopy.stream. By default the file is read in lazy
+mode and the data of the Signals sliced, which runs in bounded memory for
+Readers mapping the data (raw binary files, Signals from the cache). Readers
+parsing text files redefine _iter_chunks() to parse the file by chunks.
+
+In preview mode, read() returns Signals decimated to a number of points,
+keeping the minimum and maximum of groups of consecutive points, computed in
+one pass over iter_chunks(). On update the preview is computed again. The
+full resolution data is read with load_full(), e.g. when a Graph is zoomed
+beyond the preview resolution, see Signal.load_full().
+
+Readers of text formats set _use_cache to store the Signals read in the
+binary cache of cache.py, next reads of the same unmodified file mapping
+them from the cache instead of parsing the file. The attributes listed in
+_cache_attrs are cached along with the Signals and info. The cache is
+disabled unless cache.path is set, e.g. to cache.CACHE_DIR, and can be
+turned off per Reader with the use_cache property.
 
 Properties
     signals     The list of Signal handled by the class
@@ -85,16 +268,33 @@ Signals
         self._update_num = -1  # Update number
         self._info = {}        # Misc information (e.g. last update timestamp)
         self._renamed = {}     # Translation of renamed signals
+        self._lazy = False     # Read Signal data on first access
+        self._select = None    # Names or patterns of the Signals to read
+        self._compression = None  # Compression of the file, see compression()
+        self._preview = None   # Number of points of preview Signals
+        self._info['changes'] = 0
 
-    def read(self, fn):
+    def read(self, fn, lazy=False, sigs=None, preview=None):
         """ Validate the file and read the Signals from the file.
-        This function call _check() and _read_signals().
+        This function call _check() and _read_signals(), unless the Signals
+        are found in the cache.
 
-        Parameter
-        ---------
+        Parameters
+        ----------
         fn: string
         The filename
 
+        lazy: bool
+        When True, defer the reading of Signal data until first access
+
+        sigs: string, compiled regex or list of them
+        Names or patterns of the Signals to read, see select_names().
+        None to read all the Signals
+
+        preview: int
+        When set, return Signals decimated to about this number of points,
+        the full resolution data being read with load_full()
+
         Returns
         -------
         Dict of Signals
@@ -107,13 +307,235 @@ Signals
         """
         self._check(fn)
         self._fn = fn
+        self._compression = compression(fn)
+        self._lazy = lazy
+        self._select = sigs
+        self._preview = preview
         self._info['file'] = self._fn
         self._info['last_update'] = time.time()
-        for s in self._read_signals().values():
+        if preview:
+            self._signals = self._read_preview()
+        elif not (self._use_cache and cache.load(self)):
+            self._read_signals()
+            if self._use_cache and not lazy and sigs is None and\
+                    self._cacheable():
+                cache.store(self)
+        self._signals = self._project(self._signals)
+        for s in self._signals.values():
             self.connect('begin-transaction', s.on_begin_transaction)
             self.connect('end-transaction', s.on_end_transaction)
+        self._info['state'] = self._file_state()
         return self._signals
 
+    def iter_chunks(self, fn, points=None, sigs=None):
+        """ Iterate over the data of the file by chunks of points
+
+        Memory is bounded by the size of the chunks for Readers parsing the
+        file by chunks (ColumnReader, e.g. gnucap and cazm files), mapping
+        it (spice2 and spice3 binary raw files) or reading it by slices
+        (HDF5). Other Readers read the whole data of the Signals selected in
+        memory, then iterate over it.
+
+        Signals with different Reference Signals, e.g. from several plots of
+        a file, are iterated one Reference Signal after the other. The data
+        of families, i.e. (sweeps x points), is sliced along the points.
+
+        The file is read by a new instance of the Reader, the Signals of
+        this one are not modified.
+
+        Parameters
+        ----------
+        fn: string
+        The filename
+
+        points: int
+        Maximum number of points of the chunks, CHUNK_POINTS if None
+
+        sigs: string, compiled regex or list of them
+        Names or patterns of the Signals to read, see select_names().
+        None to read all the Signals
+
+        Returns
+        -------
+        iterator of tuples:
+           ref: numpy.ndarray, the chunk of the Reference Signal
+           data: dict of numpy.ndarray, the chunk of each Signal by name
+
+        Raises
+        ------
+        ReadError
+        In case of invalid path or unsupported file format
+
+        Example
+        -------
+        >>> for (t, data) in GnucapReader().iter_chunks('tran.dat',
+        ...                                             sigs='vout'):
+        ...     print(t[0], data['vout'].max())
+        """
+        self._check(fn)
+        return type(self)()._iter_chunks(fn, points or self.CHUNK_POINTS, sigs)
+
+    def _iter_chunks(self, fn, points, sigs):
+        """ Iterate over the data by chunks, see iter_chunks()
+        Read the file in lazy mode and slice the data of the Signals, the
+        whole data of each Signal being read on first access, unless mapped.
+        This function may be redefined in derived classes, it is called on
+        a new instance of the Reader.
+        """
+        signals = self.read(fn, True, sigs)
+        groups = collections.OrderedDict()
+        for (sn, s) in signals.items():
+            groups.setdefault(id(s.ref), []).append((sn, s))
+        for group in groups.values():
+            ref = group[0][1].ref.data
+            # Families are sliced along the points, their last axis
+            for start in range(0, numpy.shape(ref)[-1], points):
+                yield (ref[..., start:start + points],
+                       dict((sn, s.data[..., start:start + points])
+                            for (sn, s) in group))
+
+    def _read_preview(self):
+        """ Return the Signals decimated to self._preview points
+
+        Names, units and references of the Signals are read in lazy mode,
+        and the data decimated by oscopy.stream.Decimate in one pass over
+        iter_chunks(). Signals with multi-dimensional data, e.g. families,
+        are returned as read in lazy mode.
+
+        Parameter
+        ---------
+        None
+
+        Returns
+        -------
+        dict of Signals
+        The preview Signals
+        """
+        lazy = type(self)().read(self._fn, True, self._select)
+        decims = dict((sn, Decimate(self._preview)) for sn in lazy)
+        for (ref, data) in self.iter_chunks(self._fn, sigs=self._select):
+            for (sn, d) in data.items():
+                if sn not in decims:
+                    continue
+                if numpy.ndim(d) != 1:
+                    del decims[sn]
+                    continue
+                decims[sn].update(ref, d)
+        signals = {}
+        refs = {}
+        for (sn, s) in lazy.items():
+            if sn not in decims:
+                signals[sn] = s
+                continue
+            (x, y) = decims[sn].result()
+            if id(s.ref) not in refs:
+                refs[id(s.ref)] = Signal(s.ref.name, s.ref.unit)
+                refs[id(s.ref)].data = x
+            signals[sn] = Signal(sn, s.unit)
+            signals[sn].ref = refs[id(s.ref)]
+            signals[sn].data = y
+            signals[sn].set_preview(self.load_full)
+        return signals
+
+    def load_full(self):
+        """ Replace the data of preview Signals by the full resolution data,
+        read in lazy mode when first accessed
+
+        Parameter
+        ---------
+        None
+
+        Returns
+        -------
+        Nothing
+        """
+        if not self._preview:
+            return
+        self._preview = None
+        self._lazy = True
+        old = self._signals
+        new = self._project(self._read_signals())
+        self._signals = old
+        refs = []
+        for (sn, ns) in new.items():
+            s = self._signals.get(self._renamed.get(sn, sn))
+            if s is None or not s.preview:
+                continue
+            s.set_preview(None)
+            if s.ref not in refs:
+                refs.append(s.ref)
+                s.ref.set_loader(functools.partial(getattr, ns.ref, 'data'))
+            s.set_loader(functools.partial(getattr, ns, 'data'))
+
+    def _open(self):
+        """ Open the file for reading in binary mode, decompressed if
+        compressed, see open_file()
+        """
+        return open_file(self._fn)
+
+    def _selected(self, names):
+        """ Return the indexes of the names of the Signals to read
+
+        Parameter
+        ---------
+        names: list of strings
+        The names of the Signals in the file
+
+        Returns
+        -------
+        list of int
+        The indexes of the names selected, in ascending order
+        """
+        return select_names(names, self._select)
+
+    def _project(self, sigs):
+        """ Return the Signals selected, for Readers not doing the
+        selection in _read_signals()
+
+        Parameter
+        ---------
+        sigs: dict of Signals
+        The Signals read
+
+        Returns
+        -------
+        dict of Signals
+        The Signals selected
+        """
+        if self._select is None:
+            return sigs
+        names = list(sigs.keys())
+        return dict((names[i], sigs[names[i]])
+                    for i in select_names(names, self._select))
+
+    def _cacheable(self):
+        """ Return whether the Signals read shall be stored in the cache,
+        e.g. False for binary files mapped directly.
+        This function may be redefined in derived classes.
+
+        Parameter
+        ---------
+        None
+
+        Returns
+        -------
+        bool
+        True to store the Signals in the cache
+        """
+        return True
+
+    @property
+    def use_cache(self):
+        """ Return whether the Signals are read from and stored in the cache
+        """
+        return self._use_cache
+
+    @use_cache.setter
+    def use_cache(self, value):
+        """ Enable or disable the cache for this Reader
+        """
+        self._use_cache = bool(value)
+
     def _read_signals(self):
         """ Read the signal list from the file, fill self.slist
         and return a dict of the signals, with the signal name as a key
@@ -131,10 +553,53 @@ Signals
         """
         return {}
 
+    def _assign_data(self, signals, read_data, columns=None):
+        """ Assign the data to the Signals, immediately or on first access
+        to data in lazy mode.
+        In lazy mode read_data() is called only once, when data of any of
+        the Signals is accessed for the first time.
+
+        Parameters
+        ----------
+        signals: list of Signals
+        The Signals to fill in
+
+        read_data: function
+        Function without argument returning a list of data, in the same
+        order as signals unless columns is given
+
+        columns: list of int
+        Indexes in the list returned by read_data() of the data of each
+        Signal, when not all the data is assigned
+
+        Returns
+        -------
+        Nothing
+        """
+        if columns is not None:
+            read_all = read_data
+            def read_data():
+                data = read_all()
+                return [data[i] for i in columns]
+        if not self._lazy:
+            for s, d in zip(signals, read_data()):
+                s.data = d
+            return
+
+        data = []
+        def load(i):
+            if not data:
+                data.append(read_data())
+            return data[0][i]
+        for i, s in enumerate(signals):
+            s.set_loader(functools.partial(load, i))
+
     # Re-read the data file
     # Return signal list and names of updated, deleted and new signals
     def update(self, upn, keep=True):
         """ On new update requests, reread the file and update self._signals.
+        When only rows were appended to the file, _update_tail() extends the
+        Signals data without rereading the file.
         Existing Signals are marked as being deleted if 'keep' is False
         and either:
            * Signal not found
@@ -163,14 +628,33 @@ Signals
             # Already updated
             return {}
 
+        if self._unchanged():
+            # Same file, nothing to read
+            self._update_num = upn
+            return {}
+
+        if self._compression is None and not self._preview and\
+                self._update_tail():
+            # Only new rows appended, Signals already updated
+            self._update_num = upn
+            self._info['last_update'] = time.time()
+            (state, self._info['state']) = (self._info['state'],
+                                            self._file_state())
+            if state is None or state[0] != self._info['state'][0]:
+                # Data appended
+                self._info['changes'] += 1
+            return {}
+
         # Save the old list and reread the file
         oldsigs = self._signals
-        sigs = self._read_signals()
+        sigs = self._read_preview() if self._preview else\
+            self._project(self._read_signals())
         # Update the old signal dict with new one
         # Find the new signals, update signals not frozen, mark deleted signals
         # and for updated signals check whether ref, ref unit or unit
         # has changed
         n = {}
+        changed = False
         for sn, s in sigs.items():
             if sn in self._renamed:
                 # Renamed signal
@@ -193,8 +677,8 @@ Signals
                         os.ref.name == ns.ref.name:
                     # Unit, reference unit and reference name are the same so
                     # Update !
-                    os.ref.data = ns.ref.data
-                    os.data = ns.data
+                    changed = self._set_data(os.ref, ns.ref) | changed
+                    changed = self._set_data(os, ns) | changed
  #                   print os.name, "updated !"
                 else:
                     # Something changed, do not update
@@ -216,11 +700,142 @@ Signals
         for sn in d:
             del self._signals[sn]
         self._info['last_update'] = time.time()
+        self._info['state'] = self._file_state()
+        if changed or n or d:
+            self._info['changes'] += 1
         return n
 
+    def _set_data(self, old, new):
+        """ Assign the data of new Signal to old one, unless identical so
+        that no 'changed' event is emitted
+
+        Parameters
+        ----------
+        old: Signal
+        The Signal to update
+
+        new: Signal
+        The Signal read again
+
+        Returns
+        -------
+        bool
+        True if old Signal data was changed
+        """
+        if new is old:
+            return False
+        if not old.loaded:
+            # Data never accessed, read it from the new Signal when needed
+            old.set_loader(lambda: new.data)
+            return True
+        (od, nd) = (old.data, new.data)
+        if od is nd or (od is not None and nd is not None and\
+                            numpy.shape(od) == numpy.shape(nd) and\
+                            numpy.array_equal(od, nd)):
+            return False
+        old.data = nd
+        return True
+
+    def _file_state(self):
+        """ Return the state of the file used to detect changes: size,
+        modification time and content hash if _hash_content is True
+
+        Parameter
+        ---------
+        None
+
+        Returns
+        -------
+        tuple or None
+        The file state, None if the Reader does not read from a file
+        """
+        if not isinstance(self._fn, str) or not os.path.isfile(self._fn):
+            return None
+        st = os.stat(self._fn)
+        digest = None
+        if self._hash_content:
+            h = hashlib.blake2b()
+            with io.open(self._fn, 'rb') as f:
+                for chunk in iter(functools.partial(f.read, 1 << 20), b''):
+                    h.update(chunk)
+            digest = h.digest()
+        return (st.st_size, st.st_mtime_ns, digest)
+
+    def _unchanged(self):
+        """ Return whether the file is unchanged since last read, i.e. same
+        size and modification time, or same size and content hash if
+        _hash_content is True
+
+        Parameter
+        ---------
+        None
+
+        Returns
+        -------
+        bool
+        True if the file does not need to be read again
+        """
+        state = self._info.get('state')
+        if state is None or not os.path.isfile(self._fn):
+            return False
+        st = os.stat(self._fn)
+        if (st.st_size, st.st_mtime_ns) == state[:2]:
+            return True
+        if state[2] is None or st.st_size != state[0]:
+            return False
+        new = self._file_state()
+        if new[2] == state[2]:
+            # Touched only, remember the new modification time
+            self._info['state'] = new
+            return True
+        return False
+
+    _magic = ()            # Leading bytes of the files handled
+    _extensions = None     # Regex matching the names of the files handled
+    SNIFF_SIZE = 8192      # Size of the head of file passed to sniff()
+    CHUNK_POINTS = 1 << 16 # Number of points of chunks from iter_chunks()
+    _hash_content = False  # Compare content hash of files touched on update
+    _use_cache = False     # Read Signals from the binary cache when enabled
+    _cache_attrs = ()      # Attributes stored in the cache with the Signals
+
+    def _update_tail(self):
+        """ Read the data appended to the file since last read and extend
+        the data of the Signals not frozen.
+        This function shall be redefined in derived classes supporting it.
+
+        Parameter
+        ---------
+        None
+
+        Returns
+        -------
+        bool
+        True if the Signals are up to date, False if the file shall be
+        read again, e.g. file rewritten or data not yet read in lazy mode
+        """
+        return False
+
+    def _tail_signals(self, names):
+        """ Return the Signals to update from their names as read in the
+        file, taking into account the renamed Signals
+
+        Parameter
+        ---------
+        names: list of strings
+        The names of the Signals in the file
+
+        Returns
+        -------
+        list of Signals or None
+        None for Signals no more in self._signals
+        """
+        return [self._signals.get(self._renamed.get(n, n)) for n in names]
+
     def detect(self, fn):
         """ Check if the file provided can be read by this object
-        This function shall be redefined in derived class
+        Read the head of the file and call sniff(). When sniff() cannot
+        decide on the head only, the derived class shall redefine this
+        function.
 
         Parameter
         ---------
@@ -232,7 +847,49 @@ Signals
         bool
         True if the file can be handled by this reader
         """
-        return False
+        self._check(fn)
+        try:
+            head = self.read_head(fn)
+        except IOError as e:
+            return False
+        return bool(self.sniff(head, fn))
+
+    def sniff(self, head, fn):
+        """ Check if the file can be read by this object from its head
+        This function shall be redefined in derived class
+
+        Parameters
+        ----------
+        head: bytes
+        The first SNIFF_SIZE bytes of the file, or less for small files
+
+        fn: string
+        Path to the file to test
+
+        Returns
+        -------
+        bool or None
+        True if the file can be handled by this reader, None if the head is
+        not enough to decide, i.e. detect() shall be called
+        """
+        return None
+
+    @classmethod
+    def read_head(cls, fn):
+        """ Read the head of the file passed to sniff()
+
+        Parameter
+        ---------
+        fn: string
+        Path to the file
+
+        Returns
+        -------
+        bytes
+        The first SNIFF_SIZE bytes of the file, decompressed if compressed
+        """
+        with open_file(fn) as f:
+            return f.read(cls.SNIFF_SIZE)
 
     def _check(self, fn):
         """ Check if the file is accessible
@@ -367,7 +1024,11 @@ Signals
         os = self._signals[oldname]
         ns = Signal(newname, os.unit)
         ns.ref = os.ref
-        ns.data = os.data
+        if os.loaded:
+            ns.data = os.data
+        else:
+            # Keep the data unread
+            ns.set_loader(lambda: os.data)
         ns.freeze = os.freeze
 
         del self._signals[oldname]
@@ -2,8 +2,9 @@
 
 from oscopy import Signal
 from .reader import Reader, ReadError
-import struct
-import io
+import functools
+import numpy
+import os
 
 class Spice2rawReader(Reader):
     """ Read Berkeley Spice2G6 'raw' output files
@@ -11,15 +12,26 @@ class Spice2rawReader(Reader):
     Currently support only one dataset per file
     Date and Time fields are not processed
 
+    The header is parsed once with numpy structured types and the data
+    section is mapped as a (points x variables) float64 array with
+    numpy.memmap, each Signal being a column view of it. Compressed files
+    are decompressed in memory instead.
+
     see http://www.rvq.fr/linux/gawfmt.php for format description
     """
     _signature = 'rawfile1'
     _types_to_unit = {0: 'a.u.', 1: 's', 2: 'V', 3: 'A', 4: 'Hz', 5: 'a.u.'}
-    def detect(self, fn):
+    _head = numpy.dtype([('signature', 'S8'), ('title', 'S80'),
+                         ('date', 'S8'), ('time', 'S8'), ('mode', '<i2'),
+                         ('nvars', '<i2'), ('const4', '<i2')])
+    def sniff(self, head, fn):
         """ Look at the header if it contains the keyword self._signature
 
-        Parameter
-        ---------
+        Parameters
+        ----------
+        head: bytes
+        The head of the file
+
         fn: string
         Path to the file to test
 
@@ -28,14 +40,7 @@ class Spice2rawReader(Reader):
         bool
         True if the file can be handled by this reader
         """
-        self._check(fn)
-        try:
-            f = io.open(fn, 'r')
-        except IOError as e:
-            return False
-        s = f.read(8)
-        f.close()
-        return s == self._signature
+        return head[:8] == self._signature.encode()
 
     def _read_signals(self):
         """ Read the signals from the file
@@ -57,49 +62,74 @@ class Spice2rawReader(Reader):
         ReaderError
         In case of invalid path or unsupported file format
         """
-        header_fields = ['signature', 'title', 'date', 'time',
-                         'mode', 'nvars', 'const4']
-        with io.open(self._fn, 'rb') as f:
+        with self._open() as f:
             # Header
-            signature = f.read(8).decode()
-            title = f.read(80).strip(b'\x00').decode()
-            res = f.read(22)
-            (date, t, mode, nvars, const4) = struct.unpack('<2d3h' ,res)
-            self._info.update(dict(list(zip(header_fields, (signature, title, date.decode(), t.decode(), mode.decode(), nvars.decode(), const4.decode())))))
-
-            names = []
-            for i in range(nvars):
-                names.append(f.read(8).strip('#').strip(b'\x00').decode())
-            types = struct.unpack('<%dh' % nvars, f.read(2 * nvars).decode())
-            locs = struct.unpack('<%dh' % nvars, f.read(2 * nvars).decode())
-            self._info['plottitle'] = f.read(24).strip(b'\x00')
-
-            # Now we can create the signals
-            signals = []
-            for i in range(nvars):
-                signals.append(Signal(names[i],
-                                      self._types_to_unit.get(types[i], 'a.u.')))          
-            # Data
-            data = [[] for x in range(len(names))]
-            # optimization: cache the append methods,
-            # avoiding one dictionary lookup per line
-            append = [x.append for x in data]
-            while f:
-                tmp = f.read(8 * nvars).decode()
-                if len(tmp) < 8 * nvars: break
-                values = struct.unpack('<%dd' % nvars, tmp)
-                for i, v in enumerate(values):
-                    append[i](v.decode())
-            
+            buf = f.read(self._head.itemsize)
+            if len(buf) < self._head.itemsize:
+                raise ReadError(_('spice2raw_reader: truncated header'))
+            head = numpy.frombuffer(buf, dtype=self._head)
+            nvars = int(head['nvars'][0])
+            vars_type = numpy.dtype([('names', 'S8', (nvars,)),
+                                     ('types', '<i2', (nvars,)),
+                                     ('locs', '<i2', (nvars,)),
+                                     ('plottitle', 'S24')])
+            buf = f.read(vars_type.itemsize)
+            if len(buf) < vars_type.itemsize:
+                raise ReadError(_('spice2raw_reader: truncated header'))
+            var = numpy.frombuffer(buf, dtype=vars_type)
+            offset = f.tell()
+        for field in self._head.names:
+            value = head[field][0]
+            self._info[field] = value.decode('latin-1').strip('\x00')\
+                if isinstance(value, bytes) else int(value)
+        self._info['plottitle'] = var['plottitle'][0].decode('latin-1')
+        names = [x.decode('latin-1').strip('\x00').strip('#').strip()
+                 for x in var['names'][0]]
+        types = var['types'][0]
+
+        # Now we can create the signals, only the columns selected are used
+        cols = [0] + [i + 1 for i in self._selected(names[1:])]
+        signals = [Signal(names[i], self._types_to_unit.get(int(types[i]),
+                                                           'a.u.'))
+                   for i in cols]
+        self._assign_data(signals, functools.partial(self._read_data,
+                                                     offset, nvars), cols)
         ref = signals[0]
-        ref.data = data[0]
-        for i, s in enumerate(signals[1:]):
+        for s in signals[1:]:
             s.ref = ref
-            s.data = data[i + 1]
 
-        self._signals = dict(list(zip(names[1:], signals[1:])))
-        print(self._signals)
+        self._signals = dict((s.name, s) for s in signals[1:])
         return self._signals
 
-            
-    
+    def _read_data(self, offset, nvars):
+        """ Map the data section as a (points x variables) array
+
+        Parameters
+        ----------
+        offset: int
+        Offset of the data section
+
+        nvars: int
+        Number of variables
+
+        Returns
+        -------
+        list of numpy.ndarray
+        One column view per variable
+        """
+        if self._compression is not None:
+            # Cannot be mapped, decompress it
+            with self._open() as f:
+                f.seek(offset)
+                buf = bytearray(f.read())
+            n = len(buf) // (8 * nvars)
+            data = numpy.frombuffer(buf, dtype='<f8', count=n * nvars)\
+                .reshape(n, nvars)
+            return [data[:, i] for i in range(nvars)]
+        n = (os.path.getsize(self._fn) - offset) // (8 * nvars)
+        if n > 0:
+            data = numpy.memmap(self._fn, dtype='<f8', mode='c',
+                                offset=offset, shape=(n, nvars))
+        else:
+            data = numpy.zeros((0, nvars))
+        return [data[:, i] for i in range(nvars)]
@@ -2,9 +2,11 @@
 
 import re
 import io
+import os
+import functools
+import numpy
 from oscopy import Signal
-from .reader import Reader, ReadError
-import struct
+from .reader import Reader, ReadError, grow_rows
 
 # ivar: independent variable (Time, Frequency)
 # dvar: dependent variables (Signals)
@@ -16,23 +18,41 @@ Spice3 files can be binary or ascii. Both types have a plain text header
 containing various informations. This Reader uses 'Flags', 'No. Variables',
 'No. Points' and 'Variables'.
 
-Supports real and complex numbers
+Supports real and complex numbers, and lazy reading of the data
 
-Note: It supports only one simulation per file
+A file can contain several simulations (plots), e.g. ngspice writes .op,
+.tran, .ac and .step runs into the same file. The file is scanned once to
+find the offset of each plot, and data of each plot is read separately.
+When there are several plots in the file, Signal names are suffixed with the
+plot identifier, e.g. vout_tran1, vout_ac1. Plots found are stored in
+self.info['plots'].
 
 For more details see http://www.rvq.fr/linux/gawfmt.php    
     """
-    _types_to_unit = {'Time': 's', 'voltage': 'V', 'current': 'A', 'frequency': 'Hz'}
+    _types_to_unit = {'Time': 's', 'time': 's', 'voltage': 'V',
+                      'current': 'A', 'frequency': 'Hz'}
     _blocks = ['Plotname', 'Flags', 'No. Variables', 'No. Points', 'Command',
                'Variables', 'Title', 'Date']
     _flags = ['complex', 'real']
+    _plotnames_to_ids = {'transient analysis': 'tran', 'ac analysis': 'ac',
+                         'dc transfer characteristic': 'dc',
+                         'operating point': 'op',
+                         'noise spectral density curves': 'noise',
+                         'integrated noise': 'noise',
+                         'transfer function': 'tf',
+                         'sensitivity analysis': 'sens',
+                         'pole-zero analysis': 'pz'}
+    _scan_chunk = 1 << 20
     
-    def detect(self, fn):
+    def sniff(self, head, fn):
         """ Look at the header if it contains the keyword 'Title:' at first line
         and 'Data:' at second line
 
-        Parameter
-        ---------
+        Parameters
+        ----------
+        head: bytes
+        The head of the file
+
         fn: string
         Path to the file to test
 
@@ -41,24 +61,16 @@ For more details see http://www.rvq.fr/linux/gawfmt.php
         bool
         True if the file can be handled by this reader
         """
-        self._check(fn)
-        blocks = self._blocks
-        nvar = 0
-        with io.open(fn, 'r') as f:
-            lines = iter(f)
-            try:
-                if lines.next().startswith('Title') and lines.next().startswith('Date'):
-                    return True
-            except AttributeError:
-                return False
-        return False
+        lines = head.split(b'\n', 2)
+        return len(lines) > 1 and lines[0].startswith(b'Title') and\
+            lines[1].startswith(b'Date')
 
     def _read_signals(self):
         """ Read the signals from the file
 
-        First get the reader and extract number, names and types of variables
-        Then read the data values, and finally, assign the abscisse and
-        data to each signal.
+        First scan the file to find the plots, with for each of them the
+        number, names and types of variables. Then read the data values of
+        each plot, and finally, assign the abscisse and data to each signal.
 
         Parameter
         ---------
@@ -75,142 +87,443 @@ For more details see http://www.rvq.fr/linux/gawfmt.php
         ReaderError
         In case of invalid path or unsupported file format
         """
-        read_fun = None
-        blocks = self._blocks
         data_read_fun = {'Binary': self._read_binary, 'Values': self._read_ascii}
-        signals = []
-        types = []
-        names = []
-        pos = 0 # Position of the data start
-        with io.open(self._fn, 'r') as f:
-            for line in f:
-                pos = pos + len(line)
-                # Parse the file
-                words = line.split()
-                word = words[0].rstrip(':')
-                value = words[1] if len(words) > 1 else None
-                if word.startswith('No.'):
-                    # Lines starting with 'No. '
-                    word = ' '.join((word, words[1].rstrip(':')))
-                    value = words[2]
-                if word in blocks:
-                    # Header word
-                    if word == 'No. Variables':
-                        nvar = int(words[2])
-                    elif word == 'Variables':
-                        # Initialize Signals
-                        for i in range(nvar):
-                            x = next(f)
-                            pos = pos + len(x)
-                            x = x.split()
-                            name = x[1].replace('(', '').replace(')', '')\
-                                   .replace('#', '').replace('+', '')\
-                                   .replace('-', '')
-                            
-                            signals.append(Signal(name, self._types_to_unit.get(x[2], 'a.u')))
-
-                            names.append(name)
-                    n = blocks.index(word)
-                    self.info[word] = value
-                elif word in list(data_read_fun.keys()):
-                    # Header processing finished
+        plots = self._scan()
+        if not plots:
+            raise ReadError(_('Spice3raw_reader: no plot found'))
+
+        self._signals = {}
+        for plot in plots:
+            names = [self._signal_name(name, plot, len(plots))\
+                         for name in plot['names'][1:]]
+            cols = [0] + [i + 1 for i in self._selected(names)]
+            if len(cols) < 2:
+                # No Signal selected in this plot
+                plot['signals'] = names
+                continue
+            ref = Signal(plot['names'][0], plot['units'][0])
+            signals = [ref]
+            for i in cols[1:]:
+                s = Signal(names[i - 1], plot['units'][i])
+                s.ref = ref
+                signals.append(s)
+            # Data is read from the offset of the plot, the columns of the
+            # Signals not selected are not used
+            self._assign_data(signals, functools.partial(
+                    data_read_fun[plot['format']], plot), cols)
+            plot['signals'] = names
+            self._signals.update((s.name, s) for s in signals[1:])
+
+        # Header of the first plot for compatibility
+        self._info.update(plots[0]['header'])
+        self._info['plots'] = plots
+        return self._signals
+
+    def _signal_name(self, name, plot, nplots):
+        """ Return the name of the Signal presented to the user
+
+        Parameters
+        ----------
+        name: string
+        The variable name as read in the file
+
+        plot: dict
+        The plot the variable belongs to
+
+        nplots: int
+        The number of plots in the file
+
+        Returns
+        -------
+        string
+        The variable name, suffixed with the plot identifier if there is
+        more than one plot in the file
+        """
+        return name if nplots < 2 else '%s_%s' % (name, plot['id'])
+
+    def _scan(self):
+        """ Scan the file for plots
+
+        Read the header of each plot, and skip its data using the number of
+        points for binary data or looking for the next header for ascii data.
+
+        Parameter
+        ---------
+        None
+
+        Returns
+        -------
+        list of dict
+        One dict per plot:
+           'header': dict of header words and values
+           'id': string, the plot identifier e.g. 'tran1'
+           'names', 'units': list of strings, names and units of variables
+           'format': string, either 'Binary' or 'Values'
+           'start': int, position of the header in the file
+           'offset', 'end': int, position of the data in the file
+           'check': bytes, for the last plot, see _tail_check()
+        """
+        plots = []
+        ids = {}
+        size = os.path.getsize(self._fn)
+        with self._open() as f:
+            while True:
+                start = f.tell()
+                plot = self._read_header(f)
+                if plot is None:
                     break
+                plot_id = self._plotnames_to_ids.get(
+                    plot['header'].get('Plotname', '').lower(), 'plot')
+                ids[plot_id] = ids.get(plot_id, 0) + 1
+                plot['id'] = '%s%d' % (plot_id, ids[plot_id])
+                plot['start'] = start
+                if plot['format'] == 'Binary':
+                    is_complex = (plot['header']['Flags'] == 'complex')
+                    rowsize = len(plot['names']) * (16 if is_complex else 8)
+                    end = plot['offset'] + int(plot['header']['No. Points'])\
+                        * rowsize
+                    # Size of decompressed data is not known
+                    plot['end'] = min(end, size) if self._compression is None\
+                        else end
                 else:
-                    raise ReadError(_('Spice3raw_reader: unexpected keyword in header: \'%s\'') % word)
+                    plot['end'] = self._find_ascii_end(f, plot['offset'])
+                plots.append(plot)
+                f.seek(plot['end'])
+        if plots and self._compression is None:
+            plots[-1]['check'] = self._tail_check(plots[-1], plots[-1]['end'])
+        return plots
 
-        # Can now read the data
-        data = [[] for x in range(len(signals))]
-        append = [x.append for x in data]
+    def _read_header(self, f):
+        """ Read one plot header, from current position up to the data
 
-        data_read_fun[word](pos, append)
+        Parameter
+        ---------
+        f: file object
+        The file to read from, opened in binary mode as binary data
+        follows the header
 
-        ref = signals[0]
-        ref.data = data[0]
-        for i, s in enumerate(signals[1:]):
-            s.ref = ref
-            s.data = data[i + 1]
+        Returns
+        -------
+        dict or None
+        The plot description as returned by _scan(), None at end of file
 
-        self._signals = dict(list(zip(names[1:], signals[1:])))
-        return self._signals
-    
-    def _read_binary(self, pos, append):
+        Raises
+        ------
+        ReadError
+        In case of unexpected keyword in header
+        """
+        blocks = self._blocks
+        header = {}
+        names = []
+        units = []
+        for line in iter(f.readline, b''):
+            words = line.decode('latin-1').split()
+            if not words:
+                continue
+            word = words[0].rstrip(':')
+            value = words[1] if len(words) > 1 else None
+            if word.startswith('No.'):
+                # Lines starting with 'No. '
+                word = ' '.join((word, words[1].rstrip(':')))
+                value = words[2]
+            if word in blocks:
+                # Header word
+                if word == 'Variables':
+                    for i in range(int(header['No. Variables'])):
+                        x = f.readline().decode('latin-1').split()
+                        name = x[1].replace('(', '').replace(')', '')\
+                               .replace('#', '').replace('+', '')\
+                               .replace('-', '')
+                        names.append(name)
+                        units.append(self._types_to_unit.get(x[2], 'a.u'))
+                elif word in ('Plotname', 'Title', 'Command'):
+                    value = line.decode('latin-1').split(':', 1)[1].strip()
+                header[word] = value
+            elif word in ('Binary', 'Values'):
+                # Header processing finished
+                return {'header': header, 'names': names, 'units': units,
+                        'format': word, 'offset': f.tell()}
+            else:
+                raise ReadError(_('Spice3raw_reader: unexpected keyword in header: \'%s\'') % word)
+        return None
+
+    def _find_ascii_end(self, f, pos):
+        """ Return the position of the end of ascii data, i.e. the next line
+        starting with a letter (next header) or the end of the file
+
+        Parameters
+        ----------
+        f: file object
+        The file to read from, opened in binary mode
+
+        pos: int
+        The position of the start of the data
+
+        Returns
+        -------
+        int
+        The position of the end of the data
+        """
+        f.seek(pos)
+        last = b''
+        while True:
+            chunk = f.read(self._scan_chunk)
+            if not chunk:
+                return pos
+            m = re.search(b'\n[A-Za-z]', last + chunk)
+            if m is not None:
+                return pos - len(last) + m.start() + 1
+            pos = pos + len(chunk)
+            last = chunk[-1:]
+
+    def _read_binary(self, plot):
         """ Read the data from the file in binary mode.
 
-        Data is read for the number of points defined in 'No. Points'.
-        Data type is assumed to be 'double' whatever the type is (complex or
-        real). This is in disagreement with http://www.rvq.fr/linux/gawfmt.php.
+        Data is read for the number of points defined in 'No. Points', or
+        less if the file is truncated (e.g. simulation still running).
+        Values are stored as little-endian doubles, or as pairs of doubles
+        for complex data, including the independent variable. This is in
+        disagreement with http://www.rvq.fr/linux/gawfmt.php.
+
+        The data block is mapped in memory in one shot using a structured
+        dtype describing one row of the file, no per-point processing is
+        done in Python. Each array returned is a strided view on the mapping,
+        changes made to it are kept private (copy-on-write).
 
         Parameter
         ---------
-        pos: integer
-        The offset where to start reading the data
+        plot: dict
+        The plot to read, as returned by _scan()
 
-        append: list of append() methods
-        List to use to store the data
+        Returns
+        -------
+        list of numpy.ndarray
+        One array per variable, the independent variable being the first one
+        """
+        flags = plot['header'].get('Flags')
+        if flags not in self._flags:
+                raise ReadError(_('Spice3raw_reader: unexpected value for keyword \'Flags\': %s')% flags)
+
+        is_complex = (flags == 'complex')
+        nvars = len(plot['names'])
+        row = numpy.dtype([('v%d' % i, '<c16' if is_complex else '<f8')
+                           for i in range(nvars)])
+        # Do not go beyond the end of file
+        n = (plot['end'] - plot['offset']) // row.itemsize
+        if self._compression is not None:
+            # Cannot be mapped, decompress it
+            with self._open() as f:
+                f.seek(plot['offset'])
+                buf = bytearray(f.read(n * row.itemsize))
+            rows = numpy.frombuffer(buf, dtype=row,
+                                    count=len(buf) // row.itemsize)
+        elif n > 0:
+            rows = numpy.memmap(self._fn, dtype=row, mode='c',
+                                offset=plot['offset'], shape=(n,))
+        else:
+            rows = numpy.zeros(0, dtype=row)
+        data = [rows['v%d' % i] for i in range(nvars)]
+        if is_complex:
+            # Independent variable is stored as complex
+            data[0] = data[0].real
+        return data
+
+    def _read_ascii(self, plot):
+        """ Read the data from the file in ascii mode.
+
+        Data is read for the number of points defined in 'No. Points', or
+        less if the file is truncated (e.g. simulation still running).
+        The 'Values:' section is read as a single buffer, split into tokens
+        and converted in bulk by numpy. Each point is made of its index
+        followed by the value of each variable, complex values being written
+        as 're,im' pairs.
+
+        Parameter
+        ---------
+        plot: dict
+        The plot to read, as returned by _scan()
+
+        Returns
+        -------
+        list of numpy.ndarray
+        One array per variable, the independent variable being the first one
+        """
+        with self._open() as f:
+            f.seek(plot['offset'])
+            buf = f.read(plot['end'] - plot['offset'])
+        (cut, nrows, rows) = self._parse_ascii(buf, plot)
+        plot['tail'] = {'end': plot['offset'] + cut, 'rows': nrows,
+                        'n': len(rows), 'data': rows}
+        n = min(len(rows), int(plot['header']['No. Points']))
+        return self._columns(rows[:n], plot)
+
+    def _parse_ascii(self, buf, plot):
+        """ Convert ascii data into a (points x variables) array
+
+        Parameters
+        ----------
+        buf: bytes
+        The data, starting at the beginning of a point
+
+        plot: dict
+        The plot the data belongs to
 
         Returns
         -------
-        append: list of append() methods
+        tuple:
+           cut: int, offset in buf of the last point, which might be
+           incomplete and is read again on update
+           nrows: int, number of points before cut
+           rows: numpy.ndarray, the points, complex for complex data
+        """
+        is_complex = (plot['header'].get('Flags') == 'complex')
+        nvars = len(plot['names'])
+        width = 2 if is_complex else 1
+        rowlen = 1 + nvars * width
+
+        # Each point starts with its index at the beginning of a line,
+        # values of other variables being on lines starting with a tab
+        cut = 0
+        window = 1 << 16
+        while True:
+            pos = max(len(buf) - window, 0)
+            last = None
+            for last in re.finditer(b'\n[ ]*[0-9]', buf[pos:]):
+                pass
+            if last is not None:
+                cut = pos + last.start() + 1
+                break
+            if not pos:
+                break
+            window = window * 2
+
+        # Parsed in C by numpy, any whitespace being a separator
+        buf = buf.replace(b',', b' ')
+        values = numpy.fromstring(buf, sep=' ')
+        nrows = (len(values) - len(buf[cut:].split())) // rowlen
+
+        # One row per point, starting with the point index
+        n = len(values) // rowlen
+        rows = values[:n * rowlen].reshape(n, rowlen)[:, 1:]
+        if is_complex:
+            rows = rows[:, 0::2] + 1j * rows[:, 1::2]
+        return (cut, nrows, rows)
+
+    def _columns(self, rows, plot):
+        """ Return the columns of a (points x variables) array, the
+        independent variable being real
         """
-        if self._info['Flags'] not in self._flags:
-                raise ReadError(_('Spice3raw_reader: unexpected value for keyword \'Flags\': %s')% (self._info['Flags']))
+        data = [rows[:, i] for i in range(len(plot['names']))]
+        if plot['header'].get('Flags') == 'complex':
+            data[0] = data[0].real
+        return data
 
-        is_complex = (self._info['Flags'] == 'complex')
-        nvars = int(self._info['No. Variables']) * (2 if is_complex else 1)
-        n = int(self._info['No. Points']) # Data counter
+    def _tail_check(self, plot, end):
+        """ Return the bytes used to check the file was not rewritten: the
+        header of the plot, without the number of points patched by the
+        simulator, and the last bytes of data read
 
-        with io.open(self._fn, 'rb') as f:
-            # print pos, '(0x%04x)'% pos
-            f.seek(pos)
-            while f and n:
-                tmp = f.read(8 * nvars).decode()
-                if len(tmp) < 8 * nvars: break
-                values = struct.unpack('<%dd' % nvars, tmp)
-                n = n - 1
-                if is_complex:
-                    for i, v in enumerate(values[::2]):
-                        append[i](complex(v.devode(), values[2*i+1].decode()))
-                else:
-                    for i, v in enumerate(values):
-                        append[i](v.decode())
-        return append
+        Parameters
+        ----------
+        plot: dict
+        The plot, as returned by _scan()
 
-    def _read_ascii(self, pos, append):
-        """ Read the data from the file in ascii mode.
+        end: int
+        Offset of the end of the data read
 
-        Data is read for the number of points defined in 'No. Points'.
+        Returns
+        -------
+        bytes
+        The bytes to compare
+        """
+        with io.open(self._fn, 'rb') as f:
+            f.seek(plot['start'])
+            head = f.read(plot['offset'] - plot['start'])
+            f.seek(max(end - 256, plot['offset']))
+            data = f.read(max(end - f.tell(), 0))
+        return re.sub(b'No. Points:[^\n]*', b'', head) + data
+
+    def _update_tail(self):
+        """ Read the points appended to the last plot since the last read
+        and extend the Signals data
+
+        The header of the last plot is read again to get the number of
+        points, patched by the simulator while running. Binary data is
+        mapped again up to the new end, ascii data is parsed from the last
+        point read, and stored after the points already read with amortized
+        growth of the array. The file is read again when rewritten, i.e.
+        when the bytes of _tail_check() changed.
 
         Parameter
         ---------
-        pos: integer
-        The offset where to start reading the data
-
-        append: list of append() methods
-        List to use to store the data
+        None
 
         Returns
         -------
-        append: list of append() methods
+        bool
+        True if the Signals are up to date, False if the file shall be
+        read again, e.g. header changed or a new plot appended
         """
-        is_complex = (self._info['Flags'] == 'complex')
-        nvars = int(self._info['No. Variables']) * (2 if is_complex else 1)
-        n = int(self._info['No. Points']) # Data counter
-
-        with io.open(self._fn, 'r') as f:
-            f.seek(pos)
-            while f and n:
-                values = next(f)
-                x = values.split()
-                if len(x) > 1:
-                    # Get the ivar
-                    append[0](float(x[1]))
-                    n = n - 1
-                    for i in range(1, nvars):
-                        # And the dvars
-                        values = f.next().split()
-                        if is_complex:
-                            append[i](complex(float(values[0]), float(values[1])))
-                        else:
-                            append[i](float(values[0]))
-        return append
-    
+        plots = self._info.get('plots')
+        if not plots or not all(s.loaded for s in self._tail_signals(
+                plots[-1]['signals']) if s is not None):
+            return False
+        plot = plots[-1]
+        size = os.path.getsize(self._fn)
+        with io.open(self._fn, 'rb') as f:
+            f.seek(plot['start'])
+            new = self._read_header(f)
+            if new is None or new['names'] != plot['names'] or\
+                    new['format'] != plot['format'] or\
+                    new['offset'] != plot['offset'] or\
+                    new['header'].get('Flags') != plot['header'].get('Flags'):
+                return False
+            if self._tail_check(plot, plot['end']) != plot.get('check'):
+                # File rewritten, e.g. simulation run again
+                return False
+            plot['header'] = new['header']
+            npoints = int(plot['header']['No. Points'])
+            if plot['format'] == 'Binary':
+                is_complex = (plot['header']['Flags'] == 'complex')
+                rowsize = len(plot['names']) * (16 if is_complex else 8)
+                end = min(plot['offset'] + npoints * rowsize, size)
+            else:
+                if 'tail' not in plot:
+                    return False
+                end = self._find_ascii_end(f, plot['tail']['end'])
+            if end < plot['end']:
+                # File rewritten
+                return False
+            if end == plot['end']:
+                # Nothing appended
+                return True
+            f.seek(end)
+            if f.read(5) == b'Title':
+                # New plot appended
+                return False
+            if plot['format'] == 'Values':
+                f.seek(plot['tail']['end'])
+                buf = f.read(end - plot['tail']['end'])
+        plot['end'] = end
+        plot['check'] = self._tail_check(plot, end)
+
+        if plot['format'] == 'Binary':
+            data = self._read_binary(plot)
+        else:
+            tail = plot['tail']
+            (cut, nrows, rows) = self._parse_ascii(buf, plot)
+            n = tail['rows'] + len(rows)
+            tail['data'] = grow_rows(tail['data'], n)
+            tail['data'][tail['rows']:n] = rows
+            (tail['end'], tail['rows'], tail['n']) =\
+                (tail['end'] + cut, tail['rows'] + nrows, n)
+            data = self._columns(tail['data'][:min(n, npoints)], plot)
+
+        signals = self._tail_signals(plot['signals'])
+        ref = next((s.ref for s in signals if s is not None), None)
+        if ref is not None:
+            ref.data = data[0]
+        for (s, d) in zip(signals, data[1:]):
+            if s is not None and not s.freeze:
+                s.data = d
+        return True
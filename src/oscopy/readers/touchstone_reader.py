@@ -1,10 +1,9 @@
 
 
-import re, cmath, numpy as np
+import re, numpy as np
 import io
 from oscopy import Signal
-from .reader import Reader, ReadError
-import struct, os
+from .reader import Reader, ReadError, open_file, strip_compression
 
 class TouchstoneReader(Reader):
     """ Read Touchstone(r) or snp file format, version 1 and 2.0
@@ -13,8 +12,15 @@ Noise parameter data is read and stored in self.info['noise_param'].
 
 Mixed mode parameters of version 2.0 not supported.
 
+Network data is parsed in bulk and converted once into a single (frequencies
+x ports x ports) complex array stored in self.info['network'], with
+self.info['param'] and self.info['reference'] (reference impedance, a list
+with one value per port). Each Xij Signal is a view on this array, Xij_a
+and Xij_b Signals being views on the data as read from the file.
+
 Note: this Reader uses the file extension to determine the number of ports
-for version 1 of this format specification ('.snp' where n is 1-4)
+for version 1 of this format specification ('.snp' where n is the number of
+ports)
 
 For more details, see http://www.eda.org/ibis/touchstone_ver2.0/touchstone_ver2_0.pdf
     """
@@ -29,12 +35,40 @@ For more details, see http://www.eda.org/ibis/touchstone_ver2.0/touchstone_ver2_
                 'begin information', 'end information',
                 'network data', 'noise data', 'end']
     MATRIX_FORMAT = ['full', 'lower', 'upper']
-    EXT_PORTS = {'s1p': 1, 's2p': 2, 's3p': 3, 's4p': 4}
+    EXT_PORTS = re.compile('^[syzhg](\\d+)p$')
+    _use_cache = True
     
-    def detect(self, fn):
+    def sniff(self, head, fn):
         """ Search for the option line (starting with '#') and returns result
         of processing this line.
 
+        Parameters
+        ----------
+        head: bytes
+        The head of the file
+
+        fn: string
+        Path to the file to test
+
+        Returns
+        -------
+        bool or None
+        True if the file can be handled by this reader, None if no option
+        line is found in the head
+        """
+        lines = head.decode('latin-1').splitlines()
+        if len(head) >= self.SNIFF_SIZE and lines:
+            # Last line is not complete
+            lines.pop()
+        found = self._find_option(lines)
+        if found is None and len(head) >= self.SNIFF_SIZE:
+            return None
+        return found
+
+    def detect(self, fn):
+        """ Search for the option line (starting with '#') and returns result
+        of processing this line, reading the whole file if needed.
+
         Parameter
         ---------
         fn: string
@@ -47,11 +81,31 @@ For more details, see http://www.eda.org/ibis/touchstone_ver2.0/touchstone_ver2_
         """
         self._check(fn)
         try:
-            f = io.open(fn, 'r')
+            found = self.sniff(self.read_head(fn), fn)
+            if found is None:
+                with io.TextIOWrapper(open_file(fn),
+                                      encoding='latin-1') as f:
+                    found = self._find_option(f)
         except IOError as e:
             return False
-        while f:
-            line = f.readline().strip()
+        return True if found is None else found
+
+    def _find_option(self, lines):
+        """ Search for the option line, skipping comments and keywords
+
+        Parameter
+        ---------
+        lines: iterable of strings
+        The lines to search in
+
+        Returns
+        -------
+        bool or None
+        Result of processing the option line, False if a line of other kind
+        is met first, None if no option line found
+        """
+        for line in lines:
+            line = line.strip()
             if not line or line.startswith('!'):
                 continue
             elif line.startswith('#'):
@@ -59,11 +113,9 @@ For more details, see http://www.eda.org/ibis/touchstone_ver2.0/touchstone_ver2_
             elif line.startswith('['):
                 continue
             else:
-                f.close()
                 return False
-        f.close()
-        return True
-    
+        return None
+
     def _read_signals(self):
         """ Read the signals from the file
 
@@ -88,28 +140,29 @@ For more details, see http://www.eda.org/ibis/touchstone_ver2.0/touchstone_ver2_
         """
         options = self._process_option('#')
         version = 1
-        with io.open(self._fn, 'r') as f:
-            data_start = False
-            while not data_start:
-                line = f.readline().strip()
-                if not line:
-                    continue
-                if line.startswith('!'):
-                    continue
-                elif line.startswith('#'):
-                    options = self._process_option(line)
-                elif line.startswith('['):
-                    if line.split()[0].lower() == '[' + self.KEYWORDS[0] + ']':
-                        version = float(line.split()[1])
-                elif line.split()[0][0].isdigit():
-                    break
-            f.seek(0)
-            if version == 1:
-                return self._read_signals_v1(f, options, len(line.split()))
-            elif version == 2:
-                return self._read_signals_v2(f, options)
-            else:
-                raise NotImplementedError(_('touchstone_reader: format version %s not supported' % version))
+        with io.TextIOWrapper(self._open()) as f:
+            text = f.read()
+        n = 0
+        for line in text.splitlines():
+            line = line.partition('!')[0].strip()
+            if not line:
+                continue
+            elif line.startswith('#'):
+                options = self._process_option(line)
+            elif line.startswith('['):
+                if line.split()[0].lower() == '[' + self.KEYWORDS[0] + ']':
+                    version = float(line.split()[1])
+            elif line.split()[0][0].isdigit():
+                n = len(line.split())
+                break
+        if options is None:
+            raise ReadError(_('touchstone_reader: unrecognized option line'))
+        if version == 1:
+            return self._read_signals_v1(text, options, n)
+        elif version == 2:
+            return self._read_signals_v2(text, options)
+        else:
+            raise NotImplementedError(_('touchstone_reader: format version %s not supported' % version))
 
     def _process_option(self, line):
         """ Parse the option line
@@ -150,15 +203,15 @@ For more details, see http://www.eda.org/ibis/touchstone_ver2.0/touchstone_ver2_
                 return None #Keyword not recognized
         return options
 
-    def _read_signals_v1(self, f, options, n = 3):
+    def _read_signals_v1(self, text, options, n = 3):
         """ Read file using Touchstone 1.0 format specification
 
         Noise parameters stored in self._info['noise_param']
 
         Parameters
         ----------
-        f: file
-        The file object (already opened) to read data from
+        text: string
+        The content of the file
 
         options: dict
         Parameters from option line. Used here: 'format', 'param', 'freq_mult'
@@ -177,8 +230,9 @@ For more details, see http://www.eda.org/ibis/touchstone_ver2.0/touchstone_ver2_
         Unknown number of ports
         """
         # Guess number of ports, inspired from W. hoch's dataplot
-        extension = self._fn.split('.')[-1].lower()
-        nports = self.EXT_PORTS.get(extension, None)
+        extension = strip_compression(self._fn).split('.')[-1].lower()
+        m = self.EXT_PORTS.match(extension)
+        nports = int(m.group(1)) if m is not None else None
         if nports is None:
             # Not found in extension, guess from number of data on first line,
             # but works only for 1-port and 2-port
@@ -186,70 +240,41 @@ For more details, see http://www.eda.org/ibis/touchstone_ver2.0/touchstone_ver2_
             if nports is None:
                 raise ReadError(_('touchstone_reader: unknown number of ports'))
 
-        # Instanciate signals
-        (ref, signals, names) = self._instanciate_signals(nports, options)
-
-        # Read data
-        nparams = len(signals)
-        data = [[] for x in range(len(signals))]
-        append = [x.append for x in data]
-        cpt = 0
-        offset = 0
-        noise_param = []
-        np_append = noise_param.append
-        for line in f:
-            if not len(line) or line.startswith('!') or line.startswith('#'):
-                continue
-            elif len(line.split()) == 5:
-                # A line of noise parameter data
-                np_append([float(x) for x in line.split()])
-            else:
-                # Network parameter data
-                for i, val in enumerate(line.split()):
-                    if val.startswith('!'):
-                        # Comments at end of line so next line
-                        break
-                    append[offset + i](float(val))
-                    cpt = cpt + 1
-                if cpt < nparams:
-                    # line is not finished, remaining parameters on next line
-                    offset = cpt
-                else:
-                    cpt = offset = 0
-
-        # Gather data
-        ref.data = data[0]
-        ref.data = ref.data * options['freq_mult']
-        for i, s in enumerate(signals[1:]):
-            s.ref = ref
-            s.data = data[i + 1]
-        self._signals = dict(list(zip(names[1:], signals[1:])))
-        self._add_complex(signals, ref, options)
-
-        self._info['noise_param'] = self._process_noise_param(noise_param, 1)
+        # Remove comments and option line
+        text = re.sub('!.*', '', text)
+        text = re.sub('(?m)^\\s*#.*$', '', text)
+
+        # Noise parameters, only for 2-port, follow the network data with
+        # five values per line
+        noise = ''
+        if nports == 2:
+            m = re.search('(?m)^[ \\t]*(\\S+[ \\t]+){4}\\S+[ \\t]*$', text)
+            if m is not None:
+                (text, noise) = (text[:m.start()], text[m.start():])
+
+        # 2-port data is ordered N11, N21, N12, N22
+        self._read_network(text, nports, options, 'full', nports == 2)
+        self._info['reference'] = [options['ref']] * nports
+        self._info['noise_param'] = self._process_noise_param(noise, 1)
         return self._signals
 
-    def _read_signals_v2(self, f, options):
+    def _read_signals_v2(self, text, options):
         """ Read file using Touchstone 2.0 format specification
 
         Noise parameters stored in self._info['noise_param'] unprocessed
         Keywords met stored in self._info
 
-        Parse the file line by line, and when relevant keyowrds are met, store
-        network data or noise parameter data.
+        Split the file into keywords and their content, and when relevant
+        keywords are met, store network data or noise parameter data.
 
         Parameters
         ----------
-        f: file
-        The file object (already opened) to read data from
+        text: string
+        The content of the file
 
         options: dict
         Parameters from option line. Used here: 'format', 'param', 'freq_mult'
 
-        n: int
-        Number of word on first line found with first character being a digit
-        assumed to be the first data line
-
         Returns
         -------
         self._signals: dict of Signals
@@ -259,107 +284,130 @@ For more details, see http://www.eda.org/ibis/touchstone_ver2.0/touchstone_ver2_
         ReadError
         unkown string, unknown keyword or argument, excess of reference values
         """
-        data_start = False
-        noise_start = False
-        end = False
-        noise_param = []
-        np_append = noise_param.append
-        for line in f:
-            if not len(line) or line.startswith('!') or line.startswith('#'):
-                # Blank line or comment
-                continue
-
-            elif line.strip().startswith('['):
-                # Keyword. Extract keyword and argument, check if kw is valid,
-                # store it in self._info, then process the keyword if needed
-                tmp = re.findall('\[([\w\s-]+)\]\s*(\S*)', line.strip())
-                if not tmp:
-                    raise ReadError(_('touchstone_reader: unrecognized \'%s\'') % line)
-                kw = tmp[0][0]
-                arg = tmp[0][1] if len(tmp[0]) > 1 else ''
-                if kw.lower() not in self.KEYWORDS:
-                    raise ReadError(_('touchstone_reader: unrecognized keyword \'%s\'') % kw)
-                self._info[kw.lower()] = arg
-                # Keyword neededs addtionnal process
-                if kw.lower() == 'network data':
-                    # Next line will be data, prepare the signals and variables
-                    # used for reading
-                    (ref, signals, names) = self._instanciate_signals(nports,
-                                                                      options)
-                    data = [[] for x in range(len(signals))]
-                    append = [x.append for x in data]
-                    mxfmt = self._info.get('matrix format', 'full').lower()
-                    row = 0
-                    data_start = True
-                elif kw.lower() == 'noise data':
-                    # Next line will be noise data
-                    noise_start = True
-                    data_start = False
-                elif kw.lower() == 'end':
-                    # No more data to read
-                    break
-                elif kw.lower() == 'reference':
-                    # Assuming [Reference] keyword is without spaces
-                    self._info['reference'] = [float(x.strip()) for x in line.split()[1:]]
-                elif kw.lower() == 'number of ports':
-                    nports = int(self._info['number of ports'])
-                elif kw.lower() == 'number of frequencies':
-                    nfreq = int(self._info['number of frequencies'])
-                elif kw.lower() == ['matrix format']:
-                    # Validate the argument
-                    if arg.lowrer() not in self.MATRIX_FORMATS:
-                        raise ReadError(_('touchstone_reader: unrecognized matrix format \'%s\'') % mxfmt)
-                        
-            elif data_start:
-                # Data, assume on row per line for matrices
-                tmp = line.partition('!')[0]  # Remove any comment
-                if mxfmt in ['full', 'lower']:
-                    offset = 0 if not row else nports * 2 * row + 1
-                else: # mxfmt == 'upper'
-                    # Not tested
-                    offset = 0 if not row else nports * 2 * row + 1 + row * 2
-                for i, val in enumerate(tmp.split()):
-                    append[i + offset](float(val))
-                row = (row + 1) if row < nports and nports > 2 else 0
-
-            elif noise_start:
-                # Noise
-                np_append([float(x) for x in line.split()])
-
-            elif len(self._info.get('reference', nports)) < nports:
-                # Reference on more than a line
-                tmp = line.split()
-                if len(tmp) > len(self._info['reference']):
-                    raise ReadError(_('touchstone_reader: excess references found \'%s\'') % line)
-                for x in tmp:
-                    self.info['reference'].append(float(x.strip()))
-        if mxfmt in ['lower', 'upper']:
-            # Expand matrices in case of 'upper' or 'lower'
-            for i in range(nports):
-                for j in range(nports):
-                    if mxfmt == 'lower' and i < j:
-                        data[i * nports * 2 + j * 2 + 1] = data[j * nports * 2 + i * 2 + 1]
-                        data[i * nports * 2 + j * 2 + 2] = data[j * nports * 2 + i * 2 + 2]
-                    if mxfmt == 'upper' and i > j:
-                        data[i * nports * 2 + j * 2 + 1] = data[j * nports * 2 + i * 2 + 1]
-                        data[i * nports * 2 + j * 2 + 2] = data[j * nports * 2 + i * 2 + 2]
-
-        # Gather data
-        ref.data = data[0]
-        ref.data = ref.data * options['freq_mult']
-        for i, s in enumerate(signals[1:]):
-            s.ref = ref
-            s.data = data[i + 1]
-        self._signals = dict(list(zip(names[1:], signals[1:])))
-        self._add_complex(signals, ref, options)
-
-        self._info['noise_param'] = self._process_noise_param(noise_param, 2)
+        # Remove comments and option line
+        text = re.sub('!.*', '', text)
+        text = re.sub('(?m)^\\s*#.*$', '', text)
+
+        # Split keywords, each one followed by its content
+        parts = re.split('(?m)^[ \\t]*\\[([^\\]]*)\\][ \\t]*', text)
+        if parts[0].strip():
+            raise ReadError(_('touchstone_reader: unrecognized \'%s\'') % parts[0].strip())
+        network = None
+        noise = ''
+        for (kw, content) in zip(parts[1::2], parts[2::2]):
+            # Keyword. Check if kw is valid, store it in self._info, then
+            # process the keyword if needed
+            kw = kw.strip().lower()
+            if kw not in self.KEYWORDS:
+                raise ReadError(_('touchstone_reader: unrecognized keyword \'%s\'') % kw)
+            arg = content.split('\n', 1)[0].strip()
+            self._info[kw] = arg
+            if kw == 'network data':
+                network = content
+            elif kw == 'noise data':
+                noise = content
+            elif kw == 'end':
+                # No more data to read
+                break
+            elif kw == 'reference':
+                self._info['reference'] = [float(x) for x in content.split()]
+            elif kw == 'matrix format':
+                # Validate the argument
+                if arg.lower() not in self.MATRIX_FORMAT:
+                    raise ReadError(_('touchstone_reader: unrecognized matrix format \'%s\'') % arg)
+        if network is None:
+            raise ReadError(_('touchstone_reader: no network data'))
+
+        nports = int(self._info['number of ports'])
+        reference = self._info.get('reference', [options['ref']])
+        if len(reference) > nports:
+            raise ReadError(_('touchstone_reader: excess references found \'%s\'') % reference)
+        if len(reference) < nports:
+            reference = reference + [reference[-1]] * (nports - len(reference))
+        self._info['reference'] = reference
+
+        mxfmt = self._info.get('matrix format', 'full').lower()
+        order = self._info.get('two-port data order', '21_12')
+        self._read_network(network, nports, options, mxfmt,
+                           nports == 2 and order == '21_12')
+        self._info['noise_param'] = self._process_noise_param(noise, 2)
         return self._signals
-    
+
+    def _read_network(self, text, nports, options, mxfmt='full',
+                      transpose=False):
+        """ Convert the network data in bulk and instanciate the Signals
+
+        Values are converted by numpy in one call and reshaped with one row
+        per frequency. Matrices are expanded in case of 'lower' or 'upper'
+        format, then converted into a (frequencies x ports x ports) complex
+        array in a single vectorized operation.
+
+        Parameters
+        ----------
+        text: string
+        The network data, without comments
+
+        nports: int
+        Number of ports
+
+        options: dict
+        Parameters from option line. Used here: 'format', 'param', 'freq_mult'
+
+        mxfmt: string
+        The matrix format, 'full', 'lower' or 'upper'
+
+        transpose: bool
+        True if data for 2-port is ordered N11, N21, N12, N22
+
+        Returns
+        -------
+        Nothing
+        """
+        values = np.array(text.split(), dtype=float)
+        if mxfmt == 'full':
+            (rows, cols) = (np.repeat(np.arange(nports), nports),
+                            np.tile(np.arange(nports), nports))
+        elif mxfmt == 'lower':
+            (rows, cols) = np.tril_indices(nports)
+        else:
+            (rows, cols) = np.triu_indices(nports)
+        rowlen = 1 + 2 * len(rows)
+        values = values[:len(values) // rowlen * rowlen].reshape(-1, rowlen)
+
+        # Data as read from the file, (frequencies x ports x ports x 2)
+        if mxfmt == 'full':
+            raw = values[:, 1:].reshape(-1, nports, nports, 2)
+        else:
+            raw = np.empty((len(values), nports, nports, 2))
+            raw[:, rows, cols] = values[:, 1:].reshape(len(values), -1, 2)
+            raw[:, cols, rows] = raw[:, rows, cols]
+        if transpose:
+            raw = raw.transpose(0, 2, 1, 3)
+        network = self._to_complex(raw[..., 0], raw[..., 1], options['format'])
+
+        # Instanciate signals, as views
+        (ref, signals, names) = self._instanciate_signals(nports, options)
+        ref.data = values[:, 0] * options['freq_mult']
+        self._signals = {}
+        for p1 in range(nports):
+            for p2 in range(nports):
+                i = 1 + 3 * (p1 * nports + p2)
+                (sig, sig_a, sig_b) = signals[i:i + 3]
+                sig.data = network[:, p1, p2]
+                sig_a.data = raw[:, p1, p2, 0]
+                sig_b.data = raw[:, p1, p2, 1]
+                for s in (sig, sig_a, sig_b):
+                    s.ref = ref
+                    self._signals[s.name] = s
+        self._info['network'] = network
+        self._info['param'] = options['param']
+
     def _instanciate_signals(self, nports, options):
         """ Instanciate the signals depending on number of port and type
-        of measurement in the form of Xij_n where X is the parameter, i and
-        j the indices and n is either 'a' or 'b'.
+        of measurement in the form of Xij, Xij_a and Xij_b where X is the
+        parameter, i and j the indices, Xij the complex value and Xij_a,
+        Xij_b the pair of values as read from the file. Beyond 9 ports,
+        indices are separated by '_', e.g. S1_12.
 
         Parameters
         ----------
@@ -369,6 +417,8 @@ For more details, see http://www.eda.org/ibis/touchstone_ver2.0/touchstone_ver2_
         options: dict
            'param': string
            The parameter stored in file (e.g. S, Z, H...)
+           'format': string
+           The file format (e.g. 'MA')
 
         Returns
         -------
@@ -377,7 +427,8 @@ For more details, see http://www.eda.org/ibis/touchstone_ver2.0/touchstone_ver2_
            The reference signal
 
            signals: list of Signals
-           Signals instanciated
+           Signals instanciated, reference then Xij, Xij_a, Xij_b for each
+           parameter
 
            names: list of strings
            Names of the Signals instanciated, same order as 'signals'
@@ -385,44 +436,18 @@ For more details, see http://www.eda.org/ibis/touchstone_ver2.0/touchstone_ver2_
         ref = Signal('Frequency', 'Hz')
         signals = [ref]
         names = [ref.name]
+        (unit_a, unit_b) = self.FORMAT_VALUES[options['format']]
+        fmt = '%s%d%d' if nports < 10 else '%s%d_%d'
         for p1 in range(nports):
             for p2 in range(nports):
-                name = options['param'] + '%1d' % (p1 + 1) + '%1d' % (p2 + 1)
-                (unit_a, unit_b) = self.FORMAT_VALUES[options['format']]
-                signal_a = Signal(name + '_a', unit_a)
-                signal_b = Signal(name + '_b', unit_b)
-                signals.append(signal_a)
-                signals.append(signal_b)
-                names.append(name + '_a')
-                names.append(name + '_b')
+                name = fmt % (options['param'], p1 + 1, p2 + 1)
+                for (n, unit) in ((name, 'a.u.'), (name + '_a', unit_a),
+                                  (name + '_b', unit_b)):
+                    signals.append(Signal(n, unit))
+                    names.append(n)
         return (ref, signals, names)
 
-    def _view_matrix(self, data, names, nports):
-        """ View X parameter matrix, debug only
-
-        Parameters
-        ----------
-        data: list of list of float
-        The matrix to be viewed
-
-        names: list of strings
-        The names of the Signals that will be instanciated
-
-        nports: int
-        The number of ports, i.e. matrix rank
-
-        Returns
-        -------
-        Nothing
-        """
-        for i in range(nports):
-            for j in range(nports):
-                print(names[i * nports * 2 + j * 2 + 1], names[i * nports * 2 + j * 2 + 2], end=' ') 
-                print(data[i * nports * 2 + j * 2 + 1], data[i * nports * 2 + j * 2 + 2], end=' ')
-            print()
-                
-
-    def _process_noise_param(self, np, version):
+    def _process_noise_param(self, text, version):
         """ Process noise parameter data and returns a dict of Signals
 
         Version of format is requested as in version 1 the effective noise
@@ -430,8 +455,8 @@ For more details, see http://www.eda.org/ibis/touchstone_ver2.0/touchstone_ver2_
 
         Parameters
         ----------
-        np: list of list of float
-        The noise parameter data as read
+        text: string
+        The noise parameter data, without comments
 
         version: int
         Format version of the file
@@ -453,45 +478,45 @@ For more details, see http://www.eda.org/ibis/touchstone_ver2.0/touchstone_ver2_
 
         sigs = [freq, minnf, reflcoefa, reflcoefb, effnr]
 
-        noise_param = [[] for x in range(5)]
-        append = [x.append for x in noise_param]
-
-        for p in range(len(np)):
-            for i, a in enumerate(append):
-                a(np[p][i])
+        noise_param = np.array(text.split(), dtype=float)
+        noise_param = noise_param[:len(noise_param) // 5 * 5].reshape(-1, 5)
 
-        freq.data = noise_param[0]
+        freq.data = noise_param[:, 0]
         for i, s in enumerate(sigs[1:]):
             s.ref = freq
-            s.data = noise_param[i + 1]
+            s.data = noise_param[:, i + 1]
 
         ret = {'Frequency': freq, 'minnf': minnf,
                        'Refl_coef_a': reflcoefa, 'Refl_coef_b': reflcoefb,
                        'R_neff': effnr}
         return ret
 
-    def _add_complex(self, signals, ref, options):
-        units = 'a.u.'
-        for i, s in enumerate(signals[1:], start=1):
-            if s.name.endswith('_b'):
-                continue
-            print(s.name[:-2], signals[i].name, signals[i + 1].name)
-            sa = signals[i].data  # ... or s
-            sb = signals[i + 1].data
-            val = None
-            if options['format'] == 'DB':
-                a1 = np.power(10.0, sa / 20.0) * np.cos(sb * cmath.pi / 180.0)
-                a2 = np.power(10.0, sa / 20.0) * np.sin(sb * cmath.pi / 180.0)
-                val = a1 + a2 * 1.j
-            elif options['format'] == 'MA':
-                a1 = sa * np.cos(sb * cmath.pi / 180.0)
-                a2 = sa * np.sin(sb * cmath.pi / 180.0)
-                val = a1 + a2 * 1.j
-            elif options['format'] == 'RI':
-                val = sa + sb * 1.j
-            else:
-                raise TypeError('Unrecognized format %s' % options['format'])
-            signal = Signal(s.name[:-2], units)
-            signal.data = val
-            signal.ref = ref
-            self.signals[signal.name] = signal
+    def _to_complex(self, a, b, fmt):
+        """ Convert pairs of values into complex values, vectorized
+
+        Parameters
+        ----------
+        a, b: numpy.ndarray
+        The pairs of values, as read from the file
+
+        fmt: string
+        The format of the pairs, 'DB', 'MA' or 'RI'
+
+        Returns
+        -------
+        numpy.ndarray
+        The complex values
+
+        Raises
+        ------
+        TypeError
+        Unrecognized format
+        """
+        if fmt == 'DB':
+            return np.power(10.0, a / 20.0) * np.exp(1j * np.deg2rad(b))
+        elif fmt == 'MA':
+            return a * np.exp(1j * np.deg2rad(b))
+        elif fmt == 'RI':
+            return a + b * 1j
+        else:
+            raise TypeError('Unrecognized format %s' % fmt)
@@ -0,0 +1,188 @@
+""" Registry of Readers and Writers, imported on demand
+
+Each format is declared with the module and class implementing it, and the
+hints used to recognize its files: leading magic bytes and a regex on the
+file name. Modules are imported only when the format is actually tried.
+
+Third-party packages can add formats through the package entry points
+'oscopy.readers' and 'oscopy.writers', e.g. in setup.py:
+
+    entry_points={'oscopy.readers': ['myfmt = mypkg.myfmt:MyFmtReader']}
+
+Magic bytes and extensions of plugins are taken from the _magic and
+_extensions class attributes once the class is loaded.
+"""
+
+import os
+import re
+import importlib
+
+class Format(object):
+    """ Format -- Declaration of a Reader or Writer
+
+Properties
+    name         Name of the format
+    magic        Leading bytes of the files handled
+    extensions   Regex matching the names of the files handled
+    loaded       True once the class is imported
+    """
+    def __init__(self, name, module, cls, magic=(), extensions=None,
+                 entry_point=None):
+        """ Declare a format
+
+        Parameters
+        ----------
+        name: string
+        Name of the format
+
+        module: string
+        Absolute name of the module implementing the format
+
+        cls: string
+        Name of the class in module
+
+        magic: tuple of bytes
+        Leading bytes of the files handled
+
+        extensions: string
+        Regex matching the names of the files handled
+
+        entry_point: importlib.metadata.EntryPoint
+        Entry point to load the class from, instead of module and cls
+
+        Returns
+        -------
+        Format
+        The object instanciated
+        """
+        self.name = name
+        self._module = module
+        self._cls = cls
+        self.magic = tuple(magic)
+        self.extensions = extensions
+        self._entry_point = entry_point
+        self._class = None
+
+    @property
+    def loaded(self):
+        """ Return whether the class is imported
+        """
+        return self._class is not None
+
+    def load(self):
+        """ Import the module and return the class implementing the format
+
+        Parameter
+        ---------
+        None
+
+        Returns
+        -------
+        class
+        The Reader or Writer class
+        """
+        if self._class is None:
+            if self._entry_point is not None:
+                self._class = self._entry_point.load()
+                self.magic = tuple(getattr(self._class, '_magic', ()))
+                self.extensions = getattr(self._class, '_extensions', None)
+            else:
+                module = importlib.import_module(self._module)
+                self._class = getattr(module, self._cls)
+        return self._class
+
+    def hint(self, head, fn):
+        """ Return how likely the file is of this format from the magic
+        bytes and file name
+
+        Parameters
+        ----------
+        head: bytes
+        The head of the file
+
+        fn: string
+        Path to the file
+
+        Returns
+        -------
+        int
+        2 if head starts with magic bytes, 1 if the file name matches the
+        extensions, 0 otherwise
+        """
+        if self.magic and head.startswith(self.magic):
+            return 2
+        if self.extensions is not None and\
+                re.search(self.extensions, os.path.basename(fn).lower()):
+            return 1
+        return 0
+
+    def __repr__(self):
+        """ x.__repr__ <==> repr(x)"""
+        return '<%s %s%s>' % (type(self).__name__, self.name,
+                              '' if self.loaded else ' (not loaded)')
+
+class Registry(object):
+    """ Registry -- Ordered list of formats, built-in ones then plugins
+from the entry points group
+    """
+    def __init__(self, group):
+        """ Instanciate an empty registry
+
+        Parameter
+        ---------
+        group: string
+        Name of the entry points group of plugins
+
+        Returns
+        -------
+        Registry
+        The object instanciated
+        """
+        self._group = group
+        self._formats = []
+        self._plugins = None
+
+    def register(self, name, module, cls, magic=(), extensions=None):
+        """ Declare a format, see Format for the parameters
+
+        Returns
+        -------
+        Format
+        The format declared
+        """
+        fmt = Format(name, module, cls, magic, extensions)
+        self._formats.append(fmt)
+        return fmt
+
+    def _load_plugins(self):
+        """ Return the formats declared by entry points, listed once
+        """
+        if self._plugins is None:
+            self._plugins = []
+            try:
+                from importlib import metadata
+            except ImportError:
+                # No entry points support
+                return self._plugins
+            try:
+                eps = metadata.entry_points(group=self._group)
+            except TypeError:
+                eps = metadata.entry_points().get(self._group, [])
+            names = [f.name for f in self._formats]
+            for ep in eps:
+                if ep.name not in names:
+                    self._plugins.append(Format(ep.name, None, None,
+                                                entry_point=ep))
+        return self._plugins
+
+    def get(self, name):
+        """ Return the format named name or None
+        """
+        for fmt in self:
+            if fmt.name == name:
+                return fmt
+        return None
+
+    def __iter__(self):
+        """ x.__iter__ <==> iter(x)"""
+        return iter(self._formats + self._load_plugins())
@@ -38,6 +38,10 @@ Class Signal -- Contains the signal points and other information
        ref      read/write     Reference Signal. None means this is a Reference.
        freeze   read/write     Disable change Signal data if True
    Other properties
+       loaded                  False while data is still to be read by the
+                               loader set with set_loader()
+       preview                 True while data is a decimated preview, see
+                               set_preview()
        in_transaction          Non-null when a transaction is ongoing
        to_recompute            True when an Upper Signal data has changed and a
                                recomputation is required
@@ -122,7 +126,9 @@ Class Signal -- Contains the signal points and other information
         """
         GObject.GObject.__init__(self)
         if isinstance(value, Signal):
-            self._data = value._data
+            self._data = value.data
+            self._loader = None
+            self._full_loader = None
             self._name = value._name
             if value.ref is None:
                 self._ref = value._ref
@@ -140,6 +146,8 @@ Class Signal -- Contains the signal points and other information
                 self.connect('recompute', self.on_recompute, (None, None, value))
         else:
             self._data = []            # Data points
+            self._loader = None       # Deferred data reading function
+            self._full_loader = None  # Full resolution data reading function
             self._name = value        # Identifier
             self._ref = None          # Reference signal
             self._unit = unit         # Unit of the signal
@@ -180,6 +188,7 @@ Class Signal -- Contains the signal points and other information
         -------
         Nothing
         """
+        self._loader = None
         if data is None:
             self._data = data
             self.emit('changed')
@@ -225,6 +234,85 @@ Class Signal -- Contains the signal points and other information
         """
         return self.get_property('data')
 
+    def set_loader(self, loader):
+        """ Defer the reading of the data points until first access
+
+        The loader is called once, the first time data is accessed, and its
+        result becomes the Signal data. No 'changed' event is emitted as data
+        is not considered as modified. Setting data before first access
+        discards the loader.
+
+        Parameters
+        ----------
+        loader: function
+        Function without argument returning a list or numpy.ndarray
+
+        Returns
+        -------
+        Nothing
+        """
+        self._loader = loader
+
+    @property
+    def loaded(self):
+        """ Return whether data points have been read
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        bool
+        False if data is still to be read by the loader
+        """
+        return self._loader is None
+
+    def set_preview(self, loader):
+        """ Mark data as a decimated preview of the Signal
+
+        Parameters
+        ----------
+        loader: function
+        Function without argument replacing the preview by the full
+        resolution data, e.g. Reader.load_full(). None once loaded
+
+        Returns
+        -------
+        Nothing
+        """
+        self._full_loader = loader
+
+    @property
+    def preview(self):
+        """ Return whether data is a decimated preview
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        bool
+        True until load_full() is called
+        """
+        return self._full_loader is not None
+
+    def load_full(self):
+        """ Replace the preview by the full resolution data, if data is a
+        preview
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        Nothing
+        """
+        if self._full_loader is not None:
+            self._full_loader()
+
     def do_set_ref(self, ref=None):
         """ Set the reference signal
 
@@ -352,6 +440,11 @@ Class Signal -- Contains the signal points and other information
         if property.name == 'ref':
             return self._ref
         elif property.name == 'data':
+            if self._loader is not None:
+                (loader, self._loader) = (self._loader, None)
+                data = loader()
+                self._data = numpy.array(data) if isinstance(data, list)\
+                    else data
             return self._data
         elif property.name == 'freeze':
             return self._freeze
@@ -641,4 +734,4 @@ Class Signal -- Contains the signal points and other information
                 s1_data = s1.data if isinstance(s1, Signal) else s1
                 s2_data = s2.data if isinstance(s2, Signal) else s2
                 self.data = op(s1_data, s2_data, out.data)
-            to_recompute = False
+            self.to_recompute = False
@@ -0,0 +1,395 @@
+""" Streaming reductions on chunks of Signal data
+
+Measurements are computed chunk by chunk on the data iterated by
+Reader.iter_chunks(), so that files larger than memory are processed in
+bounded memory, for the Readers not reading the whole data in memory, see
+Reader.iter_chunks(). Each reduction remembers the last point of the previous
+chunk, so integrals and crossings are continuous across chunk boundaries.
+
+Decimate keeps the envelope of a Signal on a bounded number of points, see
+Reader.read() preview mode.
+
+Mean and RMS values are weighted by the Reference Signal steps (trapezoidal
+integration), as simulators use variable time steps, unless weighted is
+False.
+
+Example
+-------
+>>> from oscopy import stream
+>>> from oscopy.readers.gnucap_reader import GnucapReader
+>>> res = stream.measure(GnucapReader().iter_chunks('tran.dat', sigs='vout'),
+...                      {'vout': [stream.Min(), stream.Max(), stream.RMS(),
+...                                stream.Crossings(0.5, 'rising')]})
+>>> (vmin, vmax, vrms, edges) = res['vout']
+"""
+
+import numpy
+
+class Reduction(object):
+    """ Reduction -- Base class of streaming reductions
+The derived class must redefine _update() and result().
+    """
+    def __init__(self):
+        """ Instanciate the Reduction
+
+        Parameter
+        ---------
+        None
+
+        Returns
+        -------
+        Reduction
+        The object instanciated
+        """
+        self._last = None      # Last point of previous chunk (ref, value)
+
+    def update(self, ref, data):
+        """ Add a chunk of data
+
+        Parameters
+        ----------
+        ref: numpy.ndarray
+        The chunk of the Reference Signal
+
+        data: numpy.ndarray
+        The chunk of the Signal, same length as ref
+
+        Returns
+        -------
+        Nothing
+        """
+        ref = numpy.asarray(ref)
+        data = numpy.asarray(data)
+        if not len(data):
+            return
+        self._update(ref, data)
+        self._last = (ref[-1], data[-1])
+
+    def _with_last(self, ref, data):
+        """ Return the chunk preceded by the last point of previous chunk
+        """
+        if self._last is None:
+            return (ref, data)
+        return (numpy.concatenate(([self._last[0]], ref)),
+                numpy.concatenate(([self._last[1]], data)))
+
+    def _update(self, ref, data):
+        """ Add a non empty chunk, shall be redefined in derived classes
+        """
+        pass
+
+    def result(self):
+        """ Return the result of the reduction on the chunks added, None if
+        no chunk added. Shall be redefined in derived classes
+        """
+        return None
+
+class Min(Reduction):
+    """ Min -- Minimum value, and its abscisse in at
+    """
+    def __init__(self):
+        """ Instanciate the Reduction
+        """
+        Reduction.__init__(self)
+        self._value = None
+        self.at = None
+
+    def _update(self, ref, data):
+        i = numpy.argmin(data)
+        if self._value is None or data[i] < self._value:
+            (self._value, self.at) = (data[i], ref[i])
+
+    def result(self):
+        return self._value
+
+class Max(Reduction):
+    """ Max -- Maximum value, and its abscisse in at
+    """
+    def __init__(self):
+        """ Instanciate the Reduction
+        """
+        Reduction.__init__(self)
+        self._value = None
+        self.at = None
+
+    def _update(self, ref, data):
+        i = numpy.argmax(data)
+        if self._value is None or data[i] > self._value:
+            (self._value, self.at) = (data[i], ref[i])
+
+    def result(self):
+        return self._value
+
+class Mean(Reduction):
+    """ Mean -- Mean value, integral of the Signal over the Reference Signal
+span when weighted, average of the points otherwise or when the span is null
+    """
+    def __init__(self, weighted=True):
+        """ Instanciate the Reduction
+
+        Parameter
+        ---------
+        weighted: bool
+        When True, weight the points by the Reference Signal steps
+
+        Returns
+        -------
+        Mean
+        The object instanciated
+        """
+        Reduction.__init__(self)
+        self._weighted = weighted
+        self._sum = 0
+        self._count = 0
+        self._integral = 0
+        self._first = None
+
+    def _update(self, ref, data):
+        self._sum = self._sum + data.sum()
+        self._count = self._count + len(data)
+        if self._first is None:
+            self._first = ref[0]
+        (ref, data) = self._with_last(ref, data)
+        self._integral = self._integral + numpy.sum(
+            (data[1:] + data[:-1]) * numpy.diff(ref)) / 2.
+
+    def result(self):
+        if not self._count:
+            return None
+        span = self._last[0] - self._first
+        if self._weighted and span:
+            return self._integral / span
+        return self._sum / self._count
+
+class RMS(Mean):
+    """ RMS -- Root mean square value, see Mean
+    """
+    def update(self, ref, data):
+        """ Add a chunk of data, see Reduction.update()
+        """
+        Mean.update(self, ref, numpy.abs(numpy.asarray(data)) ** 2)
+
+    def result(self):
+        mean = Mean.result(self)
+        return None if mean is None else numpy.sqrt(mean)
+
+class Histogram(Reduction):
+    """ Histogram -- Number of points per bin, bins being fixed before the
+first chunk
+    """
+    def __init__(self, bins=10, range=None):
+        """ Instanciate the Reduction
+
+        Parameters
+        ----------
+        bins: int or sequence of floats
+        Number of bins, or bin edges as for numpy.histogram()
+
+        range: tuple of floats
+        Lower and upper edges of the bins, needed when bins is an int
+
+        Returns
+        -------
+        Histogram
+        The object instanciated
+
+        Raises
+        ------
+        ValueError
+        Number of bins given without range
+        """
+        Reduction.__init__(self)
+        if numpy.ndim(bins) == 0:
+            if range is None:
+                raise ValueError(_('stream: range needed with a number of bins'))
+            bins = numpy.linspace(range[0], range[1], int(bins) + 1)
+        self._edges = numpy.asarray(bins, dtype=float)
+        self._counts = numpy.zeros(len(self._edges) - 1, dtype=numpy.int64)
+
+    def _update(self, ref, data):
+        self._counts += numpy.histogram(data, self._edges)[0]
+
+    def result(self):
+        """ Return the tuple (counts, edges), as numpy.histogram()
+        """
+        return (self._counts, self._edges)
+
+class Crossings(Reduction):
+    """ Crossings -- Abscisses where the Signal crosses a level, linearly
+interpolated between points
+    """
+    def __init__(self, level=0, edge='both'):
+        """ Instanciate the Reduction
+
+        Parameters
+        ----------
+        level: float
+        The level crossed
+
+        edge: string
+        'rising', 'falling' or 'both'
+
+        Returns
+        -------
+        Crossings
+        The object instanciated
+
+        Raises
+        ------
+        ValueError
+        Unknown edge
+        """
+        Reduction.__init__(self)
+        if edge not in ('rising', 'falling', 'both'):
+            raise ValueError(_('stream: unknown edge \'%s\'') % edge)
+        self._level = level
+        self._edge = edge
+        self._found = []
+
+    def _update(self, ref, data):
+        (ref, data) = self._with_last(ref, data)
+        data = data - self._level
+        (a, b) = (data[:-1], data[1:])
+        rising = (a < 0) & (b >= 0)
+        falling = (a >= 0) & (b < 0)
+        i = numpy.flatnonzero({'rising': rising, 'falling': falling,
+                               'both': rising | falling}[self._edge])
+        self._found.append(ref[i] + (ref[i + 1] - ref[i]) * a[i]
+                           / (a[i] - b[i]))
+
+    def result(self):
+        return numpy.concatenate(self._found) if self._found\
+            else numpy.empty(0)
+
+class Decimate(Reduction):
+    """ Decimate -- Envelope of the Signal on at most about points points,
+keeping the minimum and maximum of consecutive groups of points
+
+Groups are made of consecutive points, and merged by pairs or more each time
+there are too many of them, so that the memory used is bounded whatever the
+number of points. For complex data, minimum and maximum of the modulus are
+kept.
+    """
+    def __init__(self, points=2000):
+        """ Instanciate the Reduction
+
+        Parameter
+        ---------
+        points: int
+        Maximum number of points of the result, two per group
+
+        Returns
+        -------
+        Decimate
+        The object instanciated
+        """
+        Reduction.__init__(self)
+        self._groups = max(points // 2, 1)
+        self._size = 1         # Number of points of new groups
+        self._pos = 0          # Index of next point
+        self._pending = None   # Points not yet in a group
+        # Start and end abscisses, positions, keys and values of minimums
+        # and maximums of the groups
+        self._fields = None
+
+    def _update(self, ref, data):
+        if data.ndim != 1:
+            raise ValueError(_('stream: one-dimensional data expected'))
+        pos = numpy.arange(self._pos, self._pos + len(data))
+        self._pos = self._pos + len(data)
+        if self._pending is not None:
+            (pref, pdata, ppos) = self._pending
+            (ref, data, pos) = (numpy.concatenate((pref, ref)),
+                                numpy.concatenate((pdata, data)),
+                                numpy.concatenate((ppos, pos)))
+        n = len(data) // self._size * self._size
+        self._pending = (ref[n:], data[n:], pos[n:])
+        if n:
+            self._add(ref[:n], data[:n], pos[:n], self._size)
+
+    def _add(self, ref, data, pos, size):
+        """ Add groups of size consecutive points, merging the groups when
+        there are too many of them
+        """
+        shape = (-1, size)
+        key = numpy.abs(data) if numpy.iscomplexobj(data) else data
+        (key, data, pos) = (key.reshape(shape), data.reshape(shape),
+                            pos.reshape(shape))
+        rows = numpy.arange(len(key))
+        (imin, imax) = (key.argmin(axis=1), key.argmax(axis=1))
+        fields = [ref[::size], ref[size - 1::size],
+                  pos[rows, imin], key[rows, imin], data[rows, imin],
+                  pos[rows, imax], key[rows, imax], data[rows, imax]]
+        if self._fields is not None:
+            fields = [numpy.concatenate(x) for x in zip(self._fields, fields)]
+        self._fields = fields
+        if len(fields[0]) > self._groups:
+            self._merge(-(-len(fields[0]) // self._groups))
+
+    def _merge(self, factor):
+        """ Merge the groups by factor consecutive groups, the last groups
+        being kept when not enough of them
+        """
+        (start, end, pmin, kmin, vmin, pmax, kmax, vmax) = self._fields
+        n = len(start) // factor * factor
+        rows = numpy.arange(n // factor)
+        shape = (-1, factor)
+        imin = kmin[:n].reshape(shape).argmin(axis=1)
+        imax = kmax[:n].reshape(shape).argmax(axis=1)
+        merged = [start[:n:factor], end[factor - 1:n:factor]] +\
+            [x[:n].reshape(shape)[rows, imin] for x in (pmin, kmin, vmin)] +\
+            [x[:n].reshape(shape)[rows, imax] for x in (pmax, kmax, vmax)]
+        self._fields = [numpy.concatenate((m, x[n:]))
+                        for (m, x) in zip(merged, self._fields)]
+        self._size = self._size * factor
+
+    def result(self):
+        """ Return the tuple (ref, data) of the envelope: for each group its
+        start and end abscisses, with the minimum and maximum in the order
+        they occur
+        """
+        if self._pending is not None and len(self._pending[0]):
+            (ref, data, pos) = self._pending
+            self._add(ref, data, pos, len(ref))
+            self._pending = None
+        if self._fields is None:
+            return (numpy.empty(0), numpy.empty(0))
+        (start, end, pmin, kmin, vmin, pmax, kmax, vmax) = self._fields
+        first = pmin <= pmax
+        ref = numpy.empty(2 * len(start), dtype=start.dtype)
+        (ref[0::2], ref[1::2]) = (start, end)
+        data = numpy.empty(2 * len(start), dtype=vmin.dtype)
+        data[0::2] = numpy.where(first, vmin, vmax)
+        data[1::2] = numpy.where(first, vmax, vmin)
+        return (ref, data)
+
+def measure(chunks, reductions):
+    """ Compute reductions on chunks of Signals data
+
+    Parameters
+    ----------
+    chunks: iterator of tuples (ref, data)
+    The chunks, as returned by Reader.iter_chunks()
+
+    reductions: dict of Reduction or of list of Reductions
+    The reductions, by Signal name
+
+    Returns
+    -------
+    dict
+    The result of the reductions, by Signal name, a list when a list of
+    Reductions is given
+
+    Example
+    -------
+    >>> res = measure(reader.iter_chunks('tran.dat'),
+    ...               {'vout': Max(), 'iRD': [Mean(), RMS()]})
+    """
+    for (ref, data) in chunks:
+        for (sn, r) in reductions.items():
+            if sn in data:
+                for x in (r if isinstance(r, (list, tuple)) else [r]):
+                    x.update(ref, data[sn])
+    return dict((sn, [x.result() for x in r]
+                 if isinstance(r, (list, tuple)) else r.result())
+                for (sn, r) in reductions.items())
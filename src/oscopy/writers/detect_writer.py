@@ -3,13 +3,18 @@
 DetectWriter(fmt, fn)
 Automagically return a Writer to use for file writing
 
+Writers are declared in the registry WRITERS by format name and imported
+only when used. Third-party Writers can be added with the 'oscopy.writers'
+entry points, see oscopy.registry.
 """
 import os.path
 from os import access
 from .writer import WriteError
-from .gnucap_writer import GnucapWriter
+from ..registry import Registry
 
-WRITERS = [GnucapWriter]
+WRITERS = Registry('oscopy.writers')
+WRITERS.register('gnucap', 'oscopy.writers.gnucap_writer', 'GnucapWriter')
+WRITERS.register('hdf5', 'oscopy.writers.hdf5_writer', 'Hdf5Writer')
 
 def DetectWriter(fmt, fn, ov=False):
     """ Return a writer object
@@ -23,9 +28,9 @@ def DetectWriter(fmt, fn, ov=False):
             raise WriteError("File is not a file")
         elif not os.access(fn, os.W_OK):
             raise WriteError("Cannot access file")
-    for writer in WRITERS:
-        w = writer()
+    writer = WRITERS.get(fmt)
+    if writer is not None:
+        w = writer.load()()
         if w.detect(fmt):
             return w
     return None
-
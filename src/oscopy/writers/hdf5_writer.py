@@ -0,0 +1,138 @@
+
+import numpy
+from .writer import Writer, WriteError
+
+# Points per chunk of the datasets
+CHUNK_POINTS = 1 << 16
+
+class Hdf5Writer(Writer):
+    """ Class Hdf5Writer -- Handle HDF5 format export
+
+    Write each Signal to a chunked dataset, compressed with gzip, that can be
+    read back lazily and by ranges of the Reference Signal by Hdf5Reader,
+    see there for the layout of the file. Each Reference Signal is written
+    once and linked from all the Signals sharing it.
+
+    Options:
+      level    gzip compression level, from 0 to 9, default 4
+      info     dict of values stored as attributes of the file, e.g. the
+               info of the Reader of the Signals
+
+    The h5py module is needed to write the files.
+    """
+
+    def _get_format_name(self):
+        """ Return the format name
+
+        Parameter
+        ---------
+        None
+
+        Returns
+        -------
+        string
+        The format identifier
+        """
+        return 'hdf5'
+
+    def _format_check(self, sigs):
+        """ Check if all signals have a reference
+
+        Parameter
+        ---------
+        sigs: dict of Signals
+        The Signal list to write
+
+        Returns
+        -------
+        bool
+        True if no issue found to write the Signal list in this format
+        """
+        if not sigs:
+            return False
+        return all(s.ref is not None for s in sigs.values())
+
+    def write_signals(self, sigs):
+        """ Write signals to file
+        Create the group of each Signal with its dataset and a hard link to
+        the dataset of its Reference Signal, created on first use.
+
+        Parameter
+        ---------
+        sigs: dict of Signals
+        The list of Signals to write
+
+        Returns
+        -------
+        Nothing
+
+        Raises
+        ------
+        WriteError
+        If the h5py module is not installed
+        """
+        try:
+            import h5py
+        except ImportError:
+            raise WriteError("h5py module needed to write HDF5 files")
+        level = int(self._opts.get('level', 4))
+
+        with h5py.File(self._fn, 'w') as f:
+            for (k, v) in self._opts.get('info', {}).items():
+                try:
+                    f.attrs[k] = v
+                except (TypeError, ValueError):
+                    # Not representable in HDF5, e.g. None
+                    pass
+            refs = f.create_group('refs')
+            group = f.create_group('signals')
+            written = []
+            for (sn, s) in sigs.items():
+                ds = [d for (r, d) in written if r is s.ref]
+                if ds:
+                    ds = ds[0]
+                else:
+                    ds = self._create_dataset(refs, str(len(written)),
+                                              s.ref, level)
+                    written.append((s.ref, ds))
+                g = group.create_group(sn.replace('/', '%2F'))
+                g.attrs['name'] = sn
+                g.attrs['unit'] = s.unit or ''
+                self._create_dataset(g, 'data', s, level)
+                g['ref'] = ds
+
+    def _create_dataset(self, parent, name, sig, level):
+        """ Create a chunked and compressed dataset with the data of a Signal
+
+        Parameters
+        ----------
+        parent: h5py.Group
+        The group where to create the dataset
+
+        name: string
+        Name of the dataset
+
+        sig: Signal
+        The Signal to write, its name and unit are written as attributes
+
+        level: int
+        gzip compression level
+
+        Returns
+        -------
+        h5py.Dataset
+        The dataset created
+        """
+        data = numpy.asarray(sig.data)
+        if data.size:
+            # Chunks along the points, the last axis for families
+            chunks = (1,) * (data.ndim - 1) +\
+                (min(data.shape[-1], CHUNK_POINTS),)
+            ds = parent.create_dataset(name, data=data, chunks=chunks,
+                                       compression='gzip',
+                                       compression_opts=level, shuffle=True)
+        else:
+            ds = parent.create_dataset(name, data=data)
+        ds.attrs['name'] = sig.name
+        ds.attrs['unit'] = sig.unit or ''
+        return ds
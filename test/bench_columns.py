@@ -0,0 +1,57 @@
+""" Benchmark of the column text readers (gnucap, cazm)
+
+Compare GnucapReader with the former line by line parsing.
+Usage: python bench_columns.py [nvalues [ncols]]
+Default is 10M values in 10 columns.
+"""
+import io
+import os
+import sys
+import time
+import tempfile
+import numpy
+from oscopy.readers.gnucap_reader import GnucapReader
+
+nvalues = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000
+ncols = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+nrows = nvalues // ncols
+chunk = 100000
+
+def former_read(fn):
+    """ Line by line parsing, as done before the bulk columnar parser
+    """
+    with io.open(fn, 'r') as f:
+        lines = iter(f)
+        names = next(lines).lstrip('#').split()
+        data = [[] for x in range(len(names))]
+        append = [x.append for x in data]
+        for values in lines:
+            for i, val in enumerate(values.split()):
+                append[i](float(val))
+    return [numpy.array(x) for x in data]
+
+fd, fn = tempfile.mkstemp(suffix='.dat')
+with os.fdopen(fd, 'w') as f:
+    f.write('#Time ' + ' '.join('v(n%d)' % i for i in range(1, ncols)) + '\n')
+    for start in range(0, nrows, chunk):
+        n = min(chunk, nrows - start)
+        rows = numpy.random.rand(n, ncols)
+        rows[:, 0] = numpy.arange(start, start + n) * 1e-9
+        numpy.savetxt(f, rows, fmt='%.6e', delimiter=' ')
+size = os.path.getsize(fn) / 1e6
+
+try:
+    print('%d values in %d columns, %.1f MB' % (nrows * ncols, ncols, size))
+    t = time.time()
+    former = former_read(fn)
+    t_former = time.time() - t
+    print('former: %8.3f s  %8.1f MB/s' % (t_former, size / t_former))
+    t = time.time()
+    sigs = GnucapReader().read(fn)
+    t_bulk = time.time() - t
+    print('bulk:   %8.3f s  %8.1f MB/s  (x%.1f)' % (t_bulk, size / t_bulk,
+                                                  t_former / t_bulk))
+    assert all(numpy.array_equal(former[i], sigs['vn%d' % i].data)
+               for i in range(1, ncols))
+finally:
+    os.remove(fn)
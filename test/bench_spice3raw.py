@@ -0,0 +1,46 @@
+""" Benchmark of Spice3rawReader on a synthetic binary raw file
+
+Usage: python bench_spice3raw.py [npoints [nvars]]
+Default is 1M points x 200 variables (about 1.6 GB of data).
+"""
+import os
+import sys
+import time
+import tempfile
+import numpy
+from oscopy.readers.spice3raw_reader import Spice3rawReader
+
+npoints = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+nvars = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+chunk = 10000
+
+fd, fn = tempfile.mkstemp(suffix='.raw')
+with os.fdopen(fd, 'wb') as f:
+    header = ['Title: benchmark', 'Date: today', 'Plotname: Transient Analysis',
+              'Flags: real', 'No. Variables: %d' % nvars,
+              'No. Points: %d' % npoints, 'Variables:',
+              '\t0\ttime\ttime']
+    header += ['\t%d\tv(n%d)\tvoltage' % (i, i) for i in range(1, nvars)]
+    header.append('Binary:\n')
+    f.write('\n'.join(header).encode())
+    for start in range(0, npoints, chunk):
+        n = min(chunk, npoints - start)
+        rows = numpy.random.rand(n, nvars)
+        rows[:, 0] = numpy.arange(start, start + n) * 1e-9
+        rows.astype('<f8').tofile(f)
+size = os.path.getsize(fn) / 1e6
+
+try:
+    r = Spice3rawReader()
+    t = time.time()
+    sigs = r.read(fn)
+    t_read = time.time() - t
+    t = time.time()
+    total = sum(s.data.sum() for s in sigs.values())
+    t_data = time.time() - t
+    print('%d points x %d variables, %.1f MB' % (npoints, nvars, size))
+    print('read:           %8.3f s  %10.1f MB/s' % (t_read, size / t_read))
+    print('read+data pass: %8.3f s  %10.1f MB/s' % (t_read + t_data,
+                                                    size / (t_read + t_data)))
+finally:
+    os.remove(fn)
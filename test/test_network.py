@@ -0,0 +1,197 @@
+""" Checks of the network parameters operations on small synthetic networks
+
+Run with pytest, or directly: python test/test_network.py
+"""
+
+import gettext
+gettext.install('oscopy')
+
+import os
+import tempfile
+import numpy
+from oscopy import Signal
+from oscopy.readers.touchstone_reader import TouchstoneReader
+from oscopy import network
+
+def write_s2p(freq, s):
+    """ Write a 2-port network, (frequencies x 2 x 2) S-parameters, to a
+    Touchstone file in real/imaginary format and return its path
+    """
+    (fd, fn) = tempfile.mkstemp(suffix='.s2p')
+    with os.fdopen(fd, 'w') as f:
+        f.write('# Hz S RI R 50\n')
+        for (x, m) in zip(freq, s):
+            # Touchstone order for 2-port networks is 11, 21, 12, 22
+            values = [m[0, 0], m[1, 0], m[0, 1], m[1, 1]]
+            f.write('%.12g %s\n' % (x, ' '.join('%.12g %.12g' % (v.real, v.imag)
+                                               for v in values)))
+    return fn
+
+def signals(param, freq, x):
+    """ Return the Signals of a (frequencies x ports x ports) network
+    """
+    ref = Signal('Frequency', 'Hz')
+    ref.data = numpy.asarray(freq, dtype=float)
+    sigs = {}
+    for i in range(x.shape[1]):
+        for j in range(x.shape[2]):
+            s = Signal(network.param_name(param, i + 1, j + 1, x.shape[1]), '')
+            s.data = x[:, i, j]
+            s.ref = ref
+            sigs[s.name] = s
+    return sigs
+
+def array(param, sigs):
+    """ Return the (frequencies x ports x ports) array of a network
+    """
+    return network.to_array(network.get_network(sigs, param)[1])
+
+def random_s(nports, npoints=5, seed=1):
+    """ Return random reciprocal S-parameters, with non singular Z, Y and
+    ABCD
+    """
+    rng = numpy.random.default_rng(seed)
+    s = 0.3 * (rng.normal(size=(npoints, nports, nports))
+               + 1j * rng.normal(size=(npoints, nports, nports)))
+    return (s + s.swapaxes(1, 2)) / 2
+
+def lowpass(freq, fc=1e9):
+    """ Return the S-parameters of a matched first order low-pass filter
+    """
+    s = numpy.zeros((len(freq), 2, 2), dtype=complex)
+    s[:, 0, 1] = s[:, 1, 0] = 1 / (1 + 1j * freq / fc)
+    return s
+
+def read_s2p(freq, s):
+    """ Return the Signals of a network written to a Touchstone file
+    """
+    fn = write_s2p(freq, s)
+    try:
+        sigs = TouchstoneReader().read(fn)
+        for x in sigs.values():
+            x.data
+        return sigs
+    finally:
+        os.remove(fn)
+
+def test_impulse_log_sweep():
+    """ The frequency grid of a logarithmic sweep is bounded """
+    freq = numpy.logspace(3, numpy.log10(50e9), 201)
+    sigs = read_s2p(freq, lowpass(freq))
+    (impulse, step) = network.impulse_response(sigs['S21'])
+    df = (freq[-1] - freq[0]) / 200
+    assert len(impulse.data) == 400
+    assert numpy.allclose(numpy.diff(impulse.ref.data), 1 / (400 * df))
+    assert step.ref is impulse.ref
+    # Step response of a low-pass filter settles to its DC gain
+    assert abs(step.data[-1] - 1) < 0.05
+    assert network.impulse_response(sigs['S21']) == (impulse, step)
+
+def test_impulse_frequency_step():
+    """ The frequency step sets the span of the responses """
+    freq = numpy.logspace(3, numpy.log10(50e9), 201)
+    sigs = read_s2p(freq, lowpass(freq))
+    (impulse, step) = network.impulse_response(sigs['S21'], df=100e6)
+    assert len(impulse.data) == 2 * 500
+    assert numpy.isclose(impulse.ref.data[-1] + impulse.ref.data[1], 1e-8)
+    try:
+        network.impulse_response(sigs['S21'], df=1.0)
+    except ValueError:
+        pass
+    else:
+        assert False, 'grid of 5e10 frequencies not rejected'
+
+def test_impulse_linear_sweep():
+    """ Linear sweeps are not resampled """
+    freq = numpy.arange(101) * 100e6
+    sigs = read_s2p(freq, lowpass(freq))
+    (impulse, step) = network.impulse_response(sigs['S21'], window=None)
+    assert numpy.allclose(impulse.data, numpy.fft.irfft(sigs['S21'].data))
+    assert numpy.isclose(impulse.ref.data[1], 1 / (200 * 100e6))
+
+def test_conversions_round_trip():
+    """ S to Z, Y and ABCD and back give the same S-parameters """
+    freq = numpy.linspace(1e6, 1e9, 5)
+    s = random_s(2)
+    sigs = signals('S', freq, s)
+    z0 = [50, 75]
+    for to in ['Z', 'Y', 'ABCD']:
+        x = network.convert(sigs, to, z0)
+        back = network.convert(x, 'S', z0)
+        assert numpy.allclose(array('S', back), s), to
+    z = array('Z', network.convert(sigs, 'Z', z0))
+    y = array('Y', network.convert(sigs, 'Y', z0))
+    assert numpy.allclose(numpy.linalg.inv(z), y)
+
+def test_conversions_series_impedance():
+    """ ABCD and S of a series impedance """
+    freq = numpy.linspace(1e6, 1e9, 5)
+    zs = 10 + 2j * numpy.pi * freq * 1e-9
+    abcd = numpy.zeros((len(freq), 2, 2), dtype=complex)
+    abcd[:, 0, 0] = abcd[:, 1, 1] = 1
+    abcd[:, 0, 1] = zs
+    s = array('S', network.convert(signals('ABCD', freq, abcd), 'S'))
+    assert numpy.allclose(s[:, 1, 0], 2 * 50 / (2 * 50 + zs))
+    assert numpy.allclose(s[:, 0, 0], zs / (2 * 50 + zs))
+
+def test_renormalize():
+    """ Renormalized S-parameters describe the same network """
+    freq = numpy.linspace(1e6, 1e9, 5)
+    s = random_s(3)
+    sigs = network.renormalize(signals('S', freq, s), [75, 25, 100])
+    s75 = array('S', sigs)
+    assert numpy.allclose(network.s_to_z(s75, [75, 25, 100]),
+                          network.s_to_z(s, 50))
+    back = network.renormalize(sigs, 50, [75, 25, 100])
+    assert numpy.allclose(array('S', back), s)
+
+def test_mixed_mode():
+    """ Mixed-mode Z of uncoupled lines and consistency of S, Z and Y """
+    freq = numpy.linspace(1e6, 1e9, 5)
+    z = numpy.tile(50 * numpy.eye(4, dtype=complex), (len(freq), 1, 1))
+    zmm = network.mixed_mode(signals('Z', freq, z), param='Z')
+    assert numpy.allclose(zmm['ZDD11'].data, 100)
+    assert numpy.allclose(zmm['ZCC22'].data, 25)
+    assert numpy.allclose(zmm['ZDC11'].data, 0)
+
+    s = random_s(4)
+    z = network.s_to_z(s)
+    names = [(x, i, j) for x in ['DD', 'DC', 'CD', 'CC']
+             for i in (1, 2) for j in (1, 2)]
+    def mm(param, x):
+        sigs = network.mixed_mode(signals(param, freq, x), param=param)
+        m = numpy.empty(x.shape, dtype=complex)
+        for (modes, i, j) in names:
+            (r, c) = ('DC'.index(modes[0]) * 2 + i - 1,
+                      'DC'.index(modes[1]) * 2 + j - 1)
+            m[:, r, c] = sigs['%s%s%d%d' % (param, modes, i, j)].data
+        return m
+    smm = mm('S', s)
+    # Mixed-mode reference impedances are 2 z0 and z0 / 2
+    assert numpy.allclose(network.s_to_z(smm, [100, 100, 25, 25]),
+                          mm('Z', z))
+    assert numpy.allclose(numpy.linalg.inv(mm('Z', z)),
+                          mm('Y', numpy.linalg.inv(z)))
+    try:
+        network.mixed_mode(signals('ABCD', freq, s[:, :2, :2]), param='ABCD')
+    except ValueError:
+        pass
+    else:
+        assert False, 'mixed-mode ABCD not rejected'
+
+def test_cascade_deembed():
+    """ De-embedding a fixture from a cascade gives the network back """
+    freq = numpy.linspace(1e6, 1e9, 5)
+    (fixture, dut) = (random_s(2, seed=2), random_s(2, seed=3))
+    chain = network.cascade(signals('S', freq, fixture),
+                            signals('S', freq, dut))
+    s = network.deembed(chain, left=signals('S', freq, fixture))
+    assert numpy.allclose(array('S', s), dut)
+    t = network.s_to_t(fixture) @ network.s_to_t(dut)
+    assert numpy.allclose(array('S', chain), network.t_to_s(t))
+
+if __name__ == '__main__':
+    for (name, func) in sorted(globals().items()):
+        if name.startswith('test_') and callable(func):
+            func()
+            print('%s: ok' % name)
@@ -0,0 +1,313 @@
+""" Checks of the Readers and of the streaming reductions on small synthetic
+files
+
+Run with pytest, or directly: python test/test_readers.py
+"""
+
+import gettext
+gettext.install('oscopy')
+
+import os
+import re
+import shutil
+import tempfile
+import numpy
+from oscopy import ReadError
+from oscopy import stream
+from oscopy.readers.reader import select_names
+from oscopy.readers.cache import cache
+from oscopy.readers.gnucap_reader import GnucapReader
+from oscopy.readers.spice3raw_reader import Spice3rawReader
+from oscopy.readers.hspice_reader import HspiceReader
+
+def write(name, content, mode='w'):
+    """ Write content to a new file of a temporary directory and return its
+    path, the directory being removed by cleanup()
+    """
+    fn = os.path.join(tempfile.mkdtemp(prefix='oscopy-test-'), name)
+    with open(fn, mode) as f:
+        f.write(content)
+    return fn
+
+def cleanup(fn):
+    """ Remove the temporary directory of a file written by write()
+    """
+    shutil.rmtree(os.path.dirname(fn))
+
+def gnucap(rows):
+    """ Return the text of a gnucap file with the columns Time, v(a), v(b)
+    """
+    return '#Time v(a) v(b)\n' +\
+        ''.join(' '.join('%g' % x for x in row) + '\n' for row in rows)
+
+def test_select_names():
+    """ Names, glob patterns and regular expressions """
+    names = ['vout', 'vin', 'iRd', 'v1_tran1']
+    assert select_names(names, None) == [0, 1, 2, 3]
+    assert select_names(names, 'vin') == [1]
+    assert select_names(names, 'v*') == [0, 1, 3]
+    assert select_names(names, ['iRd', 'vo*']) == [0, 2]
+    assert select_names(names, re.compile('v.*_tran1')) == [3]
+    assert select_names(names, re.compile('v')) == []
+
+def test_columns_read():
+    """ Whole file and selection of Signals """
+    rows = numpy.arange(30.).reshape(10, 3)
+    fn = write('t.dat', gnucap(rows))
+    try:
+        sigs = GnucapReader().read(fn)
+        assert sorted(sigs) == ['va', 'vb']
+        assert numpy.array_equal(sigs['va'].data, rows[:, 1])
+        assert numpy.array_equal(sigs['vb'].ref.data, rows[:, 0])
+        sigs = GnucapReader().read(fn, sigs='*b')
+        assert list(sigs) == ['vb']
+        assert numpy.array_equal(sigs['vb'].data, rows[:, 2])
+    finally:
+        cleanup(fn)
+
+def test_columns_invalid_line():
+    """ Invalid lines are reported with their number """
+    fn = write('t.dat', '#Time v(a) v(b)\n0 1 2\n1 2\n2 3 4\n')
+    try:
+        GnucapReader().read(fn)['va'].data
+    except ReadError as e:
+        assert 'line 3' in str(e)
+    else:
+        assert False, 'invalid line not reported'
+    finally:
+        cleanup(fn)
+
+def test_columns_tail_update():
+    """ Incomplete last line ignored, then completed by update() """
+    fn = write('t.dat', '#Time v(a) v(b)\n0 1 2\n1 3 4\n2 5')
+    try:
+        r = GnucapReader()
+        sigs = r.read(fn)
+        assert sigs['va'].data.tolist() == [1, 3]
+        with open(fn, 'a') as f:
+            f.write(' 6\n3 7 8\n')
+        r.update(1)
+        assert sigs['va'].data.tolist() == [1, 3, 5, 7]
+        assert sigs['vb'].data.tolist() == [2, 4, 6, 8]
+        assert sigs['va'].ref.data.tolist() == [0, 1, 2, 3]
+    finally:
+        cleanup(fn)
+
+def test_columns_rewritten():
+    """ A file rewritten with the same size is read again """
+    fn = write('t.dat', gnucap([[0, 1, 2], [1, 3, 4]]))
+    try:
+        r = GnucapReader()
+        sigs = r.read(fn)
+        assert sigs['va'].data.tolist() == [1, 3]
+        with open(fn, 'w') as f:
+            f.write(gnucap([[0, 9, 2], [1, 8, 4]]))
+        r.update(1)
+        assert r.signals['va'].data.tolist() == [9, 8]
+    finally:
+        cleanup(fn)
+
+def test_cache():
+    """ Signals are read back from the cache, keyed by the file state """
+    fn = write('t.dat', gnucap(numpy.arange(12.).reshape(4, 3)))
+    path = cache.path
+    cache.path = os.path.join(os.path.dirname(fn), 'cache')
+    try:
+        GnucapReader().read(fn)
+        assert len(os.listdir(cache.path)) == 1
+        sigs = GnucapReader().read(fn)
+        assert isinstance(sigs['va'].data, numpy.memmap)
+        assert sigs['va'].data.tolist() == [1, 4, 7, 10]
+        # Same file with other values, modification time set back
+        st = os.stat(fn)
+        with open(fn, 'w') as f:
+            f.write(gnucap(numpy.arange(12.).reshape(4, 3) * 2))
+        os.utime(fn, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+        sigs = GnucapReader().read(fn)
+        assert sigs['va'].data.tolist() == [2, 8, 14, 20]
+        assert len(os.listdir(cache.path)) == 2
+        # Selections are not cached
+        GnucapReader().read(fn, sigs='va')
+        assert len(os.listdir(cache.path)) == 2
+    finally:
+        cache.path = path
+        cleanup(fn)
+
+def test_stream_reductions():
+    """ Reductions by chunks match the reductions of the whole data """
+    t = numpy.sort(numpy.random.default_rng(1).uniform(0, 1, 100))
+    v = numpy.sin(2 * numpy.pi * 5 * t)
+    fn = write('t.dat', gnucap(numpy.column_stack((t, v, v ** 2))))
+    try:
+        for points in (7, 100):
+            res = stream.measure(GnucapReader().iter_chunks(fn, points, 'va'),
+                                 {'va': [stream.Min(), stream.Max(),
+                                         stream.Mean(), stream.RMS(),
+                                         stream.Crossings(0, 'rising'),
+                                         stream.Histogram(4, (-1, 1))]})
+            (vmin, vmax, mean, rms, edges, hist) = res['va']
+            (t, v) = numpy.loadtxt(fn, usecols=(0, 1), unpack=True)
+            def integral(x):
+                return numpy.sum((x[1:] + x[:-1]) * numpy.diff(t)) / 2
+            span = t[-1] - t[0]
+            assert numpy.isclose(vmin, v.min())
+            assert numpy.isclose(vmax, v.max())
+            assert numpy.isclose(mean, integral(v) / span)
+            assert numpy.isclose(rms, numpy.sqrt(integral(v ** 2) / span))
+            i = numpy.flatnonzero((v[:-1] < 0) & (v[1:] >= 0))
+            assert numpy.allclose(edges, t[i] - v[i] * (t[i + 1] - t[i])
+                                  / (v[i + 1] - v[i]))
+            assert numpy.array_equal(hist[0],
+                                     numpy.histogram(v, hist[1])[0])
+    finally:
+        cleanup(fn)
+
+def test_iter_chunks_reader_state():
+    """ iter_chunks() does not change the Signals of the Reader """
+    fn = write('t.dat', gnucap(numpy.arange(30.).reshape(10, 3)))
+    try:
+        r = GnucapReader()
+        sigs = r.read(fn, sigs='va')
+        chunks = list(r.iter_chunks(fn, 4))
+        assert [len(ref) for (ref, data) in chunks] == [4, 4, 2]
+        assert sorted(chunks[0][1]) == ['va', 'vb']
+        assert r.signals is sigs and list(sigs) == ['va']
+    finally:
+        cleanup(fn)
+
+def spice3_plot(plotname, flags, names, rows, binary=False):
+    """ Return the bytes of a plot of a Spice3 raw file
+    """
+    rows = numpy.asarray(rows)
+    header = 'Title: t\nDate: d\nPlotname: %s\nFlags: %s\n' \
+        'No. Variables: %d\nNo. Points: %d\nVariables:\n' %\
+        (plotname, flags, len(names), len(rows))
+    header += ''.join('\t%d\t%s\t%s\n' % (i, n, t)
+                      for (i, (n, t)) in enumerate(names))
+    if binary:
+        if flags == 'complex':
+            rows = numpy.column_stack((rows.real, rows.imag))\
+                .reshape(len(rows), 2, -1).transpose(0, 2, 1)
+        return (header + 'Binary:\n').encode() +\
+            numpy.asarray(rows, dtype='<f8').tobytes()
+    values = ''
+    for (i, row) in enumerate(rows):
+        x = ['%.6e' % x.real if flags == 'real'
+             else '%.6e,%.6e' % (x.real, x.imag) for x in row]
+        values += ' %d\t%s\n' % (i, '\n\t'.join(x)) + '\n'
+    return (header + 'Values:\n' + values).encode()
+
+def test_spice3_plots():
+    """ Signals of several plots are suffixed with the plot identifier """
+    tran = [('time', 'time'), ('v(1)', 'voltage')]
+    ac = [('frequency', 'frequency'), ('v(1)', 'voltage')]
+    fn = write('t.raw',
+               spice3_plot('Transient Analysis', 'real', tran,
+                           [[0, 1], [1, 2]]) +
+               spice3_plot('AC Analysis', 'complex', ac,
+                           [[1, 1 + 1j], [2, 2 - 2j]], binary=True) +
+               spice3_plot('Transient Analysis', 'real', tran,
+                           [[0, 5], [1, 6], [2, 7]], binary=True), 'wb')
+    try:
+        r = Spice3rawReader()
+        sigs = r.read(fn)
+        assert sorted(sigs) == ['v1_ac1', 'v1_tran1', 'v1_tran2']
+        assert sigs['v1_tran1'].data.tolist() == [1, 2]
+        assert sigs['v1_ac1'].data.tolist() == [1 + 1j, 2 - 2j]
+        assert sigs['v1_ac1'].ref.data.tolist() == [1, 2]
+        assert sigs['v1_tran2'].data.tolist() == [5, 6, 7]
+        assert sigs['v1_tran2'].unit == 'V'
+        assert [p['id'] for p in r.info['plots']] == ['tran1', 'ac1', 'tran2']
+        assert list(Spice3rawReader().read(fn, sigs='*_tran*')) ==\
+            ['v1_tran1', 'v1_tran2']
+    finally:
+        cleanup(fn)
+
+def test_spice3_ascii_values():
+    """ Ascii values, real and complex """
+    fn = write('t.raw',
+               spice3_plot('AC Analysis', 'complex',
+                           [('frequency', 'frequency'), ('v(out)', 'voltage')],
+                           [[1e3, 0.5 - 1.25e-3j], [1e4, -2e-9 + 3j]]), 'wb')
+    try:
+        sigs = Spice3rawReader().read(fn)
+        assert numpy.allclose(sigs['vout'].data, [0.5 - 1.25e-3j, -2e-9 + 3j])
+        assert numpy.allclose(sigs['vout'].ref.data, [1e3, 1e4])
+    finally:
+        cleanup(fn)
+
+def test_spice3_tail_update():
+    """ Points appended to the last plot are read by update() """
+    tran = [('time', 'time'), ('v(1)', 'voltage')]
+    fn = write('t.raw', spice3_plot('Transient Analysis', 'real', tran,
+                                    [[0, 1], [1, 2]]), 'wb')
+    try:
+        r = Spice3rawReader()
+        sigs = r.read(fn)
+        assert sigs['v1'].data.tolist() == [1, 2]
+        with open(fn, 'wb') as f:
+            f.write(spice3_plot('Transient Analysis', 'real', tran,
+                                [[0, 1], [1, 2], [2, 3], [3, 4]]))
+        r.update(1)
+        assert r.signals['v1'].data.tolist() == [1, 2, 3, 4]
+        assert r.signals['v1'].ref.data.tolist() == [0, 1, 2, 3]
+    finally:
+        cleanup(fn)
+
+def hspice(values, nsweeps=0, block=None):
+    """ Return the bytes of a hspice binary file with the variables TIME,
+    v(a) and v(b), and the sweep parameter temp if nsweeps, the values being
+    split into data blocks of block values
+    """
+    header = '%04d%04d%04d%04d9601' % (1, 2, 1 if nsweeps else 0, 0)
+    header = header.ljust(176) + ' 1 1 1 1 TIME v(a) v(b) %s $&%%#' %\
+        ('temp' if nsweeps else '')
+    def frame(data):
+        return numpy.array([4, 0, 4, len(data)], dtype='>i4').tobytes() +\
+            data + numpy.array([len(data)], dtype='>i4').tobytes()
+    data = numpy.asarray(values, dtype='>f4').tobytes()
+    size = 4 * block if block else len(data)
+    return frame(header.encode()) +\
+        b''.join(frame(data[i:i + size]) for i in range(0, len(data), size))
+
+def test_hspice_binary_blocks():
+    """ Values split into blocks of various sizes """
+    rows = numpy.arange(300.).reshape(100, 3)
+    values = numpy.append(rows.ravel(), 1e30)
+    for block in (None, 7, 30, 64):
+        fn = write('t.tr0', hspice(values, block=block), 'wb')
+        try:
+            sigs = HspiceReader().read(fn)
+            assert numpy.array_equal(sigs['va'].data, rows[:, 1])
+            assert numpy.array_equal(sigs['vb'].data, rows[:, 2])
+            assert numpy.array_equal(sigs['va'].ref.data, rows[:, 0])
+        finally:
+            cleanup(fn)
+
+def test_hspice_sweeps():
+    """ Sweeps end at the terminator in place of the independent variable,
+    Signals reaching 1e30 do not end the sweeps
+    """
+    values = [25, 0, 1, 2, 1, 1e30, 3, 2, 4, 5, 1e30,
+              50, 0, 6, 7, 1, 8, 1e30, 1e30]
+    fn = write('t.tr0', hspice(values, nsweeps=2, block=5), 'wb')
+    try:
+        r = HspiceReader()
+        sigs = r.read(fn)
+        assert r.info['sweep_points'] == [3, 2]
+        assert r.info['sweep_values'].ravel().tolist() == [25, 50]
+        assert sigs['va'].data.shape == (2, 3)
+        # Values are single precision
+        assert numpy.array_equal(sigs['va'].data[0],
+                                 numpy.float32([1, 1e30, 4]))
+        assert numpy.array_equal(sigs['vb'].data[1, :2],
+                                 numpy.float32([7, 1e30]))
+        assert numpy.isnan(sigs['vb'].data[1, 2])
+    finally:
+        cleanup(fn)
+
+if __name__ == '__main__':
+    for (name, func) in sorted(globals().items()):
+        if name.startswith('test_') and callable(func):
+            func()
+            print('%s: ok' % name)